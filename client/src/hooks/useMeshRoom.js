@@ -19,6 +19,7 @@ export function useMeshRoom(roomId, token) {
 
   useEffect(() => {
     let disposed = false;
+    let heartbeat = null;
 
     async function boot() {
       try {
@@ -49,18 +50,44 @@ export function useMeshRoom(roomId, token) {
         localTrackRef.current = dest.stream.getAudioTracks()[0] || null;
 
         // 2) Setup WebSocket connection
+        // The resume token lets a reconnect within the server's grace window skip re-auth
+        let resumeToken = null;
         const socket = io(API_URL, {
           transports: ["websocket"],
-          auth: { token, roomId: Number(roomId) },
+          auth: (cb) => cb({ token, roomId: Number(roomId), resumeToken }),
         });
         socketRef.current = socket;
 
+        // Cheap liveness heartbeat so the server can reap sockets it lost track of
+        heartbeat = setInterval(() => socket.connected && socket.emit("presence:ping"), 20000);
+
         socket.on("connect", () => setStatus("connected"));
+        socket.on("connected", (data) => {
+          resumeToken = data?.resumeToken || null;
+        });
         socket.on("disconnect", () => {
           setStatus("disconnected");
           setOnlineParticipants([]);
         });
 
+        // Sharded servers send the handshake (or a rebalanced room) to the owning worker
+        const redirectTo = (url) => {
+          socket.io.uri = url;
+          socket.disconnect();
+          socket.connect();
+        };
+        socket.on("shard:redirect", ({ url }) => redirectTo(url));
+        socket.on("connect_error", (err) => {
+          if (err?.data?.redirect) {
+            redirectTo(err.data.redirect);
+          } else if (err?.data?.retryAfter) {
+            // Server is shedding load: back off for its jittered hint plus our own jitter
+            setStatus("server busy, retrying");
+            const delay = err.data.retryAfter * 1000 * (0.8 + Math.random() * 0.4);
+            setTimeout(() => !disposed && socket.connect(), delay);
+          }
+        });
+
         socket.on("room:full", ({ limit }) => {
           setStatus(`room full (${limit})`);
           socket.disconnect();
@@ -89,6 +116,19 @@ export function useMeshRoom(roomId, token) {
           cleanupPeer(socketId);
         });
 
+        // A peer reconnected within the grace window: same session, new socket id
+        socket.on("presence:resume", ({ socketId, previousSocketId }) => {
+          setOnlineParticipants((prev) =>
+            prev.map((p) => (p.socket_id === previousSocketId ? { ...p, socket_id: socketId } : p))
+          );
+          for (const map of [peersRef.current, audioElementsRef.current]) {
+            if (map.has(previousSocketId)) {
+              map.set(socketId, map.get(previousSocketId));
+              map.delete(previousSocketId);
+            }
+          }
+        });
+
         socket.on("user:status:change", ({ socketId, status, timestamp }) => {
           setOnlineParticipants((prev) =>
             prev.map((p) =>
@@ -236,6 +276,7 @@ export function useMeshRoom(roomId, token) {
 
     return () => {
       disposed = true;
+      clearInterval(heartbeat);
       peersRef.current.forEach((pc) => pc.close());
       peersRef.current.clear();
       audioElementsRef.current.forEach((audio) => audio.remove());
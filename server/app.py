@@ -1,21 +1,24 @@
-import eventlet
-eventlet.monkey_patch()
 import os
+import eventlet
+if os.getenv("PRELOAD_APP") == "1":
+    # gunicorn master: the arbiter's select() and signal pipe must stay blocking;
+    # each eventlet worker patches os/select itself after fork
+    eventlet.monkey_patch(os=False, select=False)
+else:
+    eventlet.monkey_patch()
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 
+import click
 from flask import Flask
 from flask_restful import Api
 from flask_caching import Cache
 import uuid
 import json
 from flask_jwt_extended import JWTManager
-from flask_dance.contrib.google import make_google_blueprint
 from flask_bcrypt import Bcrypt
-from flask_migrate import Migrate
 from flask_cors import CORS
 import redis
-import ssl
-from socketio_server import init_socketio, socketio
+from socketio_server import init_socketio, start_background_tasks, socketio
 
 from config import Config
 from models import db
@@ -23,8 +26,17 @@ from flask_restful import Resource
 
 # Import your resources
 from resources.auth import GoogleAuth, Login, Register
-from resources.user_info import UserInfo
-from resources.room import RoomListResource, RoomJoinResource, RoomLeaveResource, RoomParticipantsResource, RoomDetailResource, CacheWarmupResource
+from resources.user_info import UserInfo, UserBatchResource
+from resources.export import ExportResource
+from resources.room import RoomListResource, RoomJoinResource, RoomLeaveResource, RoomParticipantsResource, RoomDetailResource, CacheWarmupResource, RoomSearchResource, RoomSuggestResource, RoomStatsResource, RoomBatchResource
+from utils.membership import membership_cli
+from utils.search import search_cli
+from utils.archive import archive_cli
+from utils.export import export_cli
+from utils.cache_store import cache_cli
+from utils.redis_pool import create_pool
+from utils import metrics
+from utils import db_routing
 import sqlalchemy.pool
 bcrypt = Bcrypt()
 
@@ -33,43 +45,40 @@ def create_app():
     app = Flask(__name__)
     
     app.config.from_object(Config)
+    hops = app.config["TRUSTED_PROXY_HOPS"]
+    if hops:
+        # remote_addr becomes the client as seen by the outermost trusted proxy
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
     app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
         "poolclass": sqlalchemy.pool.NullPool
     }
 
     # Extensions
     db.init_app(app)
+    db_routing.init_app(app)
     bcrypt.init_app(app)
     jwt = JWTManager()  
     jwt.init_app(app)
-    migrate = Migrate(app, db)
+    if click.get_current_context(silent=True):
+        # Only the flask CLI needs `flask db`; alembic is a large import workers never use
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    app.cli.add_command(membership_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(export_cli)
+    app.cli.add_command(cache_cli)
     CORS(app)  # Enable CORS for all routes
 
+    # ---- Redis: one bounded pool behind a circuit breaker, for the cache and everything else ----
+    connect_redis(app)
+
     # ---- Caching (Flask-Caching) ----
-    cache = Cache(app)              # Uses Config (CACHE_TYPE, etc.)
+    cache = Cache(app)              # Uses Config (CACHE_TYPE, etc.); the Redis backend reuses the pool
     app.cache = cache
-    
-    # ---- (Optional) direct Redis connection if you need it besides caching ----
-    redis_url = app.config.get("CACHE_REDIS_URL")
-    if redis_url:
-        redis_connection_kwargs = {"decode_responses": True}
-        if redis_url.startswith("rediss://"):
-            redis_connection_kwargs["ssl"] = True
-            redis_connection_kwargs["ssl_cert_reqs"] = ssl.CERT_NONE
-        app.redis = redis.Redis.from_url(redis_url, **redis_connection_kwargs)
-    
-    # ---- Google OAuth blueprint ----
-    google_bp = make_google_blueprint(
-        client_id=Config.GOOGLE_CLIENT_ID,
-        client_secret=Config.GOOGLE_CLIENT_SECRET,
-        scope=[
-            "openid",
-            "https://www.googleapis.com/auth/userinfo.email",
-            "https://www.googleapis.com/auth/userinfo.profile",
-        ],
-        redirect_url="/auth/google",
-    )
-    
+    app.extensions["backends_pid"] = os.getpid()
+
     class CustomJSONEncoder(json.JSONEncoder):
         def default(self, obj):
             if isinstance(obj, uuid.UUID):
@@ -77,7 +86,7 @@ def create_app():
             return super().default(obj)
         
     app.json_encoder = CustomJSONEncoder
-    app.register_blueprint(google_bp, url_prefix="/login")
+    register_google_oauth(app)
 
     # ---- API resources ----
     api = Api(app)
@@ -85,37 +94,116 @@ def create_app():
     # Health check endpoint for Redis
     class HealthCheck(Resource):
         def get(self):
+            status = {"status": "healthy"}
+            coordinator = getattr(app, "shard_coordinator", None)
+            if coordinator:
+                status["shard"] = {"url": coordinator.shard_url, "ring": sorted(coordinator.ring.nodes)}
             try:
                 app.redis.ping()
-                return {"status": "healthy", "redis": "connected"}, 200
-            except redis.ConnectionError:
-                return {"status": "healthy", "redis": "disconnected"}, 200
+                status["redis"] = "connected"
+            except redis.RedisError:
+                status["redis"] = "disconnected"
+            breaker = app.extensions.get("redis_breaker")
+            if breaker:
+                status["redis_breaker"] = breaker.snapshot()
+            return status, 200
+
+    # Process-local counters (reaped sessions, rejected traffic, ...)
+    class Metrics(Resource):
+        def get(self):
+            return metrics.snapshot(), 200
 
     # Register all API resources (routes)
     api.add_resource(HealthCheck, '/health')
+    api.add_resource(Metrics, '/metrics')
 
     api.add_resource(GoogleAuth, '/auth/google')
     api.add_resource(Login, '/auth/signin')
     api.add_resource(Register, '/auth/signup')
     
     api.add_resource(UserInfo, '/user/<int:user_id>', '/user')
+    api.add_resource(UserBatchResource, '/users')
 
     # Room management endpoints
     api.add_resource(RoomListResource, '/rooms')
+    api.add_resource(RoomBatchResource, '/rooms/batch')
+    api.add_resource(RoomSearchResource, '/rooms/search')
+    api.add_resource(RoomSuggestResource, '/rooms/search/suggest')
     api.add_resource(RoomDetailResource, '/rooms/<int:room_id>')
     api.add_resource(RoomParticipantsResource, '/rooms/<int:room_id>/participants')
+    api.add_resource(RoomStatsResource, '/rooms/<int:room_id>/stats')
     api.add_resource(RoomJoinResource, '/rooms/<int:room_id>/join')
     api.add_resource(RoomLeaveResource, '/rooms/<int:room_id>/leave')
 
     # Utility endpoints
     api.add_resource(CacheWarmupResource, '/cache/warmup')
+    api.add_resource(ExportResource, '/export/<string:kind>')
 
     return app
 
 
+def connect_redis(app):
+    """Build this process's Redis pool and breaker; app.redis and the cache backend share them."""
+    if app.config.get("CACHE_REDIS_URL"):
+        pool, breaker = create_pool(app)
+        app.extensions["redis_pool"] = pool
+        app.extensions["redis_breaker"] = breaker
+        app.redis = redis.Redis(connection_pool=pool)
+
+
+def register_google_oauth(app):
+    """Google sign-in is optional; flask_dance and oauthlib load only when it is configured."""
+    if not app.config.get("GOOGLE_CLIENT_ID"):
+        return
+    from flask_dance.contrib.google import make_google_blueprint
+
+    google_bp = make_google_blueprint(
+        client_id=app.config["GOOGLE_CLIENT_ID"],
+        client_secret=app.config["GOOGLE_CLIENT_SECRET"],
+        scope=[
+            "openid",
+            "https://www.googleapis.com/auth/userinfo.email",
+            "https://www.googleapis.com/auth/userinfo.profile",
+        ],
+        redirect_url="/auth/google",
+    )
+    app.register_blueprint(google_bp, url_prefix="/login")
+
+
+def reconnect_after_fork(app):
+    """Give a forked worker its own Redis clients and drop DB connections inherited from the parent."""
+    if app.extensions.get("backends_pid") == os.getpid():
+        return
+    connect_redis(app)
+    app.cache.init_app(app)  # fresh cache backend on the new pool
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)  # leave the parent's sockets alone, open new ones lazily
+    app.extensions["backends_pid"] = os.getpid()
+
+
+_worker_pid = None
+
+
+def init_worker(app):
+    """Per-process setup, once per pid: own connections, then the socket background tasks.
+
+    Runs at import for a plain start; with gunicorn --preload the master only
+    builds the app and each worker calls this after fork (see gunicorn.conf.py).
+    """
+    global _worker_pid
+    if _worker_pid == os.getpid():
+        return
+    _worker_pid = os.getpid()
+    reconnect_after_fork(app)
+    start_background_tasks(app)
+
+
 # For gunicorn / production import
 app = create_app()
 init_socketio(app)
+if not app.config.get("PRELOAD_APP"):
+    init_worker(app)
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,216 @@
+# server/asgi_server.py
+# Realtime layer on asyncio: python-socketio's AsyncServer under an ASGI server,
+# with async Redis and an async DB driver instead of eventlet monkey-patching.
+#
+#     uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+#
+# Serves the same presence and signaling events as socketio_server.py: both
+# hand their handler logic to utils.presence.PresenceRooms and differ only in
+# I/O. The REST API keeps running from app.py.
+import logging
+from datetime import datetime, timezone
+
+import jwt
+import redis.asyncio as aioredis
+import socketio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import Config
+from models import Room, RoomParticipant, User
+from models.room import room_limits
+from utils.activity import ActivityBuffer
+from utils.membership import MembershipIndex
+from utils.presence import PresenceRooms, presence_event, presence_user
+
+logger = logging.getLogger("asgi_server")
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url):
+    """Swap a sync SQLAlchemy URL onto its asyncio driver (aiosqlite / asyncpg)."""
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+
+config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+engine = create_async_engine(async_database_url(Config.SQLALCHEMY_DATABASE_URI))
+redis_client = aioredis.from_url(Config.CACHE_REDIS_URL, decode_responses=True)
+
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")  # tighten in prod
+
+# live maps and handler logic, shared with socketio_server
+presence = PresenceRooms()
+
+
+def _timestamp():
+    return datetime.now(timezone.utc).isoformat()
+
+def _user_id_from_token(token):
+    try:
+        claims = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=["HS256"])
+        return int(claims["sub"])
+    except (jwt.PyJWTError, KeyError, ValueError):
+        return None
+
+async def _in_room(user_id, room_id):
+    """Membership from the Redis index when it is built, else the DB."""
+    try:
+        if await redis_client.exists(MembershipIndex.READY_KEY):
+            return bool(await redis_client.sismember(
+                MembershipIndex.get_room_members_key(room_id), str(user_id)
+            ))
+    except aioredis.RedisError as e:
+        logger.warning(f"Membership index unavailable, using DB: {e}")
+    async with engine.connect() as conn:
+        row = await conn.execute(
+            select(RoomParticipant.id).where(
+                RoomParticipant.user_id == user_id, RoomParticipant.room_id == room_id
+            ).limit(1)
+        )
+        return row.first() is not None
+
+async def _room_settings(room_id):
+    rid = str(room_id)
+    settings = presence.room_settings.get(rid)
+    if settings is None:
+        async with engine.connect() as conn:
+            room = (await conn.execute(
+                select(Room.mode, Room.max_participants, Room.max_speakers).where(Room.id == int(room_id))
+            )).first()
+        if not room:
+            return None
+        capacity, speakers = room_limits(room.mode, room.max_participants, room.max_speakers, config)
+        settings = {"stage": room.mode == "stage", "capacity": capacity, "speakers": speakers}
+        presence.room_settings[rid] = settings
+    return settings
+
+async def _fetch_user_details(user_id):
+    async with engine.connect() as conn:
+        user = (await conn.execute(
+            select(User.id, User.name, User.email, User.profile).where(User.id == user_id)
+        )).first()
+    return presence_user(user) if user else None
+
+async def _set_muted(room_id, user_id, muted):
+    pipe = redis_client.pipeline(transaction=False)
+    ActivityBuffer.queue_muted(pipe, room_id, user_id, muted)
+    try:
+        await pipe.execute()
+    except aioredis.RedisError as e:
+        logger.warning(f"Mute state for user {user_id} in room {room_id} not buffered: {e}")
+
+async def _end_session(sid):
+    ended = presence.unseat(sid, config["LISTENER_PRESENCE_SAMPLE"])
+    if not ended:
+        return
+    meta, user_details = ended
+    if not meta.is_listener:
+        await sio.emit("presence:leave", presence_event(user_details, sid, _timestamp()),
+                       to=presence.presence_targets(meta.room_id), skip_sid=sid)
+    presence.release_room(meta.room_id)
+
+async def _listener_presence_loop():
+    """Broadcast listener counts plus sampled joins/leaves instead of per-listener events."""
+    while True:
+        await sio.sleep(config["LISTENER_PRESENCE_INTERVAL"])
+        for targets, payload in presence.listener_updates():
+            await sio.emit("listeners:update", payload, to=targets)
+
+
+@sio.event
+async def connect(sid, environ, auth):
+    token = (auth or {}).get("token")
+    room_id = (auth or {}).get("roomId")
+    if not token or not room_id:
+        return False
+
+    user_id = _user_id_from_token(token)
+    if user_id is None or not await _in_room(user_id, int(room_id)):
+        return False
+
+    settings = await _room_settings(room_id)
+    if not settings:
+        return False
+
+    user_details = await _fetch_user_details(user_id)
+    if not user_details:
+        logger.error(f"Could not fetch details for user {user_id}")
+        return False
+
+    # Awaits above may have let other connects in; seat the socket before the next
+    # await so concurrent connects see it counted
+    rid = str(room_id)
+    meta, limit = presence.seat(
+        sid, user_id, rid, settings, (auth or {}).get("role"), user_details, config["LISTENER_PRESENCE_SAMPLE"]
+    )
+    if meta is None:
+        await sio.emit("room:full", {"limit": limit}, to=sid)
+        return False
+
+    await sio.enter_room(sid, presence.channel(meta))
+    if not meta.is_listener:
+        await sio.emit("presence:join", presence_event(meta.user_details, sid, _timestamp()),
+                       to=presence.presence_targets(rid), skip_sid=sid)
+
+    await sio.emit("participants:list", presence.participants_payload(sid), to=sid)
+    await sio.emit("connected", {"ok": True, "user": meta.user_details, "role": meta.role}, to=sid)
+
+@sio.event
+async def disconnect(sid, reason=None):
+    await _end_session(sid)
+
+@sio.on("presence:ping")
+async def presence_ping(sid):
+    pass  # engine.io pings detect dead transports; kept so clients can heartbeat either mode
+
+@sio.on("peers:list")
+async def peers_list(sid):
+    await sio.emit("peers:list", {"peers": presence.peers(sid)}, to=sid)
+
+@sio.on("participants:list")
+async def participants_list(sid):
+    await sio.emit("participants:list", presence.participants_payload(sid), to=sid)
+
+@sio.on("user:status")
+async def user_status(sid, data):
+    change = presence.status_change(sid, data, _timestamp())
+    if change is None:
+        return
+    meta, payload, muted = change
+    if muted is not None:
+        await _set_muted(int(meta.room_id), meta.user_id, muted)
+    await sio.emit("user:status:change", payload, to=presence.presence_targets(meta.room_id), skip_sid=sid)
+
+async def _relay(event, sid, data):
+    target = presence.relay_target(sid, data)
+    if target:
+        await sio.emit(event, data, to=target)
+
+@sio.on("webrtc:offer")
+async def on_offer(sid, data):
+    await _relay("webrtc:offer", sid, data)
+
+@sio.on("webrtc:answer")
+async def on_answer(sid, data):
+    await _relay("webrtc:answer", sid, data)
+
+@sio.on("webrtc:ice")
+async def on_ice(sid, data):
+    await _relay("webrtc:ice", sid, data)
+
+
+async def _startup():
+    sio.start_background_task(_listener_presence_loop)
+
+async def _shutdown():
+    await redis_client.aclose()
+    await engine.dispose()
+
+
+app = socketio.ASGIApp(sio, on_startup=_startup, on_shutdown=_shutdown)
@@ -7,13 +7,148 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=40)  # <- Correct key
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///blubb.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # read replicas: GET requests read from these; writers are pinned to the primary briefly
+    SQLALCHEMY_BINDS = {
+        f"replica_{i}": url.strip()
+        for i, url in enumerate(u for u in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if u.strip())
+    }
+    DB_PRIMARY_PIN_SECONDS = int(os.getenv('DB_PRIMARY_PIN_SECONDS', 10))
 
     # cache
-    CACHE_TYPE = "RedisCache"
+    CACHE_TYPE = "utils.redis_pool.ResilientRedisCache"  # RedisCache on the shared pool; errors read as misses
     CACHE_REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     CACHE_DEFAULT_TIMEOUT = 300
+    CACHE_COMPRESS_THRESHOLD = int(os.getenv('CACHE_COMPRESS_THRESHOLD', 1024))  # JSON bytes before zlib kicks in
+    CACHE_COMPRESS_LEVEL = int(os.getenv('CACHE_COMPRESS_LEVEL', 6))
     PROFILE_CACHE_TTL = 300
 
+    # shared Redis pool (per worker process) and its circuit breaker
+    REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+    REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', 0.5))  # wait for a free connection, seconds
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 0.5))
+    REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', 0.5))
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', 30))  # PING idle connections before reuse
+    REDIS_BREAKER_THRESHOLD = int(os.getenv('REDIS_BREAKER_THRESHOLD', 5))  # consecutive failures before opening
+    REDIS_BREAKER_COOLDOWN = float(os.getenv('REDIS_BREAKER_COOLDOWN', 5))  # seconds open before a probe
+    COALESCE_WAIT_TIMEOUT = float(os.getenv('COALESCE_WAIT_TIMEOUT', 5))  # wait on an identical in-flight DB load
+
+    # hot-room cache pre-warmer (runs as a socketio background task)
+    PREWARM_ENABLED = os.getenv('PREWARM_ENABLED', '1') == '1'
+    PREWARM_INTERVAL = int(os.getenv('PREWARM_INTERVAL', 45))  # must stay below the 60s participants TTL
+    PREWARM_ROOM_BUDGET = int(os.getenv('PREWARM_ROOM_BUDGET', 50))  # rooms rebuilt per tick
+    PREWARM_TIME_BUDGET = float(os.getenv('PREWARM_TIME_BUDGET', 2.0))  # seconds of work per tick
+    PREWARM_BATCH_SIZE = int(os.getenv('PREWARM_BATCH_SIZE', 10))
+    PREWARM_RECENT_JOIN_WINDOW = int(os.getenv('PREWARM_RECENT_JOIN_WINDOW', 600))
+
+    # Redis membership index consistency checker (0 disables it; the background
+    # loop still rebuilds a missing index)
+    MEMBERSHIP_CHECK_INTERVAL = int(os.getenv('MEMBERSHIP_CHECK_INTERVAL', 3600))
+
+    # room capacity; stage rooms keep a small speaker mesh and aggregate listener presence
+    MAX_MESH_SIZE = int(os.getenv('MAX_MESH_SIZE', 10))  # ceiling for any WebRTC mesh
+    DEFAULT_ROOM_CAPACITY = int(os.getenv('DEFAULT_ROOM_CAPACITY', 10))
+    STAGE_DEFAULT_CAPACITY = int(os.getenv('STAGE_DEFAULT_CAPACITY', 5000))
+    STAGE_DEFAULT_SPEAKERS = int(os.getenv('STAGE_DEFAULT_SPEAKERS', 10))
+    LISTENER_PRESENCE_INTERVAL = float(os.getenv('LISTENER_PRESENCE_INTERVAL', 2.0))
+    LISTENER_PRESENCE_SAMPLE = int(os.getenv('LISTENER_PRESENCE_SAMPLE', 20))
+
+    # room-affinity sharding: each room id is consistently hashed to one socket worker
+    SHARDING_ENABLED = os.getenv('SHARDING_ENABLED', '0') == '1'
+    # this shard's public URL; unique per shard, and each shard runs a single worker
+    SOCKET_SHARD_URL = os.getenv('SOCKET_SHARD_URL', 'http://localhost:5000')
+    SHARD_HEARTBEAT_INTERVAL = float(os.getenv('SHARD_HEARTBEAT_INTERVAL', 5))
+    SHARD_TTL = float(os.getenv('SHARD_TTL', 15))
+    SHARD_VIRTUAL_NODES = int(os.getenv('SHARD_VIRTUAL_NODES', 128))
+
+    # connection state recovery: reconnects within the grace window resume their session
+    RESUME_GRACE_SECONDS = float(os.getenv('RESUME_GRACE_SECONDS', 15))  # 0 disables
+    RESUME_BUFFER_SIZE = int(os.getenv('RESUME_BUFFER_SIZE', 100))  # replayable events per room/session
+
+    # ghost-session reaper
+    PRESENCE_TTL = float(os.getenv('PRESENCE_TTL', 60))  # idle seconds before a sid is checked
+    REAPER_INTERVAL = float(os.getenv('REAPER_INTERVAL', 5))
+    REAPER_BATCH_SIZE = int(os.getenv('REAPER_BATCH_SIZE', 500))  # sids examined per tick
+
+    # rate limits: name -> (tokens per second, burst)
+    RATE_LIMITS = {
+        "auth.signin": (0.2, 5),        # per IP; every attempt runs bcrypt
+        "auth.signup": (0.05, 3),       # per IP
+        "auth.google": (0.5, 10),       # per IP
+        "rooms.create": (0.1, 5),       # per user
+        "rooms.join": (0.5, 10),        # per user
+        "rooms.leave": (0.5, 10),       # per user
+        "rooms.batch": (5, 200),        # per user, one token per operation
+        "cache.warmup": (0.05, 2),      # per user
+        "rooms.search": (5, 20),        # per user; autocomplete fires per keystroke
+        "socket.webrtc": (50, 200),     # per user; offers, answers and ICE share one bucket
+        "socket.user:status": (2, 10),  # per user
+        "admin.export": (0.1, 5),       # per IP; each export streams a whole table
+    }
+
+    # socket connect admission control / load shedding
+    ADMISSION_MAX_INFLIGHT = int(os.getenv('ADMISSION_MAX_INFLIGHT', 32))  # concurrent handshakes doing DB work
+    ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', 256))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 2.0))
+    ADMISSION_MAX_POOL_USAGE = float(os.getenv('ADMISSION_MAX_POOL_USAGE', 0.9))
+    ADMISSION_MAX_HUB_LAG = float(os.getenv('ADMISSION_MAX_HUB_LAG', 0.25))  # seconds
+    ADMISSION_RETRY_AFTER = float(os.getenv('ADMISSION_RETRY_AFTER', 2.0))  # base seconds, jittered
+
+    # write-behind participant activity: mute state, last seen, session time
+    ACTIVITY_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', 5))
+    ACTIVITY_FLUSH_BATCH = int(os.getenv('ACTIVITY_FLUSH_BATCH', 500))  # rooms per flush
+    ACTIVITY_SEEN_RESOLUTION = float(os.getenv('ACTIVITY_SEEN_RESOLUTION', 30))  # seconds between last-seen writes per socket
+
+    # room occupancy rollups (utils.occupancy): how long each bucket size is kept, in seconds
+    STATS_RETENTION = {
+        "minute": int(os.getenv('STATS_MINUTE_RETENTION', 2 * 86400)),
+        "hour": int(os.getenv('STATS_HOUR_RETENTION', 35 * 86400)),
+        "day": int(os.getenv('STATS_DAY_RETENTION', 400 * 86400)),
+    }
+    STATS_SESSION_BUCKETS = (60, 300, 900, 1800, 3600, 7200)  # session-length histogram bounds, seconds
+    STATS_MAX_BUCKETS = int(os.getenv('STATS_MAX_BUCKETS', 500))  # per /rooms/<id>/stats page
+    STATS_LIVE_TTL = int(os.getenv('STATS_LIVE_TTL', 86400))  # live counter expiry, refreshed by every event
+
+    # socket event trace capture for scripts/trace_replay.py (opt-in, per-worker files)
+    TRACE_ENABLED = os.getenv('TRACE_ENABLED', '0') == '1'
+    TRACE_DIR = os.getenv('TRACE_DIR', 'traces')
+    TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.1))  # fraction of rooms recorded
+    TRACE_MAX_BYTES = int(os.getenv('TRACE_MAX_BYTES', 64 * 1024 * 1024))  # per file before rotating
+    TRACE_BACKUP_COUNT = int(os.getenv('TRACE_BACKUP_COUNT', 10))  # gzipped files kept per worker
+
+    # idle room archival (utils.archive): rooms and memberships untouched this long move to archive tables
+    ARCHIVE_IDLE_DAYS = int(os.getenv('ARCHIVE_IDLE_DAYS', 90))
+    ARCHIVE_INTERVAL = int(os.getenv('ARCHIVE_INTERVAL', 3600))  # seconds between runs; 0 disables the job
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 100))  # rooms moved per transaction
+    ARCHIVE_BATCH_PAUSE = float(os.getenv('ARCHIVE_BATCH_PAUSE', 0.5))  # seconds between batches
+    ARCHIVE_MAX_ROOMS = int(os.getenv('ARCHIVE_MAX_ROOMS', 10000))  # per run
+
+    # NDJSON exports (/export/<kind>, flask export run)
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))  # rows fetched per cursor round trip
+    EXPORT_CHUNK_BYTES = int(os.getenv('EXPORT_CHUNK_BYTES', 64 * 1024))  # response chunk size
+
+    # email -> user cache for sign-in (utils.accounts)
+    AUTH_EMAIL_CACHE_TTL = int(os.getenv('AUTH_EMAIL_CACHE_TTL', 600))  # shared Redis entry, seconds
+    AUTH_LOCAL_CACHE_SIZE = int(os.getenv('AUTH_LOCAL_CACHE_SIZE', 10000))  # per-process LRU entries
+    AUTH_LOCAL_CACHE_TTL = float(os.getenv('AUTH_LOCAL_CACHE_TTL', 10))  # staleness bound across workers
+
+    # POST /rooms/batch
+    ROOM_BATCH_MAX_OPERATIONS = int(os.getenv('ROOM_BATCH_MAX_OPERATIONS', 100))
+
+    # reverse proxies in front of the app; each hop's X-Forwarded-For entry is trusted (0 = none)
+    TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', 0))
+
+    # internal service-to-service auth (signaling tier); unset disables service mode
+    SERVICE_TOKEN = os.getenv('SERVICE_TOKEN')
+    USER_BATCH_MAX_IDS = int(os.getenv('USER_BATCH_MAX_IDS', 100))
+
+    # room search
+    SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', 50))
+    SEARCH_RANK_WINDOW = int(os.getenv('SEARCH_RANK_WINDOW', 2000))  # newest matches scored per query
+    SEARCH_SUGGEST_MIN_CHARS = int(os.getenv('SEARCH_SUGGEST_MIN_CHARS', 2))
+
+    # gunicorn --preload: workers open connections and start background tasks after fork
+    PRELOAD_APP = os.getenv('PRELOAD_APP', '0') == '1'
+
     # Google
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
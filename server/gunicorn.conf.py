@@ -0,0 +1,36 @@
+# server/gunicorn.conf.py
+#
+#     gunicorn -c gunicorn.conf.py app:app
+#
+# The master imports and builds the app once, then forks: workers share the
+# loaded code and module state copy-on-write instead of each paying the import.
+# Nothing socket-backed is opened before the fork; every worker connects to
+# Redis and the DB itself and starts the socket background tasks in
+# post_worker_init (app.init_worker). Set PRELOAD_APP=0 to load per worker.
+import gc
+import os
+
+os.environ.setdefault("PRELOAD_APP", "1")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "eventlet"
+preload_app = os.environ["PRELOAD_APP"] == "1"
+
+# A socket shard is addressed by SOCKET_SHARD_URL, which every worker behind one
+# bind would share; run one single-worker gunicorn (own BIND and URL) per shard
+if os.getenv("SHARDING_ENABLED", "0") == "1" and workers != 1:
+    raise RuntimeError("SHARDING_ENABLED needs WEB_CONCURRENCY=1: run one gunicorn per shard")
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the collector's generations, so GC
+    # passes in the workers do not write to (and un-share) the parent's pages
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Not post_fork: the eventlet worker installs a fresh hub after that hook,
+    # which would drop any greenlets started there
+    from app import app, init_worker
+    init_worker(app)
@@ -0,0 +1,48 @@
+"""room archive
+
+Revision ID: 3e7b9c2d4f10
+Revises: 8d2f4b7a1c63
+Create Date: 2026-10-19 16:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e7b9c2d4f10'
+down_revision = '8d2f4b7a1c63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archived_rooms',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('mode', sa.String(length=20), nullable=False),
+    sa.Column('max_participants', sa.Integer(), nullable=True),
+    sa.Column('max_speakers', sa.Integer(), nullable=True),
+    sa.Column('last_active_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_archived_rooms'))
+    )
+    op.create_table('archived_room_participants',
+    sa.Column('room_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('joined_at', sa.DateTime(), nullable=True),
+    sa.Column('is_muted', sa.Boolean(), nullable=True),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=True),
+    sa.Column('session_seconds', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['room_id'], ['archived_rooms.id'], name=op.f('fk_archived_room_participants_room_id_archived_rooms')),
+    sa.PrimaryKeyConstraint('room_id', 'id', name=op.f('pk_archived_room_participants'))
+    )
+
+
+def downgrade():
+    op.drop_table('archived_room_participants')
+    op.drop_table('archived_rooms')
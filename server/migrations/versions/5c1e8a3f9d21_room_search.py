@@ -0,0 +1,85 @@
+"""room search index
+
+Revision ID: 5c1e8a3f9d21
+Revises: bf6d7eeae5a3
+Create Date: 2026-10-19 11:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e8a3f9d21'
+down_revision = 'bf6d7eeae5a3'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE rooms_fts USING fts5(
+        name, description,
+        content='rooms', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER rooms_fts_ai AFTER INSERT ON rooms BEGIN
+        INSERT INTO rooms_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER rooms_fts_ad AFTER DELETE ON rooms BEGIN
+        INSERT INTO rooms_fts(rooms_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER rooms_fts_au AFTER UPDATE OF name, description ON rooms BEGIN
+        INSERT INTO rooms_fts(rooms_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO rooms_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    "INSERT INTO rooms_fts(rooms_fts) VALUES('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS rooms_fts_au",
+    "DROP TRIGGER IF EXISTS rooms_fts_ad",
+    "DROP TRIGGER IF EXISTS rooms_fts_ai",
+    "DROP TABLE IF EXISTS rooms_fts",
+]
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE rooms ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX ix_rooms_search_vector ON rooms USING gin (search_vector)",
+    "CREATE INDEX ix_rooms_name_trgm ON rooms USING gin (lower(name) gin_trgm_ops)",
+    "CREATE INDEX ix_rooms_name_prefix ON rooms (lower(name) text_pattern_ops)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_rooms_name_prefix",
+    "DROP INDEX IF EXISTS ix_rooms_name_trgm",
+    "DROP INDEX IF EXISTS ix_rooms_search_vector",
+    "ALTER TABLE rooms DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements_by_dialect):
+    statements = statements_by_dialect.get(op.get_bind().dialect.name, [])
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def upgrade():
+    _run({'sqlite': SQLITE_UPGRADE, 'postgresql': POSTGRES_UPGRADE})
+
+
+def downgrade():
+    _run({'sqlite': SQLITE_DOWNGRADE, 'postgresql': POSTGRES_DOWNGRADE})
@@ -0,0 +1,26 @@
+"""archived member index
+
+Revision ID: 6a4d2e9b1f35
+Revises: 3e7b9c2d4f10
+Create Date: 2026-10-19 18:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a4d2e9b1f35'
+down_revision = '3e7b9c2d4f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('archived_room_participants', schema=None) as batch_op:
+        batch_op.create_index('ix_archived_room_participants_user_id', ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('archived_room_participants', schema=None) as batch_op:
+        batch_op.drop_index('ix_archived_room_participants_user_id')
@@ -0,0 +1,31 @@
+"""participant activity
+
+Revision ID: 8d2f4b7a1c63
+Revises: 5c1e8a3f9d21
+Create Date: 2026-10-19 14:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f4b7a1c63'
+down_revision = '5c1e8a3f9d21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('room_participants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_seen_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('session_seconds', sa.Integer(), server_default='0', nullable=False))
+        # activity flushes update by (room_id, user_id)
+        batch_op.create_index('ix_room_participants_room_id_user_id', ['room_id', 'user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('room_participants', schema=None) as batch_op:
+        batch_op.drop_index('ix_room_participants_room_id_user_id')
+        batch_op.drop_column('session_seconds')
+        batch_op.drop_column('last_seen_at')
@@ -0,0 +1,30 @@
+"""stage rooms
+
+Revision ID: bf6d7eeae5a3
+Revises: 240acd37101a
+Create Date: 2026-10-19 09:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bf6d7eeae5a3'
+down_revision = '240acd37101a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('rooms', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('mode', sa.String(length=20), server_default='mesh', nullable=False))
+        batch_op.add_column(sa.Column('max_participants', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('max_speakers', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('rooms', schema=None) as batch_op:
+        batch_op.drop_column('max_speakers')
+        batch_op.drop_column('max_participants')
+        batch_op.drop_column('mode')
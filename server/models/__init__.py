@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import MetaData
+from utils.db_routing import RoutingSession
 
 # Configure naming convention for constraints
 metadata = MetaData(naming_convention={
@@ -10,9 +11,10 @@ metadata = MetaData(naming_convention={
     "pk": "pk_%(table_name)s"
 })
 
-db = SQLAlchemy(metadata=metadata)
+# Reads made while serving GET requests may be routed to a replica bind
+db = SQLAlchemy(metadata=metadata, session_options={"class_": RoutingSession})
 
 # Import models so they are registered with SQLAlchemy
 from models.user import User
-from models.room import Room, RoomParticipant
+from models.room import Room, RoomParticipant, ArchivedRoom, ArchivedRoomParticipant
 from models.notification import Notification
\ No newline at end of file
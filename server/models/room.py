@@ -1,5 +1,13 @@
+from flask import current_app
 from models import db
 
+def room_limits(mode, max_participants, max_speakers, config):
+    """(capacity, speaker limit) for a room's columns, falling back to config defaults."""
+    stage = mode == 'stage'
+    capacity = max_participants or config["STAGE_DEFAULT_CAPACITY" if stage else "DEFAULT_ROOM_CAPACITY"]
+    speakers = (max_speakers or config["STAGE_DEFAULT_SPEAKERS"]) if stage else capacity
+    return capacity, speakers
+
 class Room(db.Model):
     __tablename__ = 'rooms'
 
@@ -8,20 +16,83 @@ class Room(db.Model):
     description = db.Column(db.Text, nullable=True)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    mode = db.Column(db.String(20), nullable=False, default='mesh', server_default='mesh')  # 'mesh' or 'stage'
+    max_participants = db.Column(db.Integer, nullable=True)  # None -> config default for the mode
+    max_speakers = db.Column(db.Integer, nullable=True)  # stage rooms only
 
     # Relationships
     creator = db.relationship('User', backref=db.backref('created_rooms', lazy=True), foreign_keys=[created_by])
     participants = db.relationship('RoomParticipant', backref='room', lazy=True)
     notifications = db.relationship('Notification', backref='room', lazy=True)
 
+    @property
+    def is_stage(self):
+        return self.mode == 'stage'
+
+    @property
+    def capacity(self):
+        """Maximum members (mesh peers, or speakers plus listeners on a stage)."""
+        return room_limits(self.mode, self.max_participants, self.max_speakers, current_app.config)[0]
+
+    @property
+    def speaker_limit(self):
+        """Size of the WebRTC mesh; every member is a speaker in mesh rooms."""
+        return room_limits(self.mode, self.max_participants, self.max_speakers, current_app.config)[1]
+
 
 class RoomParticipant(db.Model):
     __tablename__ = 'room_participants'
+    __table_args__ = (
+        db.Index('ix_room_participants_room_id_user_id', 'room_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     room_id = db.Column(db.Integer, db.ForeignKey('rooms.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     joined_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     is_muted = db.Column(db.Boolean, default=False)
+    # written behind by utils.activity.ActivityBuffer, not per socket event
+    last_seen_at = db.Column(db.DateTime, nullable=True)
+    session_seconds = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     user = db.relationship('User', backref=db.backref('room_participations', lazy=True))
+
+
+class ArchivedRoom(db.Model):
+    """A room moved out of ``rooms`` by utils.archive.RoomArchive; keeps its original id."""
+    __tablename__ = 'archived_rooms'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=True)
+    mode = db.Column(db.String(20), nullable=False)
+    max_participants = db.Column(db.Integer, nullable=True)
+    max_speakers = db.Column(db.Integer, nullable=True)
+    last_active_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    @property
+    def capacity(self):
+        return room_limits(self.mode, self.max_participants, self.max_speakers, current_app.config)[0]
+
+    @property
+    def speaker_limit(self):
+        return room_limits(self.mode, self.max_participants, self.max_speakers, current_app.config)[1]
+
+
+class ArchivedRoomParticipant(db.Model):
+    """Membership rows of an archived room; keyed (room_id, id) so restores read one PK range."""
+    __tablename__ = 'archived_room_participants'
+    __table_args__ = (
+        db.Index('ix_archived_room_participants_user_id', 'user_id'),  # members' /rooms lists
+    )
+
+    room_id = db.Column(db.Integer, db.ForeignKey('archived_rooms.id'), primary_key=True, autoincrement=False)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    joined_at = db.Column(db.DateTime, nullable=True)
+    is_muted = db.Column(db.Boolean, nullable=True)
+    last_seen_at = db.Column(db.DateTime, nullable=True)
+    session_seconds = db.Column(db.Integer, nullable=False, default=0, server_default='0')
@@ -1,15 +1,22 @@
-from flask import redirect, jsonify, url_for, request
+from flask import redirect, jsonify, url_for, request, current_app
 from flask_restful import Resource
-from flask_dance.contrib.google import google
 from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
-from models import db, User
 from flask_bcrypt import Bcrypt
 import phonenumbers
 from urllib.parse import urlencode
+from utils.rate_limit import rate_limit
+from utils.db_routing import pin_to_primary, primary_only
+from utils.accounts import UserDirectory
 
 bcrypt = Bcrypt()
 class GoogleAuth(Resource):
+    @rate_limit("auth.google", scope="ip")
+    @primary_only
     def get(self):
+        if "google" not in current_app.blueprints:
+            return {"error": "Google sign-in is not configured"}, 404
+        from flask_dance.contrib.google import google
+
         if not google.authorized:
             return redirect(url_for("google.login"))
 
@@ -22,21 +29,19 @@ class GoogleAuth(Resource):
         name = user_info.get("name", "")
         profile = user_info.get("picture", "")
 
-        # Check if user exists, else create
-        user = User.query.filter_by(email=email).first()
-        if not user:
-            user = User(email=email, name=name, profile=profile)
-            db.session.add(user)
-            db.session.commit()
+        # Fetch or create in one INSERT ... ON CONFLICT (none at all when cached)
+        user = UserDirectory.upsert_oauth_user(email, name, profile)
+        pin_to_primary(user["id"])
 
         # Create JWT token
-        access_token = create_access_token(identity=str(user.id))
-        redirect_url = f"https://blubbb.vercel.app/auth?{urlencode({'token': access_token, 'email': user.email, 'id': user.id, 'name': user.name, 'profile': user.profile})}"
+        access_token = create_access_token(identity=str(user["id"]))
+        redirect_url = f"https://blubbb.vercel.app/auth?{urlencode({'token': access_token, 'email': user['email'], 'id': user['id'], 'name': user['name'], 'profile': user['profile']})}"
         return redirect(redirect_url)
         # return {"access_token": access_token, "user": {"id": user.id, "email": user.email, "profile":user.profile, "name": user.name}}, 200
 
 class Login(Resource):
     
+    @rate_limit("auth.signin", scope="ip")
     def post(self):
         # This route is for handling login via username/password
         # Implementation would go here, similar to the GoogleAuth route
@@ -44,14 +49,16 @@ class Login(Resource):
         email = args.get('email')
         password = args.get('password')
         
-        user = User.query.filter_by(email=email).first()
-        if user and bcrypt.check_password_hash(user.password, password):
-            access_token = create_access_token(identity=str(user.id))
-            return {"access_token": access_token, "user": {"id": user.id, "email": user.email, 'name': user.name, 'profile': user.profile}}, 200
+        # The hash always comes from the DB; it is never cached
+        user, password_hash = UserDirectory.for_signin(email)
+        if user and password_hash and bcrypt.check_password_hash(password_hash, password):
+            access_token = create_access_token(identity=str(user["id"]))
+            return {"access_token": access_token, "user": {"id": user["id"], "email": user["email"], 'name': user['name'], 'profile': user['profile']}}, 200
         else:
             return {"error": "Invalid credentials"}, 401
         
 class Register(Resource):
+    @rate_limit("auth.signup", scope="ip")
     def post(self):
         # This route is for handling user registration
         args = request.get_json()
@@ -59,14 +66,17 @@ class Register(Resource):
         password = args.get('password')
         name = args.get('name', '')
         
-        if User.query.filter_by(email=email).first():
+        if not email or not password:
+            return {"error": "Email and password are required"}, 400
+        # Known emails skip the bcrypt hash; the insert itself settles the rest
+        if UserDirectory.cached(email):
             return {"error": "User already exists"}, 400
         
         hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-        new_user = User(email=email, password=hashed_password, name=name)
-        
-        db.session.add(new_user)
-        db.session.commit()
+        new_user = UserDirectory.register(email, hashed_password, name)
+        if new_user is None:
+            return {"error": "User already exists"}, 400
+        pin_to_primary(new_user["id"])
         
         return {"message": "User registered successfully, you can now loggin"}, 201
     
\ No newline at end of file
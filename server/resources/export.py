@@ -0,0 +1,41 @@
+from flask import Response, request, stream_with_context
+from flask_restful import Resource
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from models import User
+from resources.user_info import is_service_request
+from utils.export import EXPORTS, Export, parse_time
+from utils.rate_limit import rate_limit
+
+
+class ExportResource(Resource):
+    @rate_limit("admin.export", scope="ip")
+    def get(self, kind):
+        """Stream a table as NDJSON: /export/<kind>?since=&until=&room_id=
+
+        Service callers (X-Service-Token) and admins only. Gzipped when the
+        client sends Accept-Encoding: gzip.
+        """
+        if not is_service_request():
+            verify_jwt_in_request()
+            user = User.query.get(get_jwt_identity())
+            if not user or user.role != "admin":
+                return {"error": "Admin access required"}, 403
+
+        if kind not in EXPORTS:
+            return {"error": f"kind must be one of {', '.join(sorted(EXPORTS))}"}, 404
+        try:
+            filters = {
+                "since": parse_time(request.args.get("since")),
+                "until": parse_time(request.args.get("until")),
+                "room_id": request.args.get("room_id", type=int),
+            }
+        except ValueError:
+            return {"error": "since and until must be ISO 8601 times"}, 400
+
+        # The generator runs after this returns; keep the request (and its DB session) alive for it
+        chunks = Export.iter_ndjson(kind, **filters)
+        headers = {"Content-Disposition": f'attachment; filename="{kind}.ndjson"', "Vary": "Accept-Encoding"}
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            chunks = Export.gzipped(chunks)
+            headers["Content-Encoding"] = "gzip"
+        return Response(stream_with_context(chunks), mimetype="application/x-ndjson", headers=headers)
@@ -1,9 +1,21 @@
-from flask import request, current_app
+from flask import request, current_app, g
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Room, RoomParticipant, User
+from utils.membership import MembershipIndex
+from utils.rate_limit import rate_limit
+from utils.search import RoomSearch
+from utils.activity import ActivityBuffer
+from utils.archive import RoomArchive
+from utils.occupancy import GRANULARITIES, RoomStats
+from utils.cache_store import CacheStore
+from utils.redis_pool import coalesced
+from utils.db_routing import primary_reads, reading_from_replica
+from utils.fields import requested_fields
 from datetime import datetime
 import json
+import time
+import redis
 from functools import wraps
 
 
@@ -76,112 +88,437 @@ def invalidate_cache(*patterns):
     return decorator
 
 
+def serialize_participant(participant):
+    """Serialize a RoomParticipant (with its user loaded) for API responses."""
+    return {
+        "id": participant.user.id,
+        "name": participant.user.name,
+        "profile": participant.user.profile,
+        "joined_at": participant.joined_at.isoformat() if participant.joined_at else None,
+        "is_muted": getattr(participant, 'is_muted', False),
+        "last_seen_at": participant.last_seen_at.isoformat() if participant.last_seen_at else None,
+        "session_seconds": participant.session_seconds or 0
+    }
+
+
+def serialize_creator(user):
+    return {"id": user.id, "name": user.name, "profile": user.profile} if user else None
+
+
+def serialize_room_details(room):
+    """Serialize a Room with creator and participants loaded."""
+    creator = serialize_creator(room.creator) if hasattr(room, 'creator') else None
+
+    return {
+        "id": room.id,
+        "name": room.name,
+        "description": room.description,
+        "created_by": room.created_by,
+        "created_at": room.created_at.isoformat(),
+        "participants_count": len(room.participants),
+        "mode": room.mode,
+        "max_participants": room.capacity,
+        "max_speakers": room.speaker_limit,
+        "is_full": len(room.participants) >= room.capacity,
+        "creator": creator,
+        "participants": [serialize_participant(p) for p in room.participants]
+    }
+
+
+# ?fields= sparse fieldsets. ROOM_SUMMARY_FIELDS is the /rooms list entry.
+ROOM_FIELDS = ("id", "name", "description", "created_by", "created_at", "mode", "max_participants",
+               "max_speakers", "participants_count", "is_full", "creator", "participants")
+ROOM_SUMMARY_FIELDS = ("id", "name", "description", "created_by", "created_at", "participants_count",
+                       "mode", "max_participants")
+PARTICIPANT_FIELDS = ("id", "name", "profile", "joined_at", "is_muted", "last_seen_at", "session_seconds")
+
+# Room columns each field reads; the capacity fields derive from all three limit columns
+_LIMIT_COLUMNS = (Room.mode, Room.max_participants, Room.max_speakers)
+ROOM_FIELD_COLUMNS = {
+    "name": (Room.name,),
+    "description": (Room.description,),
+    "created_by": (Room.created_by,),
+    "created_at": (Room.created_at,),
+    "mode": (Room.mode,),
+    "max_participants": _LIMIT_COLUMNS,
+    "max_speakers": _LIMIT_COLUMNS,
+    "is_full": _LIMIT_COLUMNS,
+    "creator": (Room.created_by,),
+}
+PARTICIPANT_FIELD_COLUMNS = {
+    "joined_at": RoomParticipant.joined_at,
+    "is_muted": RoomParticipant.is_muted,
+    "last_seen_at": RoomParticipant.last_seen_at,
+    "session_seconds": RoomParticipant.session_seconds,
+}
+
+
+def room_projection_query(fields):
+    """A Room query loading only the columns and relationships the fields need.
+
+    participants_count is not loaded here; it comes from the membership
+    index unless the participants themselves are requested.
+    """
+    columns = [Room.id] + [column for name in fields for column in ROOM_FIELD_COLUMNS.get(name, ())]
+    options = [db.load_only(*dict.fromkeys(columns))]
+    if "creator" in fields:
+        options.append(db.joinedload(Room.creator).load_only(User.id, User.name, User.profile))
+    if "participants" in fields:
+        options.append(db.joinedload(Room.participants).joinedload(RoomParticipant.user))
+    return db.session.query(Room).options(*options)
+
+
+def serialize_room_fields(room, fields, participants_count=None):
+    """The requested ROOM_FIELDS of a Room from room_projection_query."""
+    if participants_count is None and "participants" in fields:
+        participants_count = len(room.participants)
+    values = {
+        "id": lambda: room.id,
+        "name": lambda: room.name,
+        "description": lambda: room.description,
+        "created_by": lambda: room.created_by,
+        "created_at": lambda: room.created_at.isoformat() if room.created_at else None,
+        "mode": lambda: room.mode,
+        "max_participants": lambda: room.capacity,
+        "max_speakers": lambda: room.speaker_limit,
+        "participants_count": lambda: participants_count,
+        "is_full": lambda: participants_count >= room.capacity,
+        "creator": lambda: serialize_creator(room.creator),
+        "participants": lambda: [serialize_participant(p) for p in room.participants],
+    }
+    return {name: values[name]() for name in fields}
+
+
+def participant_projection_query(room_id, fields):
+    """A room's RoomParticipant rows with only the requested columns; users joined only for name/profile."""
+    columns = [RoomParticipant.id, RoomParticipant.user_id]
+    columns += [PARTICIPANT_FIELD_COLUMNS[name] for name in fields if name in PARTICIPANT_FIELD_COLUMNS]
+    query = (
+        db.session.query(RoomParticipant)
+        .filter(RoomParticipant.room_id == room_id)
+        .options(db.load_only(*columns))
+        .order_by(RoomParticipant.id)
+    )
+    if "name" in fields or "profile" in fields:
+        query = query.options(db.joinedload(RoomParticipant.user).load_only(User.id, User.name, User.profile))
+    return query
+
+
+def serialize_participant_fields(participant, fields):
+    """The requested PARTICIPANT_FIELDS of a row from participant_projection_query."""
+    values = {
+        "id": lambda: participant.user_id,
+        "name": lambda: participant.user.name,
+        "profile": lambda: participant.user.profile,
+        "joined_at": lambda: participant.joined_at.isoformat() if participant.joined_at else None,
+        "is_muted": lambda: participant.is_muted,
+        "last_seen_at": lambda: participant.last_seen_at.isoformat() if participant.last_seen_at else None,
+        "session_seconds": lambda: participant.session_seconds or 0,
+    }
+    return {name: values[name]() for name in fields}
+
+
+def invalidate_namespaces(room=False, user=False):
+    """Decorator to bump room/user cache generations after successful operations."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(self, *args, **kwargs):
+            result = f(self, *args, **kwargs)
+
+            # Only invalidate on successful operations
+            if isinstance(result, tuple) and len(result) == 2:
+                _, status_code = result
+                if status_code in [200, 201]:
+                    room_id = kwargs.get('room_id') or (args[0] if args else None)
+                    if room and room_id is not None:
+                        CacheManager.bump_room_generation(room_id)
+                    if user:
+                        CacheManager.bump_user_generation(get_jwt_identity())
+
+            return result
+        return wrapper
+    return decorator
+
+
 class CacheManager:
-    """Centralized cache management for room-related data."""
+    """Centralized cache management for room-related data.
+
+    Room and user keys embed a generation counter (``room:{id}:g{n}:...``).
+    Bumping a generation orphans every key derived from it in one INCR; the
+    orphans simply age out through their TTLs. ?fields= projections get keys
+    of their own (``room:{id}:g{n}:{fields}:details``) under the same
+    generation. Payloads go through utils.cache_store.CacheStore
+    (compressed, deduplicated, size-accounted).
+    """
+
+    DETAILS_TIMEOUT = 120
+    PARTICIPANTS_TIMEOUT = 60
+    COUNT_TIMEOUT = 60
+    USER_ROOMS_TIMEOUT = 180
+    # one per key family, for `flask cache report`
+    KEY_PATTERNS = ("room:*:g*:details", "room:*:g*:participants", "room:*:g*:count", "user:*:g*:rooms")
+
+    @staticmethod
+    def get_room_generation_key(room_id):
+        return f"gen:room:{room_id}"
+
+    @staticmethod
+    def get_user_generation_key(user_id):
+        return f"gen:user:{user_id}"
+
+    @staticmethod
+    def _get_generation(key):
+        """Read a generation counter, memoized for the current app context."""
+        generations = g.setdefault("cache_generations", {})
+        if key not in generations:
+            generation = current_app.cache.get(key)
+            if generation is None:
+                # Seed with the clock so an evicted counter never reuses an old generation
+                generation = current_app.cache.cache.inc(key, delta=int(time.time() * 1000))
+            # None: Redis is unreachable, so nothing is cached under any generation anyway
+            generations[key] = int(generation) if generation is not None else 0
+        return generations[key]
+
+    @staticmethod
+    def _incr_generations(keys):
+        """INCR generation counters in one MULTI, seeding missing ones from the clock as _get_generation does.
+
+        A bare INCR on an evicted counter would restart it at 1 and bring old
+        generations, and anything still cached under them, back into use.
+        Each counter is also flagged as recently bumped (see settled).
+        Returns the new values, or None when Redis is unreachable.
+        """
+        seed = int(time.time() * 1000)
+        window = current_app.config["DB_PRIMARY_PIN_SECONDS"]
+        backend = current_app.cache.cache
+        client = getattr(backend, "_write_client", None)
+        if client is None:
+            # backends without pipelines (SimpleCache)
+            for key in keys:
+                backend.add(key, seed)
+                backend.set(CacheManager._bumped_key(key), 1, timeout=window)
+            values = [backend.inc(key) for key in keys]
+        else:
+            try:
+                pipe = client.pipeline(transaction=True)
+                for key in keys:
+                    pipe.set(f"{backend._get_prefix()}{key}", seed, nx=True)
+                    pipe.incr(f"{backend._get_prefix()}{key}")
+                    pipe.set(f"{backend._get_prefix()}{CacheManager._bumped_key(key)}", 1, ex=window)
+                values = pipe.execute()[1::3]
+            except redis.RedisError:
+                # Redis is down; entries written before the outage age out through their TTLs
+                return None
+        generations = g.setdefault("cache_generations", {})
+        for key, value in zip(keys, values):
+            if value is not None:
+                generations[key] = int(value)
+        return values
+
+    @staticmethod
+    def _bumped_key(key):
+        return f"{key}:bumped"
+
+    @staticmethod
+    def settled(keys):
+        """The generation keys whose views may be cached from DB rows this request just read.
+
+        Pins keep a writer's own reads on the primary, but anyone else's
+        replica read can still miss a write that has already bumped the
+        generation, and would cache the old rows under the new one. After
+        a replica read, a key is unsettled if its generation moved since
+        this request memoized it, or was bumped within
+        DB_PRIMARY_PIN_SECONDS (the replica lag we allow for); the rows are
+        still served, just not cached. One MGET; none settle while Redis is down.
+        """
+        keys = list(keys)
+        if not keys or not reading_from_replica():
+            return set(keys)
+        values = current_app.cache.get_many(*keys, *(CacheManager._bumped_key(key) for key in keys))
+        generations = g.setdefault("cache_generations", {})
+        return {
+            key for key, generation, bumped in zip(keys, values, values[len(keys):])
+            if generation is not None and not bumped and int(generation) == generations.get(key, int(generation))
+        }
+
+    @staticmethod
+    def fillable(room_ids=(), user_ids=()):
+        """Whether rows just read for these rooms and users may be cached (see settled)."""
+        keys = [CacheManager.get_room_generation_key(room_id) for room_id in room_ids]
+        keys += [CacheManager.get_user_generation_key(user_id) for user_id in user_ids]
+        return len(CacheManager.settled(keys)) == len(keys)
+
+    @staticmethod
+    def _bump_generation(key):
+        values = CacheManager._incr_generations([key])
+        return values[0] if values else None
+
+    @staticmethod
+    def room_namespace(room_id):
+        return f"room:{room_id}:g{CacheManager._get_generation(CacheManager.get_room_generation_key(room_id))}"
+
+    @staticmethod
+    def user_namespace(user_id):
+        return f"user:{user_id}:g{CacheManager._get_generation(CacheManager.get_user_generation_key(user_id))}"
+
+    @staticmethod
+    def bump_room_generation(room_id):
+        """Invalidate every cached view of a room, for all users, in O(1)."""
+        return CacheManager._bump_generation(CacheManager.get_room_generation_key(room_id))
+
+    @staticmethod
+    def bump_user_generation(user_id):
+        """Invalidate every cached view owned by a user in O(1)."""
+        return CacheManager._bump_generation(CacheManager.get_user_generation_key(user_id))
+
+    @staticmethod
+    def load_room_generations(room_ids):
+        """Memoize many rooms' generations with one MGET, seeding any that are missing.
+
+        Call it before reading the DB for data that will be cached under these
+        generations: a write landing after the read then bumps past them, so
+        the snapshot can only be cached under a generation it predates.
+        """
+        generations = g.setdefault("cache_generations", {})
+        keys = [CacheManager.get_room_generation_key(room_id) for room_id in room_ids]
+        keys = [key for key in keys if key not in generations]
+        if not keys:
+            return
+        for key, generation in zip(keys, current_app.cache.get_many(*keys)):
+            if generation is not None:
+                generations[key] = int(generation)
+            else:
+                CacheManager._get_generation(key)
+
+    @staticmethod
+    def room_generations(room_ids):
+        """[[room_id, generation], ...] for storing with a view built from several rooms' data.
+
+        Resolve them before reading the DB, as with load_room_generations.
+        """
+        CacheManager.load_room_generations(room_ids)
+        generations = g.cache_generations
+        return [[room_id, generations[CacheManager.get_room_generation_key(room_id)]] for room_id in room_ids]
+
+    @staticmethod
+    def room_generations_current(room_generations):
+        """Whether no room recorded by room_generations has been bumped since, in one MGET."""
+        if not room_generations:
+            return True
+        keys = [CacheManager.get_room_generation_key(room_id) for room_id, _ in room_generations]
+        current = current_app.cache.get_many(*keys)
+        return all(
+            value is not None and int(value) == generation
+            for value, (_, generation) in zip(current, room_generations)
+        )
+
+    @staticmethod
+    def bump_generations(room_ids=(), user_ids=()):
+        """bump_room_generation/bump_user_generation for many ids in one round trip."""
+        keys = [CacheManager.get_room_generation_key(room_id) for room_id in room_ids]
+        keys += [CacheManager.get_user_generation_key(user_id) for user_id in user_ids]
+        if keys:
+            CacheManager._incr_generations(keys)
     
     @staticmethod
     def get_room_participant_count_key(room_id):
-        return f"room:{room_id}:count"
+        return f"{CacheManager.room_namespace(room_id)}:count"
     
     @staticmethod
-    def cache_room_participant_count(room_id, count, timeout=60):
+    def cache_room_participant_count(room_id, count, timeout=COUNT_TIMEOUT):
         """Cache room participant count."""
         key = CacheManager.get_room_participant_count_key(room_id)
-        current_app.cache.set(key, count, timeout=timeout)
+        CacheStore.set(key, count, timeout)
     
     @staticmethod
     def get_room_participant_count(room_id):
         """Get cached room participant count."""
         key = CacheManager.get_room_participant_count_key(room_id)
-        return current_app.cache.get(key)
+        return CacheStore.get(key)
     
     @staticmethod
-    def get_user_rooms_key(user_id):
-        return f"user:{user_id}:rooms"
+    def _projection(fields):
+        """Key segment for a ?fields= projection; the full view has none."""
+        return f":{','.join(fields)}" if fields else ""
     
     @staticmethod
-    def get_room_participants_key(room_id):
-        return f"room:{room_id}:participants"
+    def get_user_rooms_key(user_id, fields=None):
+        return f"{CacheManager.user_namespace(user_id)}{CacheManager._projection(fields)}:rooms"
     
     @staticmethod
-    def get_room_details_key(room_id):
-        return f"room:{room_id}:details"
+    def get_room_participants_key(room_id, fields=None):
+        return f"{CacheManager.room_namespace(room_id)}{CacheManager._projection(fields)}:participants"
     
     @staticmethod
-    def get_user_room_membership_key(user_id, room_id):
-        return f"user:{user_id}:room:{room_id}:member"
+    def get_room_details_key(room_id, fields=None):
+        return f"{CacheManager.room_namespace(room_id)}{CacheManager._projection(fields)}:details"
     
     @staticmethod
     def invalidate_room_related_cache(user_id, room_id):
         """Invalidate all caches related to a room and user."""
-        keys_to_delete = [
-            CacheManager.get_user_rooms_key(user_id),
-            CacheManager.get_room_participants_key(room_id),
-            CacheManager.get_room_details_key(room_id),
-            CacheManager.get_user_room_membership_key(user_id, room_id),
-            CacheManager.get_room_participant_count_key(room_id)
-        ]
-        
-        for key in keys_to_delete:
-            current_app.cache.delete(key)
+        CacheManager.bump_room_generation(room_id)
+        CacheManager.bump_user_generation(user_id)
     
     @staticmethod
-    def cache_room_membership(user_id, room_id, is_member=True, timeout=300):
-        """Cache user's room membership status."""
-        key = CacheManager.get_user_room_membership_key(user_id, room_id)
-        current_app.cache.set(key, is_member, timeout=timeout)
-    
-    @staticmethod
-    def get_room_membership(user_id, room_id):
-        """Get cached room membership status."""
-        key = CacheManager.get_user_room_membership_key(user_id, room_id)
-        return current_app.cache.get(key)
+    def cache_room_snapshots(room_details):
+        """Cache details, participants and count for many rooms in one pipelined write.
+
+        The participant list is stored once, under the participants key; the
+        details entry references it.
+        """
+        entries = {}
+        for room_data in room_details:
+            room_id = room_data["id"]
+            entries[CacheManager.get_room_details_key(room_id)] = (room_data, CacheManager.DETAILS_TIMEOUT)
+            entries[CacheManager.get_room_participants_key(room_id)] = (room_data["participants"], CacheManager.PARTICIPANTS_TIMEOUT)
+            entries[CacheManager.get_room_participant_count_key(room_id)] = (room_data["participants_count"], CacheManager.COUNT_TIMEOUT)
+        CacheStore.set_many(entries)
 
 
 class RoomListResource(Resource):
     @jwt_required()
     def get(self):
-        """List all rooms for the current user with optimized caching."""
+        """List all rooms for the current user with optimized caching; ?fields= narrows each entry."""
         current_user_id = get_jwt_identity()
-        cache_key = CacheManager.get_user_rooms_key(current_user_id)
+        try:
+            fields = requested_fields(ROOM_SUMMARY_FIELDS)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        cache_key = CacheManager.get_user_rooms_key(current_user_id, fields)
 
-        # Try cache first
-        cached_rooms = current_app.cache.get(cache_key)
-        if cached_rooms:
-            return {"rooms": json.loads(cached_rooms)}, 200
+        # Try cache first. The list lives under the user's generation, but its names and
+        # counts belong to the rooms, so it is only good while their generations hold.
+        cached = CacheStore.get(cache_key)
+        if isinstance(cached, dict) and CacheManager.room_generations_current(cached["generations"]):
+            return {"rooms": cached["rooms"]}, 200
 
-        # Optimized query with eager loading
-        rooms = (
-            db.session.query(Room)
-            .join(RoomParticipant, Room.id == RoomParticipant.room_id)
-            .filter(RoomParticipant.user_id == current_user_id)
-            .options(db.joinedload(Room.participants))  # Eager load participants
-            .all()
-        )
+        room_list = coalesced(cache_key, lambda: self._load(current_user_id, fields or ROOM_SUMMARY_FIELDS, cache_key))
+        return {"rooms": room_list}, 200
 
-        room_list = []
-        for room in rooms:
-            room_data = {
-                "id": room.id,
-                "name": room.name,
-                "description": room.description,
-                "created_by": room.created_by,
-                "created_at": room.created_at.isoformat(),
-                "participants_count": len(room.participants)
-            }
-            room_list.append(room_data)
-            
-            # Cache individual room details while we have them
-            room_cache_key = CacheManager.get_room_details_key(room.id)
-            current_app.cache.set(room_cache_key, json.dumps(room_data), timeout=120)
+    @staticmethod
+    def _load(current_user_id, fields, cache_key):
+        """The user's room summaries from the DB, cached."""
+        # Room ids come from the membership index (SMEMBERS), not a join
+        room_ids = MembershipIndex.user_room_ids(current_user_id)
+        # Fixed before the reads; archived rooms need none, restoring one bumps this user's generation
+        generations = CacheManager.room_generations(room_ids)
+        # Only the summary columns; counts come from the index (pipelined SCARD), not participant rows
+        rooms = room_projection_query(fields).filter(Room.id.in_(room_ids)).all() if room_ids else []
+        counts = MembershipIndex.room_member_counts([room.id for room in rooms]) if "participants_count" in fields else {}
 
-        # Cache the result with longer timeout since room membership doesn't change often
-        current_app.cache.set(cache_key, json.dumps(room_list), timeout=180)
+        room_list = [serialize_room_fields(room, fields, counts.get(room.id)) for room in rooms]
+        # Archived rooms stay listed; opening one restores it
+        room_list += [serialize_room_fields(room, fields, count) for room, count in RoomArchive.member_rooms(current_user_id)]
 
-        return {"rooms": room_list}, 200
+        # Cache the result with longer timeout since room membership doesn't change often.
+        # Summaries are not written to the details keys; those hold full snapshots only.
+        if CacheManager.fillable(room_ids=room_ids, user_ids=[current_user_id]):
+            CacheStore.set(cache_key, {"rooms": room_list, "generations": generations}, CacheManager.USER_ROOMS_TIMEOUT)
+        return room_list
 
     @jwt_required()
-    @invalidate_cache("user:{user_id}:rooms")
+    @invalidate_namespaces(user=True)
+    @rate_limit("rooms.create")
     def post(self):
         """Create a new room with cache invalidation."""
         current_user_id = get_jwt_identity()
@@ -190,13 +527,36 @@ class RoomListResource(Resource):
         if not data or not data.get("name"):
             return {"error": "Room name is required"}, 400
 
+        mode = data.get("mode", "mesh")
+        if mode not in ("mesh", "stage"):
+            return {"error": "Room mode must be 'mesh' or 'stage'"}, 400
+
+        limits = {}
+        for field in ("max_participants", "max_speakers"):
+            value = data.get(field)
+            if value is None:
+                continue
+            if not isinstance(value, int) or value < 1:
+                return {"error": f"{field} must be a positive integer"}, 400
+            limits[field] = value
+
+        # Mesh rooms are bounded by what a full WebRTC mesh can carry
+        mesh_limit = current_app.config["MAX_MESH_SIZE"]
+        if mode == "mesh" and limits.get("max_participants", 0) > mesh_limit:
+            return {"error": f"Mesh rooms allow at most {mesh_limit} participants"}, 400
+        if limits.get("max_speakers", 0) > mesh_limit:
+            return {"error": f"Stage rooms allow at most {mesh_limit} speakers"}, 400
+
         try:
             # Use transaction for atomicity
             with db.session.begin():
                 room = Room(
                     name=data["name"],
                     description=data.get("description", "No description"),
-                    created_by=current_user_id
+                    created_by=current_user_id,
+                    mode=mode,
+                    max_participants=limits.get("max_participants"),
+                    max_speakers=limits.get("max_speakers") if mode == "stage" else None
                 )
                 db.session.add(room)
                 db.session.flush()  # Get the ID without committing
@@ -209,15 +569,19 @@ class RoomListResource(Resource):
                 )
                 db.session.add(participant)
 
-            # Cache the new room membership
-            CacheManager.cache_room_membership(current_user_id, room.id, True)
+            # Index the creator's membership
+            MembershipIndex.add(current_user_id, room.id)
+            RoomStats.record(room.id, "join")
 
             room_data = {
                 "id": room.id,
                 "name": room.name,
                 "description": room.description,
                 "created_by": room.created_by,
-                "created_at": room.created_at.isoformat()
+                "created_at": room.created_at.isoformat(),
+                "mode": room.mode,
+                "max_participants": room.capacity,
+                "max_speakers": room.speaker_limit
             }
 
             return {
@@ -233,29 +597,42 @@ class RoomListResource(Resource):
 class RoomParticipantsResource(Resource):
     @jwt_required()
     def get(self, room_id):
-        """Fetch participants of a room with intelligent caching."""
+        """Fetch participants of a room with intelligent caching; ?fields= narrows each entry."""
         current_user_id = get_jwt_identity()
+        try:
+            fields = requested_fields(PARTICIPANT_FIELDS)
+        except ValueError as e:
+            return {"error": str(e)}, 400
         
-        # Check if user is a member (with caching)
-        is_member = CacheManager.get_room_membership(current_user_id, room_id)
-        if is_member is None:
-            # Check database and cache result
-            participant = RoomParticipant.query.filter_by(
-                room_id=room_id, 
-                user_id=current_user_id
-            ).first()
-            is_member = participant is not None
-            CacheManager.cache_room_membership(current_user_id, room_id, is_member)
+        # Check if user is a member (SISMEMBER on the membership index)
+        is_member = MembershipIndex.is_member(current_user_id, room_id)
+        # Archived rooms come back for their members only
+        if not is_member and RoomArchive.restore(room_id, member_id=current_user_id):
+            is_member = True
+            g.db_primary_only = True  # replicas may not have the restored rows yet
         
         if not is_member:
             return {"error": "Access denied"}, 403
 
-        cache_key = CacheManager.get_room_participants_key(room_id)
-        cached_participants = current_app.cache.get(cache_key)
+        cache_key = CacheManager.get_room_participants_key(room_id, fields)
+        cached_participants = CacheStore.get(cache_key)
         
-        if cached_participants:
-            return {"participants": json.loads(cached_participants)}, 200
+        # Mute state and activity are written behind; overlay what has not been flushed yet
+        if cached_participants is not None:
+            return {"participants": ActivityBuffer.overlay(room_id, cached_participants)}, 200
 
+        if fields is None:
+            participants = coalesced(cache_key, lambda: self._load(room_id, cache_key))
+        else:
+            participants = coalesced(cache_key, lambda: self._load_projection(room_id, fields, cache_key))
+        if participants is None:
+            return {"error": "Room not found"}, 404
+
+        return {"participants": ActivityBuffer.overlay(room_id, participants)}, 200
+
+    @staticmethod
+    def _load(room_id, cache_key):
+        """Serialized participants from the DB, cached; None when there is no room."""
         # Optimized query with eager loading
         room = (
             db.session.query(Room)
@@ -266,75 +643,58 @@ class RoomParticipantsResource(Resource):
         )
         
         if not room:
-            return {"error": "Room not found"}, 404
+            return None
 
-        participants = [
-            {
-                "id": p.user.id,
-                "name": p.user.name,
-                "profile": p.user.profile,
-                "joined_at": p.joined_at.isoformat() if p.joined_at else None,
-                "is_muted": getattr(p, 'is_muted', False)
-            }
-            for p in room.participants
-        ]
+        participants = [serialize_participant(p) for p in room.participants]
 
-        # Cache with shorter timeout since participants can change more frequently
-        current_app.cache.set(cache_key, json.dumps(participants), timeout=60)
-        
-        # Also cache the participant count while we have it
-        CacheManager.cache_room_participant_count(room_id, len(participants))
+        # Cache with shorter timeout since participants can change more frequently,
+        # along with the participant count, in one write
+        if CacheManager.fillable(room_ids=[room_id]):
+            CacheStore.set_many({
+                cache_key: (participants, CacheManager.PARTICIPANTS_TIMEOUT),
+                CacheManager.get_room_participant_count_key(room_id): (len(participants), CacheManager.COUNT_TIMEOUT)
+            })
+        return participants
 
-        return {"participants": participants}, 200
+    @staticmethod
+    def _load_projection(room_id, fields, cache_key):
+        """Only the requested participant columns, cached; users are joined only for name or profile."""
+        participants = [serialize_participant_fields(p, fields) for p in participant_projection_query(room_id, fields)]
+        if CacheManager.fillable(room_ids=[room_id]):
+            CacheStore.set(cache_key, participants, CacheManager.PARTICIPANTS_TIMEOUT)
+        return participants
 
 
 class RoomJoinResource(Resource):
     @jwt_required()
-    @invalidate_cache(
-        lambda user_id, room_id, **kwargs: [
-            CacheManager.get_user_rooms_key(user_id),
-            CacheManager.get_room_participants_key(room_id),
-            CacheManager.get_room_details_key(room_id),
-            CacheManager.get_room_participant_count_key(room_id)
-        ]
-    )
+    @rate_limit("rooms.join")
     def post(self, room_id):
         """Join a room with optimized caching and participant limit."""
         current_user_id = get_jwt_identity()
         
         # Check room existence (use cache if available)
         room_cache_key = CacheManager.get_room_details_key(room_id)
-        cached_room = current_app.cache.get(room_cache_key)
+        cached_room = CacheStore.get(room_cache_key, resolve=False)  # capacity only; skip the participants
         
-        if not cached_room:
+        if cached_room:
+            capacity = cached_room.get("max_participants") or current_app.config["DEFAULT_ROOM_CAPACITY"]
+        else:
             room = Room.query.get(room_id)
+            if not room and RoomArchive.restore(room_id, member_id=current_user_id):
+                room = Room.query.get(room_id)
             if not room:
                 return {"error": "Room not found"}, 404
+            capacity = room.capacity
         
-        # Check existing membership with cache
-        is_member = CacheManager.get_room_membership(current_user_id, room_id)
-        if is_member is None:
-            existing = RoomParticipant.query.filter_by(
-                room_id=room_id, 
-                user_id=current_user_id
-            ).first()
-            if existing:
-                CacheManager.cache_room_membership(current_user_id, room_id, True)
-                return {"message": "Already joined"}, 200
-            is_member = False
-        elif is_member:
+        # Check existing membership against the index
+        if MembershipIndex.is_member(current_user_id, room_id):
             return {"message": "Already joined"}, 200
 
-        # Check room capacity limit (max 10 participants) - try cache first
-        cached_count = CacheManager.get_room_participant_count(room_id)
-        if cached_count is not None:
-            current_participant_count = cached_count
-        else:
-            current_participant_count = RoomParticipant.query.filter_by(room_id=room_id).count()
-            CacheManager.cache_room_participant_count(room_id, current_participant_count)
+        # Check the room's capacity limit - SCARD on the index
+        current_participant_count = MembershipIndex.room_member_count(room_id)
         
-        if current_participant_count >= 10:
-            return {"error": "Room is full. Maximum 10 participants allowed."}, 403
+        if current_participant_count >= capacity:
+            return {"error": f"Room is full. Maximum {capacity} participants allowed."}, 403
 
         try:
             participant = RoomParticipant(
@@ -345,8 +705,10 @@ class RoomJoinResource(Resource):
             db.session.add(participant)
             db.session.commit()
 
-            # Update caches
-            CacheManager.cache_room_membership(current_user_id, room_id, True)
+            # Update index and caches
+            MembershipIndex.add(current_user_id, room_id)
+            CacheManager.invalidate_room_related_cache(current_user_id, room_id)
+            RoomStats.record(room_id, "join")
 
             return {"message": "Joined room successfully"}, 201
 
@@ -357,21 +719,14 @@ class RoomJoinResource(Resource):
 
 class RoomLeaveResource(Resource):
     @jwt_required()
-    @invalidate_cache(
-        lambda user_id, room_id, **kwargs: [
-            CacheManager.get_user_rooms_key(user_id),
-            CacheManager.get_room_participants_key(room_id),
-            CacheManager.get_room_details_key(room_id),
-            CacheManager.get_room_participant_count_key(room_id)
-        ]
-    )
+    @rate_limit("rooms.leave")
     def delete(self, room_id):
         """Leave a room with cache management."""
         current_user_id = get_jwt_identity()
         
-        # Check membership with cache
-        is_member = CacheManager.get_room_membership(current_user_id, room_id)
-        if is_member is False:
+        # Check membership against the index
+        is_member = MembershipIndex.is_member(current_user_id, room_id) or RoomArchive.restore(room_id, member_id=current_user_id)
+        if not is_member:
             return {"error": "Not a participant of this room"}, 400
         
         participant = RoomParticipant.query.filter_by(
@@ -380,16 +735,18 @@ class RoomLeaveResource(Resource):
         ).first()
 
         if not participant:
-            # Update cache to reflect reality
-            CacheManager.cache_room_membership(current_user_id, room_id, False)
+            # The index drifted from the DB; correct it
+            MembershipIndex.remove(current_user_id, room_id)
             return {"error": "Not a participant of this room"}, 400
 
         try:
             db.session.delete(participant)
             db.session.commit()
 
-            # Update caches
-            CacheManager.cache_room_membership(current_user_id, room_id, False)
+            # Update index and caches
+            MembershipIndex.remove(current_user_id, room_id)
+            CacheManager.invalidate_room_related_cache(current_user_id, room_id)
+            RoomStats.record(room_id, "leave")
 
             return {"message": "Left room successfully"}, 200
 
@@ -398,44 +755,256 @@ class RoomLeaveResource(Resource):
             return {"error": "Failed to leave room"}, 500
 
 
+def _batch_cost():
+    operations = (request.get_json(silent=True) or {}).get("operations")
+    return len(operations) if isinstance(operations, list) else 1
+
+
+class RoomBatchResource(Resource):
+    OPERATIONS = ("join", "leave", "detail")
+
+    @jwt_required()
+    @rate_limit("rooms.batch", cost=_batch_cost)
+    def post(self):
+        """Run many join/leave/detail operations: {"operations": [{"op": "join", "room_id": 1}, ...]}
+
+        Items run in order against one membership snapshot, with set-based SQL
+        in a single transaction and pipelined cache updates, so round trips
+        do not grow with the batch. Results come back per item, in order.
+        """
+        current_user_id = get_jwt_identity()
+        user_id = int(current_user_id)
+        operations = (request.get_json(silent=True) or {}).get("operations")
+        max_operations = current_app.config["ROOM_BATCH_MAX_OPERATIONS"]
+        if not isinstance(operations, list) or not operations:
+            return {"error": "operations must be a non-empty list"}, 400
+        if len(operations) > max_operations:
+            return {"error": f"At most {max_operations} operations per batch"}, 400
+
+        results = []
+        for item in operations:
+            op = item.get("op") if isinstance(item, dict) else None
+            room_id = item.get("room_id") if isinstance(item, dict) else None
+            result = {"op": op, "room_id": room_id}
+            if op not in self.OPERATIONS:
+                result.update(status=400, error=f"op must be one of {', '.join(self.OPERATIONS)}")
+            elif not isinstance(room_id, int) or isinstance(room_id, bool):
+                result.update(status=400, error="room_id must be an integer")
+            results.append(result)
+        valid = [result for result in results if "status" not in result]
+        room_ids = sorted({result["room_id"] for result in valid})
+
+        # One query for the rooms; archived ones the caller belongs to are restored first
+        rooms = {room.id: room for room in Room.query.filter(Room.id.in_(room_ids))} if room_ids else {}
+        archived = RoomArchive.archived_ids([room_id for room_id in room_ids if room_id not in rooms])
+        restored = [room_id for room_id in archived if RoomArchive.restore(room_id, member_id=user_id)]
+        if restored:
+            rooms.update((room.id, room) for room in Room.query.filter(Room.id.in_(restored)))
+
+        member_of = MembershipIndex.memberships(user_id, room_ids)
+        counts = MembershipIndex.room_member_counts(
+            sorted({r["room_id"] for r in valid if r["op"] == "join" and r["room_id"] in rooms})
+        )
+
+        # Plan every item against the snapshot, in request order. A leave and a
+        # join of the same room cancel out, so each room ends up in at most one set.
+        to_insert = set()
+        to_delete = set()
+        writes = []  # results whose outcome depends on the commit
+        for result in valid:
+            room_id = result["room_id"]
+            room = rooms.get(room_id)
+            if result["op"] == "join":
+                if room is None:
+                    result.update(status=404, error="Room not found")
+                elif room_id in member_of:
+                    result.update(status=200, message="Already joined")
+                elif counts[room_id] >= room.capacity:
+                    result.update(status=403, error=f"Room is full. Maximum {room.capacity} participants allowed.")
+                else:
+                    if room_id in to_delete:
+                        to_delete.discard(room_id)  # left earlier in this batch; the row stays
+                    else:
+                        to_insert.add(room_id)
+                    member_of.add(room_id)
+                    counts[room_id] += 1
+                    writes.append(result)
+                    result.update(status=201, message="Joined room successfully")
+            elif result["op"] == "leave":
+                if room_id not in member_of:
+                    result.update(status=400, error="Not a participant of this room")
+                else:
+                    if room_id in to_insert:
+                        to_insert.discard(room_id)  # joined earlier in this batch
+                    else:
+                        to_delete.add(room_id)
+                    member_of.discard(room_id)
+                    if room_id in counts:
+                        counts[room_id] -= 1
+                    writes.append(result)
+                    result.update(status=200, message="Left room successfully")
+            elif room is None:
+                result.update(status=404, error="Room not found")
+
+        if to_insert or to_delete:
+            participants = RoomParticipant.__table__
+            try:
+                if to_delete:
+                    db.session.execute(participants.delete().where(
+                        participants.c.user_id == user_id, participants.c.room_id.in_(to_delete)
+                    ))
+                if to_insert:
+                    now = datetime.utcnow()
+                    db.session.execute(participants.insert(), [
+                        {"room_id": room_id, "user_id": user_id, "joined_at": now, "is_muted": False}
+                        for room_id in sorted(to_insert)
+                    ])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # Only joins and leaves whose rows were rolled back failed; pairs that
+                # cancelled out, "Already joined" and details wrote nothing
+                for result in writes:
+                    if result["room_id"] in to_insert or result["room_id"] in to_delete:
+                        result.update(status=500, error=f"Failed to {result['op']} room")
+                        result.pop("message", None)
+                to_insert, to_delete = set(), set()
+
+        if to_insert or to_delete:
+            MembershipIndex.add_many([(user_id, room_id) for room_id in to_insert])
+            MembershipIndex.remove_many([(user_id, room_id) for room_id in to_delete])
+            CacheManager.bump_generations(room_ids=sorted(to_insert | to_delete), user_ids=[user_id])
+            RoomStats.record_many(
+                [(room_id, "join") for room_id in sorted(to_insert)] + [(room_id, "leave") for room_id in sorted(to_delete)]
+            )
+
+        details = self._details(sorted({r["room_id"] for r in valid if r["op"] == "detail" and r.get("status") is None}))
+        for result in valid:
+            if result["op"] == "detail" and result.get("status") is None:
+                result.update(status=200, room=details[result["room_id"]])
+
+        return {"results": results}, 200
+
+    @staticmethod
+    def _details(room_ids):
+        """Room details for many rooms: one MGET, one query for the misses, pipelined cache writes."""
+        if not room_ids:
+            return {}
+        CacheManager.load_room_generations(room_ids)
+        keys = [CacheManager.get_room_details_key(room_id) for room_id in room_ids]
+        details = {room_id: cached for room_id, cached in zip(room_ids, CacheStore.get_many(keys)) if cached is not None}
+
+        missing = [room_id for room_id in room_ids if room_id not in details]
+        if missing:
+            fresh = [serialize_room_details(room) for room in (
+                db.session.query(Room)
+                .filter(Room.id.in_(missing))
+                .options(
+                    db.joinedload(Room.participants).joinedload(RoomParticipant.user),
+                    db.joinedload(Room.creator)
+                )
+            )]
+            CacheManager.cache_room_snapshots(fresh)
+            details.update((room_data["id"], room_data) for room_data in fresh)
+
+        ActivityBuffer.overlay_many([(room_id, details[room_id].get("participants")) for room_id in room_ids])
+        return details
+
+
+class RoomStatsResource(Resource):
+    @jwt_required()
+    def get(self, room_id):
+        """Occupancy rollups for a room, newest bucket first, paged with ?before=."""
+        current_user_id = get_jwt_identity()
+        is_member = MembershipIndex.is_member(current_user_id, room_id) or RoomArchive.restore(room_id, member_id=current_user_id)
+        if not is_member:
+            return {"error": "Access denied"}, 403
+
+        granularity = request.args.get("granularity", "minute")
+        if granularity not in GRANULARITIES:
+            return {"error": f"granularity must be one of {', '.join(GRANULARITIES)}"}, 400
+        try:
+            limit = min(max(int(request.args.get("limit", 60)), 1), current_app.config["STATS_MAX_BUCKETS"])
+            before = int(request.args["before"]) if "before" in request.args else None
+        except ValueError:
+            return {"error": "limit and before must be integers"}, 400
+
+        try:
+            buckets, next_before = RoomStats.series(room_id, granularity, limit, before)
+            live = RoomStats.live(room_id)
+        except redis.RedisError as e:
+            # The rollups live only in Redis; there is nothing to fall back to
+            current_app.logger.warning(f"Room stats unavailable for room {room_id}: {e}")
+            return {"error": "Room stats are temporarily unavailable"}, 503
+        return {
+            "room_id": room_id,
+            "granularity": granularity,
+            "live": live,
+            "buckets": buckets,
+            "next_before": next_before
+        }, 200
+
+
+class RoomSearchResource(Resource):
+    @jwt_required()
+    @rate_limit("rooms.search")
+    def get(self):
+        """Search rooms by name and description: /rooms/search?q=...&limit=&offset="""
+        query = request.args.get("q", "").strip()
+        if not query:
+            return {"error": "q is required"}, 400
+        limit = min(max(request.args.get("limit", 20, type=int), 1), current_app.config["SEARCH_MAX_LIMIT"])
+        offset = max(request.args.get("offset", 0, type=int), 0)
+
+        rooms = RoomSearch.search(query, limit=limit, offset=offset)
+        return {
+            "rooms": [{
+                "id": room.id,
+                "name": room.name,
+                "description": room.description,
+                "mode": room.mode,
+                "max_participants": room.capacity,
+                "created_at": room.created_at.isoformat()
+            } for room in rooms],
+            "next_offset": offset + len(rooms) if len(rooms) == limit else None
+        }, 200
+
+
+class RoomSuggestResource(Resource):
+    @jwt_required()
+    @rate_limit("rooms.search")
+    def get(self):
+        """Autocomplete room names for a prefix: /rooms/search/suggest?q=..."""
+        return {"suggestions": RoomSearch.suggest(request.args.get("q", ""))}, 200
+
+
 # Additional utility for bulk cache warming
 class CacheWarmupResource(Resource):
     @jwt_required()
+    @rate_limit("cache.warmup")
     def post(self):
         """Warm up cache for frequently accessed data."""
         current_user_id = get_jwt_identity()
         
-        # Warm up user's rooms
+        # Warm up user's rooms; generations are fixed before anything is read
+        rooms_key = CacheManager.get_user_rooms_key(current_user_id)
+        room_ids = MembershipIndex.user_room_ids(current_user_id)
+        generations = CacheManager.room_generations(room_ids)
         rooms = (
             db.session.query(Room)
-            .join(RoomParticipant, Room.id == RoomParticipant.room_id)
-            .filter(RoomParticipant.user_id == current_user_id)
-            .options(db.joinedload(Room.participants))
+            .filter(Room.id.in_(room_ids))
+            .options(
+                db.joinedload(Room.participants).joinedload(RoomParticipant.user),
+                db.joinedload(Room.creator)
+            )
             .all()
-        )
+        ) if room_ids else []
         
-        room_list = []
-        for room in rooms:
-            room_data = {
-                "id": room.id,
-                "name": room.name,
-                "description": room.description,
-                "created_by": room.created_by,
-                "created_at": room.created_at.isoformat(),
-                "participants_count": len(room.participants)
-            }
-            room_list.append(room_data)
-            
-            # Cache individual room details
-            room_cache_key = CacheManager.get_room_details_key(room.id)
-            current_app.cache.set(room_cache_key, json.dumps(room_data), timeout=120)
-            
-            # Cache membership
-            CacheManager.cache_room_membership(current_user_id, room.id, True)
+        room_list = [serialize_room_fields(room, ROOM_SUMMARY_FIELDS, len(room.participants)) for room in rooms]
         
-        # Cache user's room list
-        user_rooms_key = CacheManager.get_user_rooms_key(current_user_id)
-        current_app.cache.set(user_rooms_key, json.dumps(room_list), timeout=180)
+        # Full snapshots (details, participants, count) for each room, then the user's room list
+        CacheManager.cache_room_snapshots([serialize_room_details(room) for room in rooms])
+        CacheStore.set(rooms_key, {"rooms": room_list, "generations": generations}, CacheManager.USER_ROOMS_TIMEOUT)
         
         return {"message": "Cache warmed up successfully"}, 200
 
@@ -443,31 +1012,47 @@ class CacheWarmupResource(Resource):
 class RoomDetailResource(Resource):
     @jwt_required()
     def get(self, room_id):
-        """Get details of a single room with caching."""
-        current_user_id = get_jwt_identity()
-        
-        # Check if user is a member (with caching)
-        is_member = CacheManager.get_room_membership(current_user_id, room_id)
-        if is_member is None:
-            # Check database and cache result
-            participant = RoomParticipant.query.filter_by(
-                room_id=room_id, 
-                user_id=current_user_id
-            ).first()
-            is_member = participant is not None
-            CacheManager.cache_room_membership(current_user_id, room_id, is_member)
-        
-        # if not is_member:
-        #     return {"error": "Access denied"}, 403
+        """Get details of a single room with caching.
+
+        ?fields= returns only the named fields, e.g. a capacity check with
+        fields=participants_count,is_full,max_participants reads three room
+        columns and the member count, and no participant rows.
+        """
+        try:
+            fields = requested_fields(ROOM_FIELDS)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        # Any signed-in user may read details (clients check capacity before joining),
+        # so there is no membership lookup here
 
         # Try cache first
-        cache_key = CacheManager.get_room_details_key(room_id)
-        cached_room = current_app.cache.get(cache_key)
+        cache_key = CacheManager.get_room_details_key(room_id, fields)
+        room_data = CacheStore.get(cache_key)
         
-        if cached_room:
-            room_data = json.loads(cached_room)
+        if room_data is not None:
+            ActivityBuffer.overlay(room_id, room_data.get("participants"))
             return {"room": room_data}, 200
 
+        # One DB load per room at a time in this worker, however many requests missed
+        if fields is None:
+            load = lambda: self._load(room_id)
+        else:
+            load = lambda: self._load_projection(room_id, fields, cache_key)
+        room_data = coalesced(cache_key, load)
+        # Archived rooms come back for their members only
+        if room_data is None and RoomArchive.restore(room_id, member_id=get_jwt_identity()):
+            with primary_reads():  # replicas may not have the restored rows yet
+                room_data = load()
+        if room_data is None:
+            return {"error": "Room not found"}, 404
+
+        ActivityBuffer.overlay(room_id, room_data.get("participants"))
+        return {"room": room_data}, 200
+
+    @staticmethod
+    def _load(room_id):
+        """Room details from the DB, cached; None when there is no room."""
         # Query database with optimized loading
         room = (
             db.session.query(Room)
@@ -479,49 +1064,26 @@ class RoomDetailResource(Resource):
         )
         
         if not room:
-            return {"error": "Room not found"}, 404
+            return None
 
-        # Get creator info
-        creator = None
-        if hasattr(room, 'creator') and room.creator:
-            creator = {
-                "id": room.creator.id,
-                "name": room.creator.name,
-                "profile": room.creator.profile,
-            }
+        room_data = serialize_room_details(room)
 
-        room_data = {
-            "id": room.id,
-            "name": room.name,
-            "description": room.description,
-            "created_by": room.created_by,
-            "created_at": room.created_at.isoformat(),
-            "participants_count": len(room.participants),
-            "max_participants": 10,
-            "is_full": len(room.participants) >= 10,
-            "creator": creator,
-            "participants": [
-                {
-                    "id": p.user.id,
-                    "name": p.user.name,
-                    "profile": p.user.profile,
-                    "joined_at": p.joined_at.isoformat() if p.joined_at else None,
-                    "is_muted": getattr(p, 'is_muted', False)
-                }
-                for p in room.participants
-            ]
-        }
+        # Cache details, participants list and count in one pass
+        if CacheManager.fillable(room_ids=[room_id]):
+            CacheManager.cache_room_snapshots([room_data])
+        return room_data
 
-        # Cache the result
-        current_app.cache.set(cache_key, json.dumps(room_data), timeout=120)
-        
-        # Also cache participant count and participants list while we have them
-        participants_cache_key = CacheManager.get_room_participants_key(room_id)
-        current_app.cache.set(
-            participants_cache_key, 
-            json.dumps(room_data["participants"]), 
-            timeout=60
-        )
-        CacheManager.cache_room_participant_count(room_id, room_data["participants_count"])
+    @staticmethod
+    def _load_projection(room_id, fields, cache_key):
+        """Only the requested fields, from only the columns they need, cached under their own key."""
+        room = room_projection_query(fields).filter(Room.id == room_id).first()
+        if not room:
+            return None
 
-        return {"room": room_data}, 200
\ No newline at end of file
+        count = None
+        if "participants" not in fields and ("participants_count" in fields or "is_full" in fields):
+            count = MembershipIndex.room_member_count(room_id)
+        room_data = serialize_room_fields(room, fields, count)
+        if CacheManager.fillable(room_ids=[room_id]):
+            CacheStore.set(cache_key, room_data, CacheManager.DETAILS_TIMEOUT)
+        return room_data
@@ -1,11 +1,57 @@
 from flask import Flask, current_app, request
 from flask_restful import Resource
-from models import db, User
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, User, RoomParticipant
+from resources.room import CacheManager
+from utils.accounts import UserDirectory
+from utils.membership import MembershipIndex
+from utils.fields import pick, requested_fields
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+import hmac
 import json
 
+USER_CACHE_TIMEOUT = 300  # seconds (5 minutes)
+USER_FIELDS = ("id", "email", "name", "profile")  # for ?fields=
+
+def serialize_user(user):
+    return {
+        "id": user.id,
+        "email": user.email,
+        "name": user.name,
+        "profile": user.profile
+    }
+
+def load_users(user_ids):
+    """Resolve many users with one MGET over user:{id} and one IN query for the misses."""
+    cache = current_app.cache
+    user_ids = list(dict.fromkeys(int(user_id) for user_id in user_ids))
+    if not user_ids:
+        return {}
+
+    cached = cache.get_many(*[f"user:{user_id}" for user_id in user_ids])
+    users = {user_id: json.loads(data) for user_id, data in zip(user_ids, cached) if data}
+
+    missing = [user_id for user_id in user_ids if user_id not in users]
+    if missing:
+        fresh = {user.id: serialize_user(user) for user in User.query.filter(User.id.in_(missing))}
+        # Users updated within the replica-lag window are served but not cached
+        settled = CacheManager.settled([CacheManager.get_user_generation_key(user_id) for user_id in fresh])
+        cacheable = {
+            f"user:{user_id}": json.dumps(info) for user_id, info in fresh.items()
+            if CacheManager.get_user_generation_key(user_id) in settled
+        }
+        if cacheable:
+            cache.set_many(cacheable, timeout=USER_CACHE_TIMEOUT)
+        users.update(fresh)
+    return users
+
+def is_service_request():
+    """True when the caller presents the internal service token."""
+    expected = current_app.config.get("SERVICE_TOKEN")
+    presented = request.headers.get("X-Service-Token")
+    return bool(expected and presented) and hmac.compare_digest(presented, expected)
+
 class UserInfo(Resource):
-    CACHE_TIMEOUT = 300  # seconds (5 minutes)
+    CACHE_TIMEOUT = USER_CACHE_TIMEOUT
 
     def _get_user_from_cache(self, user_id):
         """Retrieve user info from cache or DB if not found."""
@@ -20,15 +66,11 @@ class UserInfo(Resource):
         if not user:
             return None
 
-        user_info = {
-            "id": user.id,
-            "email": user.email,
-            "name": user.name,
-            "profile": user.profile
-        }
+        user_info = serialize_user(user)
 
         # Store in cache
-        cache.set(f"user:{user_id}", json.dumps(user_info), timeout=self.CACHE_TIMEOUT)
+        if CacheManager.fillable(user_ids=[user_id]):
+            cache.set(f"user:{user_id}", json.dumps(user_info), timeout=self.CACHE_TIMEOUT)
         return user_info
 
     def _invalidate_user_cache(self, user_id):
@@ -38,8 +80,12 @@ class UserInfo(Resource):
 
     @jwt_required()
     def get(self, user_id=None):
-        """Get logged-in user's info (cached)."""
+        """Get logged-in user's info (cached); ?fields= narrows it."""
         current_user_id = get_jwt_identity()
+        try:
+            fields = requested_fields(USER_FIELDS)
+        except ValueError as e:
+            return {"error": str(e)}, 400
 
         # Ensure user can only access their own info unless admins are allowed
         if user_id is None:
@@ -51,7 +97,7 @@ class UserInfo(Resource):
         if not user_info:
             return {"error": "User not found"}, 404
 
-        return {"user": user_info}, 200
+        return {"user": pick(user_info, fields)}, 200
 
     @jwt_required()
     def put(self):
@@ -74,7 +120,54 @@ class UserInfo(Resource):
 
         if updated:
             db.session.commit()
-            self._invalidate_user_cache(user_id)  # clear old cache                                                                                                                                                                                                                                                                                                                                                                         
+            # Name/profile are embedded in room views, so bump each of the user's rooms. The
+            # user's own bump comes before the delete, so replica reads already in flight
+            # don't cache the old record again (CacheManager.settled)
+            room_ids = [room_id for (room_id,) in db.session.query(RoomParticipant.room_id).filter_by(user_id=user_id)]
+            CacheManager.bump_generations(room_ids=room_ids, user_ids=[user_id])
+            self._invalidate_user_cache(user_id)  # clear old cache
+            UserDirectory.invalidate(user.email)  # sign-in responses echo name/profile
             self._get_user_from_cache(user_id)    # refresh cache
 
         return {"message": "User info updated successfully"}, 200
+
+class UserBatchResource(Resource):
+    def get(self):
+        """Details for many users at once: /users?ids=1,2,3.
+
+        Service callers (X-Service-Token) get full records for any user.
+        Signed-in users get the public fields of themselves and of users
+        they share a room with; anyone else is reported as missing, so the
+        endpoint cannot enumerate the user table. ?fields= narrows the
+        records further.
+        The cached entries are a handful of columns, so projections are
+        cut from them rather than cached on their own.
+        """
+        service = is_service_request()
+        if not service:
+            verify_jwt_in_request()
+        try:
+            fields = requested_fields(USER_FIELDS)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        try:
+            user_ids = [int(part) for part in request.args.get("ids", "").split(",") if part.strip()]
+        except ValueError:
+            return {"error": "ids must be a comma-separated list of integers"}, 400
+        if not user_ids:
+            return {"error": "ids is required"}, 400
+        if len(user_ids) > current_app.config["USER_BATCH_MAX_IDS"]:
+            return {"error": f"At most {current_app.config['USER_BATCH_MAX_IDS']} ids per request"}, 400
+
+        if service:
+            users = load_users(user_ids)
+        else:
+            visible = MembershipIndex.room_mates(get_jwt_identity(), user_ids)
+            users = load_users([user_id for user_id in user_ids if user_id in visible])
+            users = {user_id: {k: v for k, v in info.items() if k != "email"} for user_id, info in users.items()}
+
+        return {
+            "users": {str(user_id): pick(info, fields) for user_id, info in users.items()},
+            "missing": [user_id for user_id in dict.fromkeys(user_ids) if user_id not in users]
+        }, 200
@@ -0,0 +1,120 @@
+"""Measure worker boot latency: a cold import per worker vs gunicorn-style preload + fork.
+
+    DATABASE_URL=sqlite:///bench.db REDIS_URL=redis://localhost:6379/0 \
+        python scripts/boot_benchmark.py --workers 4 --top 15
+
+Cold: each worker is a fresh interpreter that imports app (which builds it)
+and serves its first request. Preload: one process imports app once, then
+forks the workers; each only reconnects, starts its background tasks
+(app.init_worker) and serves. Reports per-worker time to the first response,
+private (unshared) memory, and the slowest imports from `python -X importtime`.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLD_CMD = """
+import json, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+module.app.test_client().get("/health")
+served = time.perf_counter()
+print(json.dumps({"import": imported - started, "ready": served - started}))
+"""
+PRELOAD_CMD = """
+import json, os, sys, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+import gc
+gc.freeze()
+read_fd, write_fd = os.pipe()
+for _ in range(int(sys.argv[1])):
+    forked = time.perf_counter()
+    if os.fork() == 0:
+        module.init_worker(module.app)
+        module.app.test_client().get("/health")
+        served = time.perf_counter()
+        private = 0
+        try:
+            with open("/proc/self/smaps_rollup") as f:
+                private = sum(int(line.split()[1]) for line in f if line.startswith("Private_"))
+        except OSError:
+            pass
+        os.write(write_fd, (json.dumps({"ready": served - forked, "private_kb": private}) + "\\n").encode())
+        os._exit(0)
+    os.wait()
+os.close(write_fd)
+with os.fdopen(read_fd) as f:
+    workers = [json.loads(line) for line in f]
+print(json.dumps({"import": imported - started, "workers": workers}))
+"""
+
+
+def run(code, *args, env=None):
+    out = subprocess.run(
+        [sys.executable, "-c", code, *args], cwd=SERVER_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def summary(samples):
+    return f"p50={statistics.median(samples) * 1000:.0f}ms max={max(samples) * 1000:.0f}ms"
+
+
+def cold(args):
+    env = dict(os.environ, PRELOAD_APP="0", PREWARM_ENABLED="0")
+    results = [run(COLD_CMD, env=env) for _ in range(args.workers)]
+    for n, r in enumerate(results):
+        print(f"[cold]    worker {n}: import {r['import'] * 1000:.0f}ms, first response {r['ready'] * 1000:.0f}ms")
+    print(f"[cold]    per-worker boot {summary([r['ready'] for r in results])}")
+
+
+def preload(args):
+    env = dict(os.environ, PRELOAD_APP="1", PREWARM_ENABLED="0")
+    result = run(PRELOAD_CMD, str(args.workers), env=env)
+    print(f"[preload] master import (once) {result['import'] * 1000:.0f}ms")
+    for n, r in enumerate(result["workers"]):
+        private = f", private {r['private_kb'] / 1024:.1f} MiB" if r["private_kb"] else ""
+        print(f"[preload] worker {n}: fork to first response {r['ready'] * 1000:.0f}ms{private}")
+    print(f"[preload] per-worker boot {summary([r['ready'] for r in result['workers']])}")
+
+
+def import_profile(args):
+    env = dict(os.environ, PRELOAD_APP="1", PREWARM_ENABLED="0")
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"], cwd=SERVER_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:  # modules app imports directly: who pays for what
+            rows.append((int(cumulative_us), name.strip()))
+    print("slowest direct imports of app (cumulative):")
+    for cumulative_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f}ms  {name}")
+
+
+def main(args):
+    if args.top:
+        import_profile(args)
+    cold(args)
+    if hasattr(os, "fork"):
+        preload(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list (0 skips the profile)")
+    main(parser.parse_args())
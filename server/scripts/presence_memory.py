@@ -0,0 +1,126 @@
+"""Measure socket presence memory: per-sid detail dicts vs shared user records.
+
+    python scripts/presence_memory.py --sids 50000 --users 20000 --room-size 10
+
+Builds the presence state a worker holds for N connected sids both ways and
+reports traced bytes per connection. Users open several tabs, so sids
+outnumber users. Also times building a room's participant list.
+"""
+import argparse
+import os
+import random
+import secrets
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.presence import SocketSession, UserRecords  # noqa: E402
+
+
+def fetch_user_details(user_id):
+    """Stand-in for the DB fetch on connect: fresh strings on every call, like a row load."""
+    return {
+        "id": user_id,
+        "name": f"User Number {user_id}",
+        "email": f"user.{user_id}@example.com",
+        "profile": f"https://lh3.googleusercontent.com/a/ACg8ocK{user_id:030d}=s96-c",
+        "created_at": f"2025-08-14T23:21:{user_id % 60:02d}.190085",
+    }
+
+
+def connections(args):
+    rng = random.Random(1)
+    for n in range(args.sids):
+        user_id = rng.randrange(1, args.users + 1)
+        yield f"{secrets.token_urlsafe(15)}", user_id, str(n // args.room_size + 1)
+
+
+def build_dicts(conns):
+    """The previous layout: a dict per sid holding its own copy of the user's details."""
+    sid_meta, room_sockets = {}, {}
+    for sid, user_id, rid in conns:
+        sid_meta[sid] = {
+            "user_id": user_id,
+            "room_id": rid,
+            "role": "speaker",
+            "resume_token": secrets.token_urlsafe(16),
+            "user_details": fetch_user_details(user_id),
+        }
+        room_sockets.setdefault(rid, set()).add(sid)
+    return sid_meta, room_sockets
+
+
+def build_compact(conns):
+    users = UserRecords()
+    sid_meta, room_sockets = {}, {}
+    for sid, user_id, rid in conns:
+        previous = users.get(user_id)
+        details = fetch_user_details(user_id)
+        # Same as the connect path: an unchanged refetch reuses the shared record
+        users.acquire(user_id, previous if previous == details else details)
+        sid_meta[sid] = SocketSession(user_id, rid, "speaker", secrets.token_urlsafe(16))
+        room_sockets.setdefault(rid, set()).add(sid)
+    return users, sid_meta, room_sockets
+
+
+def measure(build, conns):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    state = build(conns)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return state, used
+
+
+def time_participants(label, build_list, rooms, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for rid in rooms:
+            build_list(rid)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28}{elapsed / (repeat * len(rooms)) * 1e6:8.1f} us per room list")
+
+
+def main(args):
+    conns = list(connections(args))
+    (dict_meta, dict_rooms), dict_bytes = measure(build_dicts, conns)
+    (users, compact_meta, compact_rooms), compact_bytes = measure(build_compact, conns)
+
+    print(f"{args.sids} sids, {len(users)} distinct users, {len(compact_rooms)} rooms")
+    print(f"dict per sid + copied details  {dict_bytes / args.sids:8.0f} B/conn  ({dict_bytes / 2**20:.1f} MiB)")
+    print(f"slots session + shared users   {compact_bytes / args.sids:8.0f} B/conn  ({compact_bytes / 2**20:.1f} MiB)")
+
+    rooms = list(compact_rooms)[:1000]
+
+    def copied(rid):
+        participants = []
+        for sid in dict_rooms.get(rid, ()):
+            participant = dict_meta[sid]["user_details"].copy()
+            participant["socket_id"] = sid
+            participant["is_online"] = True
+            participants.append(participant)
+        return participants
+
+    cache = {}
+
+    def cached(rid):
+        participants = cache.get(rid)
+        if participants is None:
+            participants = cache[rid] = [
+                {**users.get(compact_meta[sid].user_id), "socket_id": sid, "is_online": True}
+                for sid in compact_rooms.get(rid, ())
+            ]
+        return participants
+
+    time_participants("participants, copy per call", copied, rooms, args.repeat)
+    time_participants("participants, cached", cached, rooms, args.repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sids", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--room-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
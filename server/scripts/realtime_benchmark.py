@@ -0,0 +1,173 @@
+"""Compare the eventlet (socketio_server) and asyncio (asgi_server) realtime modes.
+
+    DATABASE_URL=sqlite:///bench.db REDIS_URL=redis://localhost:6379/0 flask db upgrade
+    DATABASE_URL=sqlite:///bench.db REDIS_URL=redis://localhost:6379/0 \
+        python scripts/realtime_benchmark.py --rooms 50 --room-size 10 --relays 200
+
+Seeds rooms full of members, then for each mode starts the server, connects
+every member at once and reports connect latency. It then has one speaker
+per room relay webrtc:offer messages to another and reports one-way relay
+latency and throughput.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+import socketio
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_CMD = """
+import json, sys, uuid
+from app import app
+from models import db, User, Room, RoomParticipant
+from utils.membership import MembershipIndex
+from flask_jwt_extended import create_access_token
+rooms, size, tag = int(sys.argv[1]), int(sys.argv[2]), uuid.uuid4().hex[:8]
+with app.app_context():
+    seeded = []
+    for r in range(rooms):
+        members = [User(email=f"bench-{tag}-{r}-{i}@blubb.local", name=f"Bench {r}-{i}") for i in range(size)]
+        db.session.add_all(members)
+        db.session.flush()
+        room = Room(name=f"bench {tag} {r}", created_by=members[0].id)
+        db.session.add(room)
+        db.session.flush()
+        db.session.add_all(RoomParticipant(room_id=room.id, user_id=u.id) for u in members)
+        seeded.append({"room": room.id, "tokens": [create_access_token(identity=str(u.id)) for u in members]})
+    db.session.commit()
+    MembershipIndex.rebuild()
+print(json.dumps(seeded))
+"""
+EVENTLET_CMD = (
+    "import os; from app import app; from socketio_server import socketio; "
+    "socketio.run(app, host='127.0.0.1', port=int(os.environ['PORT']), log_output=False)"
+)
+
+
+def seed(args):
+    out = subprocess.run(
+        [sys.executable, "-c", SEED_CMD, str(args.rooms), str(args.room_size)],
+        cwd=SERVER_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def start_server(mode, port):
+    env = dict(os.environ, PORT=str(port), PREWARM_ENABLED="0")
+    if mode == "eventlet":
+        cmd = [sys.executable, "-c", EVENTLET_CMD]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "asgi_server:app", "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=SERVER_DIR, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/socket.io/?EIO=4&transport=polling", timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{mode} server did not come up on :{port}")
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return "n/a"
+    p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+    return (f"p50={statistics.median(samples) * 1000:.2f}ms p95={p95 * 1000:.2f}ms "
+            f"max={samples[-1] * 1000:.2f}ms")
+
+
+async def connect_member(url, room, token, stats, timeout):
+    client = socketio.AsyncClient(reconnection=False)
+    started = time.perf_counter()
+    try:
+        await client.connect(url, auth={"token": token, "roomId": room},
+                             transports=["websocket"], wait_timeout=timeout)
+    except socketio.exceptions.ConnectionError:
+        stats["failed"] += 1
+        return None
+    stats["connect"].append(time.perf_counter() - started)
+    return client
+
+
+async def relay_room(sender, receiver, relays, stats):
+    done = asyncio.Event()
+    received = 0
+
+    @receiver.on("webrtc:offer")
+    async def on_offer(data):
+        nonlocal received
+        stats["relay"].append(time.perf_counter() - data["sent"])
+        received += 1
+        if received == relays:
+            done.set()
+
+    target = receiver.get_sid()
+    for _ in range(relays):
+        await sender.emit("webrtc:offer", {"to": target, "sdp": "x" * 512, "sent": time.perf_counter()})
+    try:
+        await asyncio.wait_for(done.wait(), timeout=30)
+    except asyncio.TimeoutError:
+        stats["lost"] += relays - received
+
+
+async def run_mode(mode, seeded, args, port):
+    url = f"http://127.0.0.1:{port}"
+    stats = {"connect": [], "relay": [], "failed": 0, "lost": 0}
+    proc = start_server(mode, port)
+    try:
+        started = time.perf_counter()
+        clients = await asyncio.gather(*(
+            connect_member(url, entry["room"], token, stats, args.timeout)
+            for entry in seeded for token in entry["tokens"]
+        ))
+        connect_window = time.perf_counter() - started
+
+        rooms, index = [], 0
+        for entry in seeded:
+            members = [c for c in clients[index:index + len(entry["tokens"])] if c is not None]
+            index += len(entry["tokens"])
+            if len(members) >= 2:
+                rooms.append(members)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(relay_room(m[0], m[1], args.relays, stats) for m in rooms))
+        relay_window = time.perf_counter() - started
+
+        await asyncio.gather(*(c.disconnect() for c in clients if c is not None))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    total = sum(len(entry["tokens"]) for entry in seeded)
+    print(f"[{mode}] connected {len(stats['connect'])}/{total} in {connect_window:.2f}s "
+          f"({stats['failed']} failed); connect {percentiles(stats['connect'])}")
+    print(f"[{mode}] relayed {len(stats['relay'])} offers in {relay_window:.2f}s "
+          f"({len(stats['relay']) / max(relay_window, 1e-9):.0f}/s, {stats['lost']} lost); "
+          f"relay {percentiles(stats['relay'])}")
+
+
+def main(args):
+    seeded = seed(args)
+    modes = ["eventlet", "asgi"] if args.mode == "both" else [args.mode]
+    for offset, mode in enumerate(modes):
+        asyncio.run(run_mode(mode, seeded, args, args.port + offset))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["eventlet", "asgi", "both"], default="both")
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--room-size", type=int, default=10)
+    parser.add_argument("--relays", type=int, default=200, help="offers relayed per room")
+    parser.add_argument("--port", type=int, default=5200)
+    parser.add_argument("--timeout", type=float, default=20.0)
+    main(parser.parse_args())
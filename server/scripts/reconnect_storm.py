@@ -0,0 +1,75 @@
+"""Reconnect-storm scenario for connect admission control.
+
+    python scripts/reconnect_storm.py --url http://localhost:5000 \
+        --token <jwt of a room member> --room 42 --clients 1000
+
+Fires every client's handshake at once, as after a deploy. Rejected clients
+honour the server's retryAfter hint (with their own jitter) until they get
+in or run out of attempts. Reports the rejection mix, per-client connect
+time and how long the whole storm took to settle.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter
+
+import socketio
+
+
+async def storm_client(args, stats):
+    started = time.perf_counter()
+    for attempt in range(args.attempts):
+        client = socketio.AsyncClient(reconnection=False)
+        try:
+            await client.connect(
+                args.url,
+                auth={"token": args.token, "roomId": args.room},
+                transports=["websocket"],
+                wait_timeout=args.timeout,
+            )
+        except socketio.exceptions.ConnectionError as e:
+            data = e.args[0] if e.args and isinstance(e.args[0], dict) else {}
+            retry_after = data.get("retryAfter")
+            if retry_after is None:
+                stats["errors"][str(e)] += 1
+                return
+            stats["rejections"][data.get("reason", "unknown")] += 1
+            await asyncio.sleep(retry_after * random.uniform(0.8, 1.2))
+            continue
+        stats["connect_times"].append(time.perf_counter() - started)
+        stats["attempts"].append(attempt + 1)
+        await asyncio.sleep(args.hold)
+        await client.disconnect()
+        return
+    stats["errors"]["gave up"] += 1
+
+
+async def main(args):
+    stats = {"connect_times": [], "attempts": [], "rejections": Counter(), "errors": Counter()}
+    started = time.perf_counter()
+    await asyncio.gather(*(storm_client(args, stats) for _ in range(args.clients)))
+    settled = time.perf_counter() - started - args.hold
+
+    times = sorted(stats["connect_times"])
+    print(f"connected {len(times)}/{args.clients}; storm settled in {settled:.2f}s")
+    print(f"rejections by reason: {dict(stats['rejections'])}")
+    if stats["errors"]:
+        print(f"failures: {dict(stats['errors'])}")
+    if times:
+        print(f"time to connect: p50={statistics.median(times):.2f}s "
+              f"p95={times[max(0, int(len(times) * 0.95) - 1)]:.2f}s max={times[-1]:.2f}s")
+        print(f"attempts per client: mean={statistics.mean(stats['attempts']):.2f} max={max(stats['attempts'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--room", type=int, required=True)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--attempts", type=int, default=10)
+    parser.add_argument("--hold", type=float, default=2.0, help="seconds each client stays connected")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,124 @@
+"""Benchmark room search against a seeded dataset.
+
+    DATABASE_URL=sqlite:///bench.db flask db upgrade
+    DATABASE_URL=sqlite:///bench.db python scripts/search_benchmark.py --rooms 1000000
+
+Seeds synthetic rooms (only up to --rooms; re-runs reuse the data), then times
+indexed search and prefix suggestions against a naive LIKE '%q%' scan over
+the same queries. Run the migrations first so the search index exists.
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PREWARM_ENABLED", "0")
+from app import app  # noqa: E402
+from models import db, Room, User  # noqa: E402
+from utils.search import RoomSearch  # noqa: E402
+
+COMMON_WORDS = (
+    "team standup design review weekly sync product launch music jam study group "
+    "book club gaming night coffee chat founders yoga morning evening open mic "
+    "python rust frontend backend ops incident retro planning hiring demo podcast"
+).split()
+SYLLABLES = "ka lo mi ne ru sa to vi ze ba de fo gu hi ja ko lu ma no pe qui ra si tu".split()
+
+
+def vocabulary(size, seed=7):
+    """Common words plus synthetic ones, with Zipf weights so most words are rare."""
+    rng = random.Random(seed)
+    words = list(COMMON_WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    # Cumulative weights so each draw is a bisect rather than a pass over the vocabulary
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    return words, weights
+
+
+def seed(total, batch_size, words, weights):
+    existing = Room.query.count()
+    if existing >= total:
+        return existing
+    owner = User.query.filter_by(email="bench@blubb.local").first()
+    if not owner:
+        owner = User(email="bench@blubb.local", name="Bench")
+        db.session.add(owner)
+        db.session.commit()
+
+    rng = random.Random(existing)
+    started = time.perf_counter()
+    for offset in range(existing, total, batch_size):
+        rows = [{
+            "name": " ".join(word.title() for word in rng.choices(words, cum_weights=weights, k=rng.randint(2, 4))),
+            "description": " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(5, 15))),
+            "created_by": owner.id,
+            "mode": "mesh",
+        } for _ in range(min(batch_size, total - offset))]
+        db.session.execute(Room.__table__.insert(), rows)
+        db.session.commit()
+        print(f"\rseeded {offset + len(rows)}/{total}", end="", flush=True)
+    print(f"\nseeding took {time.perf_counter() - started:.1f}s")
+    return total
+
+
+def timed(fn, queries):
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50": round(statistics.median(samples), 2),
+        "p95": round(samples[max(0, int(len(samples) * 0.95) - 1)], 2),
+        "max": round(samples[-1], 2),
+    }
+
+
+def naive_like(query):
+    q = Room.query.with_entities(Room.id)
+    for word in query.split():
+        pattern = f"%{word}%"
+        q = q.filter(db.or_(Room.name.ilike(pattern), Room.description.ilike(pattern)))
+    return q.limit(20).all()
+
+
+def main(args):
+    with app.app_context():
+        words, weights = vocabulary(args.vocabulary)
+        total = seed(args.rooms, args.batch_size, words, weights)
+        # Queries follow the same distribution as the data: mostly rare words, some common ones
+        rng = random.Random(42)
+        queries = [" ".join(rng.choices(words, cum_weights=weights, k=rng.randint(1, 2))) for _ in range(args.queries)]
+        prefixes = [rng.choice(words)[:rng.randint(2, 4)] for _ in range(args.queries)]
+
+        print(f"{total} rooms on {db.engine.dialect.name}, {args.queries} queries each (ms)")
+        print("search       ", timed(lambda q: RoomSearch.search(q), queries))
+        # Bypass the suggestion cache to time the index itself
+        print("suggest      ", timed(lambda p: RoomSearch._suggest_names(p, 8), prefixes))
+        if not args.skip_naive:
+            # LIMIT lets the scan stop early on common words; a miss reads every row
+            misses = [f"zz{n}qx" for n in range(args.naive_queries)]
+            print("naive LIKE   ", timed(naive_like, queries[:args.naive_queries]))
+            print("naive miss   ", timed(naive_like, misses))
+            print("search miss  ", timed(lambda q: RoomSearch.search(q), misses))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=1000000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--naive-queries", type=int, default=20, help="the scan is slow; time fewer queries")
+    parser.add_argument("--skip-naive", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,112 @@
+"""Run a local multi-process Socket.IO cluster with room-affinity sharding.
+
+    REDIS_URL=redis://localhost:6379/0 python scripts/shard_cluster.py --workers 3 --kill-after 20
+
+Starts N workers on consecutive ports, each registering itself in the shard
+registry. It waits for every worker's ring to converge and prints which
+worker owns a sample of room ids. With --kill-after it then stops one worker
+and reports how many rooms moved once the survivors rebalance.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sharding import HashRing  # noqa: E402
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_CMD = (
+    "import os; from app import app; from socketio_server import socketio; "
+    "socketio.run(app, host='127.0.0.1', port=int(os.environ['PORT']), log_output=False)"
+)
+
+
+def start_worker(port, args):
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        SHARDING_ENABLED="1",
+        SOCKET_SHARD_URL=f"http://127.0.0.1:{port}",
+        SHARD_HEARTBEAT_INTERVAL=str(args.heartbeat),
+        SHARD_TTL=str(args.heartbeat * 3),
+    )
+    return subprocess.Popen([sys.executable, "-c", WORKER_CMD], cwd=SERVER_DIR, env=env)
+
+
+def ring_of(port):
+    try:
+        return set(requests.get(f"http://127.0.0.1:{port}/health", timeout=2).json()["shard"]["ring"])
+    except (requests.RequestException, KeyError, ValueError):
+        return None
+
+
+def wait_for_convergence(ports, expected, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        rings = [ring_of(port) for port in ports]
+        if all(ring == expected for ring in rings):
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def ownership(nodes, rooms, replicas):
+    ring = HashRing(nodes, replicas=replicas)
+    return {room_id: ring.owner(room_id) for room_id in range(1, rooms + 1)}
+
+
+def main(args):
+    ports = [args.base_port + i for i in range(args.workers)]
+    workers = {port: start_worker(port, args) for port in ports}
+    urls = {f"http://127.0.0.1:{port}" for port in ports}
+    try:
+        if not wait_for_convergence(ports, urls, args.timeout):
+            print("workers did not converge on a shared ring", file=sys.stderr)
+            return 1
+        before = ownership(urls, args.rooms, args.replicas)
+        counts = {url: list(before.values()).count(url) for url in sorted(urls)}
+        print(f"ring converged across {len(urls)} workers; rooms per worker: {counts}")
+
+        if args.kill_after is not None:
+            time.sleep(args.kill_after)
+            victim = ports[-1]
+            workers.pop(victim).terminate()
+            survivors = [port for port in ports if port != victim]
+            remaining = {f"http://127.0.0.1:{port}" for port in survivors}
+            if not wait_for_convergence(survivors, remaining, args.timeout + args.heartbeat * 3):
+                print("survivors did not rebalance", file=sys.stderr)
+                return 1
+            after = ownership(remaining, args.rooms, args.replicas)
+            moved = sum(1 for room_id in before if before[room_id] != after[room_id])
+            print(f"stopped worker :{victim}; {moved}/{args.rooms} rooms moved "
+                  f"(ideal ~{args.rooms // len(urls)})")
+
+        if args.hold:
+            print("cluster running, Ctrl-C to stop")
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in workers.values():
+            proc.terminate()
+        for proc in workers.values():
+            proc.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=5100)
+    parser.add_argument("--rooms", type=int, default=1000, help="room ids to map when reporting ownership")
+    parser.add_argument("--replicas", type=int, default=128, help="must match SHARD_VIRTUAL_NODES")
+    parser.add_argument("--heartbeat", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--kill-after", type=float, default=None)
+    parser.add_argument("--hold", action="store_true", help="keep the cluster running after the report")
+    sys.exit(main(parser.parse_args()))
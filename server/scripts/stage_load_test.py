@@ -0,0 +1,88 @@
+"""Simulate thousands of stage listeners against a running server.
+
+    python scripts/stage_load_test.py --url http://localhost:5000 \
+        --token <jwt of a room member> --room 42 --listeners 2000
+
+Every socket authenticates with the same token (a user may hold many
+sockets). Reports connect latency percentiles, rejected handshakes and how
+many aggregated ``listeners:update`` events arrived while the sockets idled.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import socketio
+
+
+async def run_listener(args, stats, ready):
+    client = socketio.AsyncClient(reconnection=False)
+
+    @client.on("listeners:update")
+    async def on_update(data):
+        stats["updates"] += 1
+        stats["last_count"] = data.get("count")
+
+    @client.on("presence:join")
+    async def on_presence(data):
+        # Listeners should only ever see speaker presence, never per-listener joins
+        stats["presence_events"] += 1
+
+    started = time.perf_counter()
+    try:
+        await client.connect(
+            args.url,
+            auth={"token": args.token, "roomId": args.room, "role": "listener"},
+            transports=["websocket"],
+            wait_timeout=args.timeout,
+        )
+    except socketio.exceptions.ConnectionError:
+        stats["rejected"] += 1
+        ready.release()
+        return
+    stats["latencies"].append(time.perf_counter() - started)
+    ready.release()
+
+    await asyncio.sleep(args.hold)
+    await client.disconnect()
+
+
+async def main(args):
+    stats = {"latencies": [], "rejected": 0, "updates": 0, "presence_events": 0, "last_count": None}
+    ready = asyncio.Semaphore(0)
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def gated(i):
+        async with gate:
+            await asyncio.sleep(i * args.ramp / max(args.listeners, 1))
+            await run_listener(args, stats, ready)
+
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(gated(i)) for i in range(args.listeners)]
+    for _ in range(args.listeners):
+        await ready.acquire()
+    connect_window = time.perf_counter() - started
+    await asyncio.gather(*tasks)
+
+    latencies = sorted(stats["latencies"])
+    print(f"listeners connected: {len(latencies)}/{args.listeners} in {connect_window:.2f}s "
+          f"({stats['rejected']} rejected)")
+    if latencies:
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+        print(f"connect latency: p50={statistics.median(latencies) * 1000:.1f}ms "
+              f"p95={p95 * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms")
+    print(f"listeners:update events received: {stats['updates']} (last count {stats['last_count']})")
+    print(f"per-join presence events seen by listeners: {stats['presence_events']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--room", type=int, required=True)
+    parser.add_argument("--listeners", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=2000, help="max sockets open at once")
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds over which to spread connects")
+    parser.add_argument("--hold", type=float, default=15.0, help="seconds each listener stays connected")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,245 @@
+"""Re-drive recorded socket traces (utils/tracing.py) against a local realtime server.
+
+    # record: sampled rooms are written to TRACE_DIR/trace-<pid>.ndjson (+ rotated .gz)
+    TRACE_ENABLED=1 TRACE_SAMPLE_RATE=0.05 gunicorn -c gunicorn.conf.py app:app
+
+    # replay against a local server sharing DATABASE_URL / REDIS_URL with this script
+    DATABASE_URL=sqlite:///bench.db REDIS_URL=redis://localhost:6379/0 flask db upgrade
+    DATABASE_URL=sqlite:///bench.db REDIS_URL=redis://localhost:6379/0 python app.py &
+    DATABASE_URL=sqlite:///bench.db REDIS_URL=redis://localhost:6379/0 \
+        python scripts/trace_replay.py traces/ --url http://127.0.0.1:5000 --speed 10
+
+Loads every trace file in timestamp order. Each recorded room is seeded as a
+local room with one member per recorded user. The events are then replayed
+on the recorded schedule divided by --speed: connects (with the recorded
+role), status updates, list requests, same-size signaling payloads and
+disconnects. Each session's events, and signaling with its target, stay in
+recorded order without holding up unrelated sessions. The same traces and speed always give the same schedule. Reports
+connect and relay latency, throughput, and how far the replay fell behind
+schedule.
+"""
+import argparse
+import asyncio
+import functools
+import glob
+import gzip
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import socketio
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIGNALING_EVENTS = ("webrtc:offer", "webrtc:answer", "webrtc:ice")
+SEED_CMD = """
+import json, sys, uuid
+from app import app
+from models import db, User, Room, RoomParticipant
+from utils.membership import MembershipIndex
+from flask_jwt_extended import create_access_token
+spec, tag = json.load(sys.stdin), uuid.uuid4().hex[:8]
+seeded = {}
+with app.app_context():
+    for n, (key, room) in enumerate(spec.items()):
+        members = [User(email=f"replay-{tag}-{n}-{i}@blubb.local", name=f"Replay {n}-{i}") for i in range(len(room["users"]))]
+        db.session.add_all(members)
+        db.session.flush()
+        created = Room(name=f"replay {tag} {key}", created_by=members[0].id, mode="stage" if room["stage"] else "mesh")
+        db.session.add(created)
+        db.session.flush()
+        db.session.add_all(RoomParticipant(room_id=created.id, user_id=u.id) for u in members)
+        seeded[key] = {"room": created.id, "tokens": dict(zip(room["users"], (create_access_token(identity=str(u.id)) for u in members)))}
+    db.session.commit()
+    MembershipIndex.rebuild()
+print(json.dumps(seeded))
+"""
+
+
+def trace_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "trace-*.ndjson*"))))
+        else:
+            files.append(path)
+    return files
+
+
+def load_events(paths):
+    events = []
+    for path in trace_files(paths):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt") as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    events.sort(key=lambda e: e["t"])  # stable, so same-ms events keep file order
+    return events
+
+
+def room_spec(events):
+    """Recorded room -> the users to seed in it and whether it is a stage."""
+    rooms = {}
+    for event in events:
+        if event["e"] != "connect":
+            continue
+        room = rooms.setdefault(event["r"], {"users": [], "stage": False})
+        # A rejected connect has no user; give the attempt its own member
+        event["u"] = event.get("u") or f"rejected-{event['s']}"
+        if event["u"] not in room["users"]:
+            room["users"].append(event["u"])
+        room["stage"] = room["stage"] or event.get("role") == "listener"
+    return rooms
+
+
+def seed(rooms):
+    out = subprocess.run(
+        [sys.executable, "-c", SEED_CMD], input=json.dumps(rooms),
+        cwd=SERVER_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return "n/a"
+    p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+    return (f"p50={statistics.median(samples) * 1000:.2f}ms p95={p95 * 1000:.2f}ms "
+            f"max={samples[-1] * 1000:.2f}ms")
+
+
+class Replay:
+    def __init__(self, events, seeded, args):
+        self.events = events
+        self.seeded = seeded
+        self.args = args
+        self.clients = {}       # trace session -> connected AsyncClient
+        self.tails = {}         # trace session -> last scheduled task touching it, to keep its events in order
+        self.inflight = {}      # trace session -> relays sent to it and not yet received
+        self.stats = {"connect": [], "relay": [], "lag": [], "failed": 0, "sent": 0, "unroutable": 0}
+
+    async def connect(self, event):
+        room = self.seeded[event["r"]]
+        client = socketio.AsyncClient(reconnection=False)
+        for name in SIGNALING_EVENTS:
+            client.on(name, functools.partial(self.on_signal, event["s"]))
+        auth = {"token": room["tokens"][event["u"]], "roomId": room["room"]}
+        if event.get("role"):
+            auth["role"] = event["role"]
+        started = time.perf_counter()
+        try:
+            await client.connect(self.args.url, auth=auth, transports=["websocket"], wait_timeout=self.args.timeout)
+        except socketio.exceptions.ConnectionError:
+            self.stats["failed"] += 1
+            return
+        self.stats["connect"].append(time.perf_counter() - started)
+        if event.get("ok", True):
+            self.clients[event["s"]] = client
+        else:
+            await client.disconnect()  # rejected when recorded; only the attempt is replayed
+
+    async def on_signal(self, session, data):
+        if isinstance(data, dict) and "sent" in data:
+            self.stats["relay"].append(time.perf_counter() - data["sent"])
+            self.inflight[session] -= 1
+
+    async def emit(self, event):
+        client = self.clients.get(event["s"])
+        if client is None:
+            return
+        name = event["e"]
+        if name == "disconnect":
+            # Recorded after whatever it received, so let relays already sent to it land
+            deadline = time.monotonic() + self.args.drain
+            while self.inflight.get(event["s"], 0) > 0 and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            self.clients.pop(event["s"], None)
+            await client.disconnect()
+            return
+        if name in SIGNALING_EVENTS:
+            target = self.clients.get(event.get("to"))
+            if target is None:
+                self.stats["unroutable"] += 1
+                return
+            payload = {"to": target.get_sid(), "sdp": "x" * event.get("n", 0), "sent": time.perf_counter()}
+            self.inflight[event["to"]] = self.inflight.get(event["to"], 0) + 1
+        elif name == "user:status":
+            payload = {"status": event.get("st", {})}
+        else:
+            payload = None
+        if payload is None:
+            await client.emit(name)
+        else:
+            await client.emit(name, payload)
+        self.stats["sent"] += 1
+
+    async def after(self, previous, action, event):
+        await asyncio.gather(*previous)
+        try:
+            await action(event)
+        except (socketio.exceptions.SocketIOError, KeyError) as e:
+            print(f"replay {event['e']} for session {event['s']} failed: {e}", file=sys.stderr)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        first = self.events[0]["t"]
+        started = loop.time()
+        for event in self.events:
+            due = started + (event["t"] - first) / 1000 / self.args.speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.stats["lag"].append(max(0.0, loop.time() - due))
+            action = self.connect if event["e"] == "connect" else self.emit
+            # Signaling also waits on (and holds up) its target, so a lagging replay
+            # never disconnects a peer before the offers recorded ahead of that
+            sessions = {event["s"]}
+            if event["e"] in SIGNALING_EVENTS and event.get("to"):
+                sessions.add(event["to"])
+            previous = [self.tails[s] for s in sessions if s in self.tails]
+            task = asyncio.create_task(self.after(previous, action, event))
+            for s in sessions:
+                self.tails[s] = task
+        await asyncio.gather(*self.tails.values())
+        elapsed = loop.time() - started
+        deadline = time.monotonic() + self.args.drain  # let in-flight relays land before hanging up
+        while any(n > 0 for n in self.inflight.values()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*(c.disconnect() for c in self.clients.values()))
+        return elapsed
+
+
+def main(args):
+    events = load_events(args.traces)
+    if not events:
+        sys.exit("no trace events found")
+    if args.limit:
+        events = events[:args.limit]
+    rooms = room_spec(events)
+    seeded = seed(rooms)
+
+    span = (events[-1]["t"] - events[0]["t"]) / 1000
+    print(f"{len(events)} events, {len(rooms)} rooms, {sum(len(r['users']) for r in rooms.values())} users, "
+          f"recorded over {span:.1f}s; replaying at {args.speed:g}x")
+    replay = Replay(events, seeded, args)
+    elapsed = asyncio.run(replay.run())
+
+    stats = replay.stats
+    print(f"replayed in {elapsed:.2f}s ({len(events) / max(elapsed, 1e-9):.0f} events/s, "
+          f"{stats['sent']} emits, {stats['unroutable']} unroutable)")
+    print(f"connect: {len(stats['connect'])} ok, {stats['failed']} failed; {percentiles(stats['connect'])}")
+    print(f"relay:   {len(stats['relay'])} delivered; {percentiles(stats['relay'])}")
+    print(f"behind schedule: {percentiles(stats['lag'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", nargs="+", help="trace files or TRACE_DIR directories")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = recorded pace, 10 = ten times faster")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N events")
+    parser.add_argument("--timeout", type=float, default=20.0)
+    parser.add_argument("--drain", type=float, default=2.0, help="seconds to wait for in-flight relays before a disconnect")
+    main(parser.parse_args())
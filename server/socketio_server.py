@@ -1,199 +1,512 @@
 # server/socketio_server.py
-from flask import request, current_app
-from flask_socketio import SocketIO, join_room, leave_room, emit
+from flask import request, current_app, g
+from flask_socketio import SocketIO, join_room, emit, ConnectionRefusedError
 from flask_jwt_extended import decode_token
-from models import db, RoomParticipant, User
+from models import db, Room, User
+from utils.prewarm import HotRoomPrewarmer
+from utils.membership import MembershipIndex
+from utils.sharding import ShardCoordinator
+from utils import metrics
+from utils.rate_limit import socket_rate_limit
+from utils.admission import AdmissionController, AdmissionRejected
+from utils.activity import ActivityBuffer
+from utils.archive import RoomArchive
+from utils.occupancy import RoomStats
+from utils.tracing import tracer
+from utils.presence import PresenceRooms, listeners_channel, presence_event, presence_user
 import requests
 import os
+import atexit
+import secrets
+import time
+from collections import deque, OrderedDict
 
 socketio = SocketIO(cors_allowed_origins="*")  # tighten in prod
-MAX_MESH = 10
 
-# live maps
-room_sockets = {}             # room_id(str) -> set(sids)
-sid_meta = {}                 # sid -> {user_id, room_id, user_details}
+# live maps; the handler logic that changes them is shared with asgi_server
+presence = PresenceRooms()
+room_sockets = presence.room_sockets      # room_id(str) -> set(sids) in the WebRTC mesh (speakers)
+room_listeners = presence.room_listeners  # room_id(str) -> set(sids) listening to a stage, outside the mesh
+room_settings = presence.room_settings    # room_id(str) -> {stage, capacity, speakers}
+sid_meta = presence.sid_meta              # sid -> SocketSession; user details are shared in presence.users
+shard_coordinator = None      # set when room-affinity sharding is enabled
+admission = None              # connect admission controller, set in init_socketio
+
+# connection state recovery
+resume_tokens = {}            # resume token -> sid currently holding the session
+departed_sessions = {}        # resume token -> {sid, expires, seq, missed}
+departed_sids = {}            # departed sid -> resume token
+sid_aliases = {}              # pre-resume sid -> current sid, so peers' relays still land
+room_events = {}              # room_id(str) -> deque[(seq, event, payload)] of recent presence
+room_seq = {}                 # room_id(str) -> last presence sequence number
+
+# liveness
+last_seen = OrderedDict()     # sid -> monotonic time of last activity, oldest first
 
 def init_socketio(app):
+    global admission
     socketio.init_app(app)
     register_handlers()
 
+    admission = AdmissionController(app, lambda: db.engine, socketio.sleep)
+
+def start_background_tasks(app):
+    """Per-worker loops; started after fork so a preloaded master runs none of them."""
+    socketio.start_background_task(admission.monitor)
+
+    if app.config.get("PREWARM_ENABLED"):
+        prewarmer = HotRoomPrewarmer(
+            app, lambda: {rid: len(sids) for rid, sids in list(room_sockets.items())}
+        )
+        socketio.start_background_task(prewarmer.run, socketio.sleep)
+
+    # Rebuilds a missing index, then repairs drift every MEMBERSHIP_CHECK_INTERVAL
+    socketio.start_background_task(MembershipIndex.run_checker, app, socketio.sleep)
+
+    socketio.start_background_task(_listener_presence_loop, app)
+
+    if app.config.get("RESUME_GRACE_SECONDS"):
+        socketio.start_background_task(_resume_expiry_loop, app)
+
+    socketio.start_background_task(_reaper_loop, app)
+
+    socketio.start_background_task(ActivityBuffer.run_flusher, app, socketio.sleep)
+
+    if app.config.get("ARCHIVE_INTERVAL"):
+        socketio.start_background_task(RoomArchive.run_archiver, app, socketio.sleep)
+
+    if app.config.get("TRACE_ENABLED"):
+        tracer.open(app, sid_meta.get)
+    atexit.register(_flush_activity, app)
+
+    if app.config.get("SHARDING_ENABLED"):
+        global shard_coordinator
+        shard_coordinator = ShardCoordinator(app, app.config["SOCKET_SHARD_URL"])
+        app.shard_coordinator = shard_coordinator
+        atexit.register(shard_coordinator.deregister)
+        socketio.start_background_task(shard_coordinator.run, socketio.sleep, _rebalance_rooms)
+
+def _flush_activity(app):
+    """On worker exit, close out live sessions (activity and occupancy) and drain the activity buffer."""
+    with app.app_context():
+        try:
+            now = time.monotonic()
+            for meta in list(sid_meta.values()):
+                ActivityBuffer.end_session(int(meta.room_id), meta.user_id, now - meta.connected_at)
+                RoomStats.record(meta.room_id, "disconnect", session_seconds=now - meta.connected_at)
+            ActivityBuffer.flush_all()
+        except Exception as e:
+            # Redis or the DB is down; whatever is still buffered flushes from another worker
+            app.logger.warning(f"Activity not flushed on exit: {e}")
+
 def _user_from_token(token):
     try:
         sub = decode_token(token)["sub"]
+        g.db_user_id = sub  # lets replica routing honour this user's primary pin
         return User.query.get(int(sub))
     except Exception:
         return None
 
 def _in_room(user_id, room_id):
-    return db.session.query(RoomParticipant)\
-        .filter_by(user_id=user_id, room_id=room_id).first() is not None
+    if MembershipIndex.is_member(user_id, room_id):
+        return True
+    # Archived rooms come back on a member's first connect
+    return RoomArchive.restore(room_id, member_id=user_id)
 
 def _fetch_user_details(user_id):
     """Fetch user details from API"""
     try:
         user = User.query.get(user_id)
         if user:
-            return {
-                "id": user.id,
-                "name": user.name,
-                "email": user.email,
-                "profile": user.profile,
-                "created_at": user.created_at.isoformat() if hasattr(user, 'created_at') else None
-            }
+            return presence_user(user)
     except Exception as e:
         current_app.logger.error(f"Failed to fetch user details for {user_id}: {e}")
         # Fallback to database
         user = User.query.get(user_id)
         if user:
-            return {
-                "id": user.id,
-                "name": user.name,
-                "email": user.email,
-                "profile": user.profile,
-                "created_at": user.created_at.isoformat() if hasattr(user, 'created_at') else None
-            }
+            return presence_user(user)
     return None
 
-def _get_room_participants(room_id):
-    """Get all current participants in a room with their details"""
-    participants = []
-    sids = room_sockets.get(room_id, set())
-    
-    for sid in sids:
-        meta = sid_meta.get(sid)
-        if meta and 'user_details' in meta:
-            participant = meta['user_details'].copy()
-            participant['socket_id'] = sid
-            participant['is_online'] = True
-            participants.append(participant)
-    
-    return participants
+def _room_settings(room_id):
+    """Capacity settings for a room, loaded once per live room."""
+    rid = str(room_id)
+    settings = room_settings.get(rid)
+    if settings is None:
+        room = Room.query.get(int(room_id))
+        if not room:
+            return None
+        settings = {"stage": room.is_stage, "capacity": room.capacity, "speakers": room.speaker_limit}
+        room_settings[rid] = settings
+    return settings
 
-def register_handlers():
+def _release_room(rid):
+    if presence.release_room(rid):
+        room_events.pop(rid, None)
+        room_seq.pop(rid, None)
 
-    @socketio.on("connect")
-    def on_connect(auth):
-        token = (auth or {}).get("token")
-        room_id = (auth or {}).get("roomId")
-        if not token or not room_id:
-            return False
+def _timestamp():
+    return str(current_app.get_timestamp() if hasattr(current_app, 'get_timestamp') else 'now')
 
-        user = _user_from_token(token)
-        if not user or not _in_room(user.id, int(room_id)):
-            return False
+def _broadcast(rid, event, payload, skip_sid=None):
+    """Emit a presence event and keep it in the room's bounded replay buffer."""
+    seq = room_seq.get(rid, 0) + 1
+    room_seq[rid] = seq
+    events = room_events.get(rid)
+    if events is None:
+        events = room_events[rid] = deque(maxlen=current_app.config["RESUME_BUFFER_SIZE"])
+    events.append((seq, event, payload))
+    socketio.emit(event, payload, to=presence.presence_targets(rid), skip_sid=skip_sid)
+
+def _relay(event, sid, data):
+    """Forward a speaker's signaling message, following resumed sids and buffering for departed ones."""
+    target = presence.relay_target(sid, data)
+    if not target:
+        return
+    target = sid_aliases.get(target, target)
+    token = departed_sids.get(target)
+    if token:
+        departed_sessions[token]["missed"].append((event, data))
+        return
+    emit(event, data, room=target)
 
-        # Fetch user details from API
-        user_details = _fetch_user_details(user.id)
-        if not user_details:
-            current_app.logger.error(f"Could not fetch details for user {user.id}")
+def _end_session(sid):
+    """Drop a socket's presence for good and tell the room it left."""
+    ended = presence.unseat(sid, current_app.config["LISTENER_PRESENCE_SAMPLE"])
+    if not ended:
+        return
+
+    meta, user_details = ended
+    rid = meta.room_id
+    duration = time.monotonic() - meta.connected_at
+    ActivityBuffer.end_session(int(rid), meta.user_id, duration)
+    RoomStats.record(rid, "disconnect", session_seconds=duration)
+    resume_tokens.pop(meta.resume_token, None)
+    for alias in meta.aliases or ():
+        sid_aliases.pop(alias, None)
+
+    if not meta.is_listener:
+        # Emit user left to others in room
+        _broadcast(rid, "presence:leave", presence_event(user_details, sid, _timestamp()), skip_sid=sid)
+    _release_room(rid)
+
+def _resume_authorized(token, meta):
+    """The JWT is still valid for the session's user, who is still a member of its room."""
+    try:
+        if str(decode_token(token)["sub"]) != str(meta.user_id):
             return False
+    except Exception:
+        return False
+    return MembershipIndex.is_member(meta.user_id, int(meta.room_id))
+
+def _resume_session(resume_token, room_id, token):
+    """Re-attach a reconnecting client to its departed session.
 
-        rid = str(room_id)
-        sids = room_sockets.get(rid, set())
-        if len(sids) >= MAX_MESH:
-            emit("room:full", {"limit": MAX_MESH})
+    The JWT and room membership are checked again (a signature check and one
+    SISMEMBER), but nothing is loaded. The old sid keeps its slot during the
+    grace window, so the room never sees leave/join churn. Peers get a
+    single presence:resume with the new sid, and the client gets the
+    presence and signaling it missed while away.
+    """
+    old_sid = resume_tokens.get(resume_token)
+    meta = sid_meta.get(old_sid) if old_sid else None
+    if not meta or meta.room_id != str(room_id):
+        return False
+    if not _resume_authorized(token, meta):
+        return False
+    session = departed_sessions.pop(resume_token, None)
+    if session:
+        departed_sids.pop(old_sid, None)
+        if session["expires"] <= time.monotonic():
+            _end_session(old_sid)
             return False
 
-        join_room(rid)
-        sids.add(request.sid)
-        room_sockets[rid] = sids
-        sid_meta[request.sid] = {
-            "user_id": user.id, 
-            "room_id": rid,
-            "user_details": user_details
-        }
+    sid = request.sid
+    rid = meta.room_id
+    sid_meta[sid] = sid_meta.pop(old_sid)
+    last_seen.pop(old_sid, None)
+    _touch(sid)
+    resume_tokens.pop(resume_token, None)
+    if session is None:
+        # The old transport has not timed out yet; retire it quietly (its meta has moved)
+        socketio.server.disconnect(old_sid, namespace="/")
+        session = {"seq": room_seq.get(rid, 0), "missed": ()}
+    if meta.is_listener:
+        members = room_listeners
+    else:
+        members = room_sockets
+        presence.room_participants.pop(rid, None)
+    members[rid].discard(old_sid)
+    members[rid].add(sid)
+    join_room(presence.channel(meta))
+
+    if meta.aliases is None:
+        meta.aliases = []
+    meta.aliases.append(old_sid)
+    for alias in meta.aliases:
+        sid_aliases[alias] = sid
+    meta.resume_token = secrets.token_urlsafe(16)
+    resume_tokens[meta.resume_token] = sid
+
+    # Replay missed presence, or resync fully if the bounded buffer overflowed
+    events = room_events.get(rid) or ()
+    if events and events[0][0] > session["seq"] + 1:
+        emit("participants:list", presence.participants_payload(sid))
+    else:
+        for seq, event, payload in events:
+            if seq > session["seq"]:
+                emit(event, payload)
+    for event, data in session["missed"]:
+        emit(event, data)
+
+    if not meta.is_listener:
+        _broadcast(rid, "presence:resume", presence_event(
+            meta.user_details, sid, _timestamp(), previousSocketId=old_sid
+        ), skip_sid=sid)
+
+    emit("connected", {
+        "ok": True,
+        "user": meta.user_details,
+        "role": meta.role,
+        "resumed": True,
+        "resumeToken": meta.resume_token
+    })
+    return True
+
+def _resume_expiry_loop(app):
+    """Finish sessions whose grace window lapsed without a resume."""
+    while True:
+        socketio.sleep(1)
+        now = time.monotonic()
+        expired = [token for token, session in departed_sessions.items() if session["expires"] <= now]
+        if not expired:
+            continue
+        with app.app_context():
+            for token in expired:
+                session = departed_sessions.pop(token, None)
+                if session:
+                    departed_sids.pop(session["sid"], None)
+                    _end_session(session["sid"])
+
+def _touch(sid):
+    """Record socket activity in O(1), keeping last_seen ordered oldest-first."""
+    now = last_seen[sid] = time.monotonic()
+    last_seen.move_to_end(sid)
+    meta = sid_meta.get(sid)
+    if meta and now - meta.seen_at >= current_app.config["ACTIVITY_SEEN_RESOLUTION"]:
+        meta.seen_at = now
+        ActivityBuffer.touch(int(meta.room_id), meta.user_id)
+
+def _reap_ghost_sessions(app):
+    """Evict sessions idle past PRESENCE_TTL whose transport is gone, at most one batch per tick."""
+    cutoff = time.monotonic() - app.config["PRESENCE_TTL"]
+    budget = app.config["REAPER_BATCH_SIZE"]
+    reaped = 0
+    with app.app_context():
+        while last_seen and budget > 0:
+            sid, seen = next(iter(last_seen.items()))
+            if seen > cutoff:
+                break
+            budget -= 1
+            if socketio.server.manager.is_connected(sid, "/"):
+                # Quiet but alive per engine.io pings; check again next TTL
+                _touch(sid)
+                continue
+            last_seen.pop(sid, None)
+            token = departed_sids.pop(sid, None)
+            if token:
+                departed_sessions.pop(token, None)
+            _end_session(sid)
+            reaped += 1
+
+    metrics.incr("presence.reaper_ticks")
+    metrics.incr("presence.reaped_sessions", reaped)
+    metrics.gauge("presence.tracked_sids", len(last_seen))
+    metrics.gauge("presence.reaped_last_tick", reaped)
+    return reaped
 
+def _reaper_loop(app):
+    interval = app.config["REAPER_INTERVAL"]
+    while True:
+        socketio.sleep(interval)
+        try:
+            reaped = _reap_ghost_sessions(app)
+            if reaped:
+                app.logger.warning(f"Reaped {reaped} ghost presence sessions")
+        except Exception as e:
+            app.logger.error(f"Presence reaper failed: {e}")
+
+def _listener_presence_loop(app):
+    """Broadcast listener counts plus sampled joins/leaves instead of per-listener events."""
+    interval = app.config["LISTENER_PRESENCE_INTERVAL"]
+    while True:
+        socketio.sleep(interval)
+        for targets, payload in presence.listener_updates():
+            socketio.emit("listeners:update", payload, to=targets)
+
+def _rebalance_rooms(coordinator):
+    """Hand every room this worker no longer owns over to its new shard."""
+    for rid in set(room_sockets) | set(room_listeners):
+        if coordinator.is_local(rid):
+            continue
+        owner = coordinator.owner(rid)
+        socketio.emit("shard:redirect", {"url": owner, "roomId": rid}, to=[rid, listeners_channel(rid)])
+        for sid in list(room_sockets.get(rid, ())) + list(room_listeners.get(rid, ())):
+            if sid in sid_meta:
+                sid_meta[sid].no_resume = True  # the session cannot resume on another shard
+            socketio.server.disconnect(sid, namespace="/")
+
+def _socket_identity():
+    """Rate-limit bucket owner for the current event: the user, else the raw sid."""
+    meta = sid_meta.get(request.sid)
+    return meta.user_id if meta else request.sid
+
+def _connect_new_session(auth, token, room_id):
+    """Authorize a fresh handshake and place the socket in its room."""
+    user = _user_from_token(token)
+    if not user or not _in_room(user.id, int(room_id)):
+        return False
+
+    settings = _room_settings(room_id)
+    if not settings:
+        return False
+
+    # Fetch user details from API
+    user_details = _fetch_user_details(user.id)
+    if not user_details:
+        current_app.logger.error(f"Could not fetch details for user {user.id}")
+        return False
+
+    rid = str(room_id)
+    meta, limit = presence.seat(
+        request.sid, user.id, rid, settings, (auth or {}).get("role"), user_details,
+        current_app.config["LISTENER_PRESENCE_SAMPLE"]
+    )
+    if meta is None:
+        emit("room:full", {"limit": limit})
+        return False
+
+    resume_tokens[meta.resume_token] = request.sid
+    _touch(request.sid)
+    ActivityBuffer.touch(int(room_id), user.id)
+    RoomStats.record(rid, "connect")
+
+    join_room(presence.channel(meta))
+    if not meta.is_listener:
         # Emit user joined to others in room
-        emit("presence:join", {
-            "user": user_details,
-            "socketId": request.sid,
-            "timestamp": str(current_app.get_timestamp() if hasattr(current_app, 'get_timestamp') else 'now')
-        }, to=rid, skip_sid=request.sid)
+        _broadcast(rid, "presence:join", presence_event(meta.user_details, request.sid, _timestamp()), skip_sid=request.sid)
+
+    # Send current participants list to the new user
+    emit("participants:list", presence.participants_payload(request.sid))
 
-        # Send current participants list to the new user
-        current_participants = _get_room_participants(rid)
-        emit("participants:list", {
-            "participants": current_participants,
-            "total": len(current_participants)
-        })
+    emit("connected", {
+        "ok": True,
+        "user": meta.user_details,
+        "role": meta.role,
+        "resumeToken": meta.resume_token
+    })
 
-        emit("connected", {"ok": True, "user": user_details})
+def register_handlers():
+
+    @socketio.on("connect")
+    @tracer.trace("connect")
+    def on_connect(auth):
+        token = (auth or {}).get("token")
+        room_id = (auth or {}).get("roomId")
+        if not token or not room_id:
+            return False
+
+        # Room affinity: all signaling for a room stays on the shard that owns it
+        if shard_coordinator and not shard_coordinator.is_local(room_id):
+            raise ConnectionRefusedError({"redirect": shard_coordinator.owner(room_id)})
+
+        # A client back within the grace window skips admission, DB loads and presence churn
+        resume_token = (auth or {}).get("resumeToken")
+        if resume_token and _resume_session(resume_token, room_id, token):
+            return
+
+        # Everything past here hits JWT decode and the DB, so it goes through admission
+        try:
+            with admission.admit():
+                return _connect_new_session(auth, token, room_id)
+        except AdmissionRejected as e:
+            raise ConnectionRefusedError({"retryAfter": e.retry_after, "reason": e.reason})
 
     @socketio.on("disconnect")
+    @tracer.trace("disconnect")
     def on_disconnect():
-        meta = sid_meta.pop(request.sid, None)
+        last_seen.pop(request.sid, None)
+        meta = sid_meta.get(request.sid)
         if not meta:
             return
-            
-        rid = meta["room_id"]
-        user_details = meta.get("user_details", {})
-        
-        sids = room_sockets.get(rid, set())
-        sids.discard(request.sid)
-        if not sids:
-            room_sockets.pop(rid, None)
-            
-        leave_room(rid)
-        
-        # Emit user left to others in room
-        emit("presence:leave", {
-            "user": user_details,
-            "socketId": request.sid,
-            "timestamp": str(current_app.get_timestamp() if hasattr(current_app, 'get_timestamp') else 'now')
-        }, to=rid, skip_sid=request.sid)
+
+        grace = current_app.config["RESUME_GRACE_SECONDS"]
+        if grace and not meta.no_resume:
+            # Hold the slot; presence:leave only goes out if the grace window lapses
+            departed_sessions[meta.resume_token] = {
+                "sid": request.sid,
+                "expires": time.monotonic() + grace,
+                "seq": room_seq.get(meta.room_id, 0),
+                "missed": deque(maxlen=current_app.config["RESUME_BUFFER_SIZE"])
+            }
+            departed_sids[request.sid] = meta.resume_token
+            return
+
+        _end_session(request.sid)
+
+    # Client heartbeat; only refreshes liveness
+    @socketio.on("presence:ping")
+    @tracer.trace("presence:ping")
+    def presence_ping():
+        _touch(request.sid)
 
     # List peers (socket IDs) in your room
     @socketio.on("peers:list")
+    @tracer.trace("peers:list")
     def peers_list():
-        meta = sid_meta.get(request.sid)
-        if not meta:
-            emit("peers:list", {"peers": []})
-            return
-        rid = meta["room_id"]
-        peers = [sid for sid in room_sockets.get(rid, set()) if sid != request.sid]
-        emit("peers:list", {"peers": peers})
+        _touch(request.sid)
+        emit("peers:list", {"peers": presence.peers(request.sid)})
 
     # Get current participants with details
     @socketio.on("participants:list")
+    @tracer.trace("participants:list")
     def participants_list():
-        meta = sid_meta.get(request.sid)
-        if not meta:
-            emit("participants:list", {"participants": [], "total": 0})
-            return
-        rid = meta["room_id"]
-        participants = _get_room_participants(rid)
-        emit("participants:list", {
-            "participants": participants,
-            "total": len(participants)
-        })
+        _touch(request.sid)
+        emit("participants:list", presence.participants_payload(request.sid))
 
     # User status updates (e.g., mute/unmute)
     @socketio.on("user:status")
+    @tracer.trace("user:status")
+    @socket_rate_limit("socket.user:status", _socket_identity)
     def user_status(data):
-        meta = sid_meta.get(request.sid)
-        if not meta:
+        _touch(request.sid)
+        change = presence.status_change(request.sid, data, _timestamp())
+        if change is None:
             return
-        
-        rid = meta["room_id"]
-        user_details = meta.get("user_details", {})
-        
+        meta, payload, muted = change
+        if muted is not None:
+            ActivityBuffer.set_muted(int(meta.room_id), meta.user_id, muted)
+
         # Broadcast status change to room
-        emit("user:status:change", {
-            "user": user_details,
-            "socketId": request.sid,
-            "status": data.get("status", {}),
-            "timestamp": str(current_app.get_timestamp() if hasattr(current_app, 'get_timestamp') else 'now')
-        }, to=rid, skip_sid=request.sid)
-
-    # Signaling relays
+        _broadcast(meta.room_id, "user:status:change", payload, skip_sid=request.sid)
+
+    # Signaling relays (speakers only; stage listeners stay out of the mesh)
     @socketio.on("webrtc:offer")
+    @tracer.trace("webrtc:offer")
+    @socket_rate_limit("socket.webrtc", _socket_identity)
     def on_offer(data):
-        emit("webrtc:offer", data, room=data["to"])
+        _touch(request.sid)
+        _relay("webrtc:offer", request.sid, data)
 
     @socketio.on("webrtc:answer")
+    @tracer.trace("webrtc:answer")
+    @socket_rate_limit("socket.webrtc", _socket_identity)
     def on_answer(data):
-        emit("webrtc:answer", data, room=data["to"])
+        _touch(request.sid)
+        _relay("webrtc:answer", request.sid, data)
 
     @socketio.on("webrtc:ice")
+    @tracer.trace("webrtc:ice")
+    @socket_rate_limit("socket.webrtc", _socket_identity)
     def on_ice(data):
-        emit("webrtc:ice", data, room=data["to"])
+        _touch(request.sid)
+        _relay("webrtc:ice", request.sid, data)
@@ -0,0 +1,89 @@
+"""Test fixtures: the app on a throwaway SQLite file and a fakeredis server.
+
+Run from server/ with ``python -m pytest tests`` (needs pytest and fakeredis).
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+
+pytest.importorskip("fakeredis")
+
+
+def _start_redis():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    server = subprocess.Popen([
+        sys.executable, "-c",
+        "import sys; from fakeredis import TcpFakeServer; "
+        "TcpFakeServer(('127.0.0.1', int(sys.argv[1])), server_type='redis').serve_forever()",
+        str(port),
+    ])
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return server, f"redis://127.0.0.1:{port}/0"
+
+
+_redis_server, os.environ["REDIS_URL"] = _start_redis()
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mktemp(suffix='.db')}"
+os.environ["PREWARM_ENABLED"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_unconfigure(config):
+    _redis_server.kill()
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app
+    app.config.update(TESTING=True)
+    app.config["RATE_LIMITS"] = {name: (1000, 1000) for name in app.config["RATE_LIMITS"]}
+    return app
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(app):
+    """Empty tables plus users 1-5, and an empty Redis, for every test."""
+    from models import db, User
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all(User(email=f"u{i}@example.com", name=f"u{i}", profile=f"p{i}") for i in range(1, 6))
+        db.session.commit()
+    app.redis.flushall()
+    from utils.membership import MembershipIndex
+    MembershipIndex._dirty_rooms.clear()
+    yield
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth(app):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        tokens = {i: create_access_token(identity=str(i)) for i in range(1, 6)}
+    return lambda user_id: {"Authorization": f"Bearer {tokens[user_id]}"}
+
+
+@pytest.fixture
+def make_room(client, auth):
+    def make_room(owner=1, **fields):
+        response = client.post("/rooms", json={"name": "room", **fields}, headers=auth(owner))
+        assert response.status_code == 201
+        return response.json["room"]["id"]
+    return make_room
@@ -0,0 +1,81 @@
+import pytest
+import redis
+
+from models import RoomParticipant, db
+from utils.activity import ActivityBuffer
+
+
+def _seconds(app, room_id, user_id=1):
+    with app.app_context():
+        db.session.expire_all()
+        return RoomParticipant.query.filter_by(room_id=room_id, user_id=user_id).one().session_seconds
+
+
+def _dirty(app):
+    return app.redis.smembers(ActivityBuffer.DIRTY_KEY)
+
+
+def test_failed_ack_does_not_add_seconds_twice(app, make_room, monkeypatch):
+    room_id = make_room()
+    with app.app_context():
+        ActivityBuffer.end_session(room_id, 1, 30)
+        ActivityBuffer.set_muted(room_id, 1, True)
+        script = ActivityBuffer._script
+
+        def ack_down(r, name, source):
+            if name == "ack":
+                raise redis.ConnectionError("down")
+            return script(r, name, source)
+
+        with monkeypatch.context() as m:
+            m.setattr(ActivityBuffer, "_script", ack_down)
+            with pytest.raises(redis.ConnectionError):
+                ActivityBuffer.flush()
+        assert _dirty(app) == {str(room_id)}
+        ActivityBuffer.flush_all()
+    assert _seconds(app, room_id) == 30
+    assert not _dirty(app)
+
+
+def test_failed_read_requeues_rooms(app, make_room, monkeypatch):
+    room_id = make_room()
+    with app.app_context():
+        ActivityBuffer.end_session(room_id, 1, 30)
+
+        def down(self, *args, **kwargs):
+            raise redis.ConnectionError("down")
+
+        with monkeypatch.context() as m:
+            m.setattr(redis.client.Pipeline, "execute", down)
+            with pytest.raises(redis.ConnectionError):
+                ActivityBuffer.flush()
+        assert _dirty(app) == {str(room_id)}
+        ActivityBuffer.flush_all()
+    assert _seconds(app, room_id) == 30
+
+
+def test_failed_db_write_puts_seconds_back(app, make_room, monkeypatch):
+    room_id = make_room()
+    with app.app_context():
+        ActivityBuffer.end_session(room_id, 1, 30)
+
+        def db_down():
+            raise RuntimeError("db down")
+
+        with monkeypatch.context() as m:
+            m.setattr(db.session, "commit", db_down)
+            with pytest.raises(RuntimeError):
+                ActivityBuffer.flush()
+        assert app.redis.hget(ActivityBuffer.get_room_key(room_id), "1:seconds") == "30"
+        ActivityBuffer.flush_all()
+    assert _seconds(app, room_id) == 30
+
+
+def test_exit_flush_survives_a_redis_outage(app, monkeypatch):
+    import socketio_server
+
+    def down():
+        raise redis.ConnectionError("down")
+
+    monkeypatch.setattr(ActivityBuffer, "flush_all", down)
+    socketio_server._flush_activity(app)
@@ -0,0 +1,91 @@
+from flask import g
+from sqlalchemy import event
+
+from models import ArchivedRoom, db
+from utils.archive import RoomArchive
+from utils.membership import MembershipIndex
+
+
+def _archive(app, room_id):
+    with app.app_context():
+        members = RoomArchive._archive_batch([room_id])
+        MembershipIndex.remove_many(members)
+        RoomArchive._evict([room_id], members)
+
+
+def _is_archived(app, room_id):
+    with app.app_context():
+        return db.session.get(ArchivedRoom, room_id) is not None
+
+
+def test_archived_rooms_stay_in_member_listings(app, client, auth, make_room):
+    room_id = make_room(name="quiet")
+    assert [room["id"] for room in client.get("/rooms", headers=auth(1)).get_json()["rooms"]] == [room_id]
+    _archive(app, room_id)
+
+    rooms = client.get("/rooms", headers=auth(1)).get_json()["rooms"]
+    assert [(room["id"], room["name"], room["participants_count"]) for room in rooms] == [(room_id, "quiet", 1)]
+    assert client.get("/rooms", headers=auth(2)).get_json()["rooms"] == []
+    assert _is_archived(app, room_id)
+
+
+def test_non_members_cannot_restore(app, client, auth, make_room):
+    room_id = make_room()
+    _archive(app, room_id)
+    assert client.get(f"/rooms/{room_id}/participants", headers=auth(2)).status_code == 403
+    assert client.get(f"/rooms/{room_id}/stats", headers=auth(2)).status_code == 403
+    assert client.delete(f"/rooms/{room_id}/leave", headers=auth(2)).status_code == 400
+    assert _is_archived(app, room_id)
+
+
+def test_members_restore_on_access(app, client, auth, make_room):
+    room_id = make_room()
+    _archive(app, room_id)
+    response = client.get(f"/rooms/{room_id}/participants", headers=auth(1))
+    assert response.status_code == 200
+    assert not _is_archived(app, room_id)
+
+
+def test_non_members_cannot_restore_through_details_join_or_batch(app, client, auth, make_room):
+    room_id = make_room()
+    _archive(app, room_id)
+    assert client.get(f"/rooms/{room_id}", headers=auth(2)).status_code == 404
+    assert client.get(f"/rooms/{room_id}?fields=name", headers=auth(2)).status_code == 404
+    assert client.post(f"/rooms/{room_id}/join", headers=auth(2)).status_code == 404
+    results = client.post("/rooms/batch", json={"operations": [
+        {"op": "join", "room_id": room_id}, {"op": "detail", "room_id": room_id}
+    ]}, headers=auth(2)).json["results"]
+    assert [result["status"] for result in results] == [404, 404]
+    assert _is_archived(app, room_id)
+
+    response = client.get(f"/rooms/{room_id}", headers=auth(1))
+    assert response.status_code == 200 and response.json["room"]["id"] == room_id
+    assert not _is_archived(app, room_id)
+
+
+def test_already_restored_counts_as_restored(app, make_room):
+    room_id = make_room()
+    _archive(app, room_id)
+    with app.test_request_context():
+        RoomArchive.ensure_ids()
+        assert RoomArchive.restore(room_id, member_id=1)
+        # The loser of a concurrent restore read the id before the winner dropped it
+        app.redis.sadd(RoomArchive.IDS_KEY, room_id)
+        assert RoomArchive.restore(room_id, member_id=1)
+        assert not RoomArchive.restore(room_id, member_id=2)
+        assert not app.redis.sismember(RoomArchive.IDS_KEY, room_id)  # the stale id is gone
+        assert not g.get("db_primary_only")  # routing is left to the caller
+
+
+def test_restore_of_a_room_that_was_never_archived_skips_the_db(app, make_room):
+    make_room()
+    statements = []
+    with app.test_request_context():
+        RoomArchive.ensure_ids()
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            assert not RoomArchive.restore(999, member_id=1)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+    assert statements == []
@@ -0,0 +1,21 @@
+import json
+
+from utils.accounts import UserDirectory
+
+
+def test_signin_never_caches_the_password_hash(app, client):
+    assert client.post("/auth/signup", json={"email": "new@example.com", "password": "pw", "name": "n"}).status_code == 201
+    response = client.post("/auth/signin", json={"email": "new@example.com", "password": "pw"})
+    assert response.status_code == 200
+    assert response.get_json()["user"]["email"] == "new@example.com"
+    assert client.post("/auth/signin", json={"email": "new@example.com", "password": "wrong"}).status_code == 401
+
+    _, entry = UserDirectory._local["new@example.com"]
+    assert "password" not in entry
+    with app.app_context():
+        cached = json.loads(app.cache.get(UserDirectory.get_email_key("new@example.com")))
+    assert "password" not in cached
+
+
+def test_signin_unknown_email(client):
+    assert client.post("/auth/signin", json={"email": "nobody@example.com", "password": "pw"}).status_code == 401
@@ -0,0 +1,39 @@
+import time
+
+from resources.room import CacheManager
+
+
+def _views(client, auth, user_id, room_id):
+    headers = auth(user_id)
+    rooms = client.get("/rooms", headers=headers).json["rooms"]
+    details = client.get(f"/rooms/{room_id}", headers=headers).json["room"]
+    participants = client.get(f"/rooms/{room_id}/participants", headers=headers).json["participants"]
+    return next(room for room in rooms if room["id"] == room_id), details, participants
+
+
+def test_a_members_cached_views_follow_another_users_join_and_leave(client, auth, make_room):
+    room_id = make_room(owner=1)
+    summary, details, participants = _views(client, auth, 1, room_id)
+    assert summary["participants_count"] == 1 and details["participants_count"] == 1
+    assert [p["id"] for p in participants] == [1]
+    assert _views(client, auth, 1, room_id)[0] == summary  # served from the cache now
+
+    assert client.post(f"/rooms/{room_id}/join", headers=auth(2)).status_code == 201
+    summary, details, participants = _views(client, auth, 1, room_id)
+    assert summary["participants_count"] == 2
+    assert sorted(p["id"] for p in details["participants"]) == [1, 2]
+    assert sorted(p["id"] for p in participants) == [1, 2]
+
+    assert client.delete(f"/rooms/{room_id}/leave", headers=auth(2)).status_code == 200
+    summary, details, participants = _views(client, auth, 1, room_id)
+    assert summary["participants_count"] == 1 and details["participants_count"] == 1
+    assert [p["id"] for p in participants] == [1]
+
+
+def test_a_bump_after_eviction_never_reuses_an_old_generation(app):
+    key = CacheManager.get_room_generation_key(42)
+    with app.app_context():
+        app.cache.delete(key)  # evicted
+        generation = CacheManager.bump_room_generation(42)
+    # Seeded from the clock like a first read, not restarted at 1
+    assert generation > int(time.time() * 1000) - 60_000
@@ -0,0 +1,47 @@
+from resources import room as room_resource
+from resources.room import CacheManager
+from utils import db_routing
+from utils.cache_store import CacheStore
+
+
+def test_primary_reads_scopes_queries_to_the_primary(app):
+    with app.test_request_context("/rooms", method="GET"):
+        assert db_routing._reads_go_to_replica()
+        with db_routing.primary_reads():
+            assert not db_routing._reads_go_to_replica()
+        assert db_routing._reads_go_to_replica()
+
+
+def test_primary_reads_keeps_an_existing_primary_pin(app):
+    with app.test_request_context("/rooms", method="GET"):
+        db_routing.primary_only(lambda: None)()
+        with db_routing.primary_reads():
+            pass
+        assert not db_routing._reads_go_to_replica()
+
+
+def test_replica_reads_of_a_just_bumped_room_are_served_but_not_cached(app, client, auth, make_room, monkeypatch):
+    room_id = make_room(owner=1)
+    monkeypatch.setattr(room_resource, "reading_from_replica", lambda: True)
+    with app.app_context():
+        CacheManager.bump_room_generation(room_id)  # a write another user just made
+
+    response = client.get(f"/rooms/{room_id}", headers=auth(2))
+    assert response.status_code == 200 and response.json["room"]["id"] == room_id
+    with app.app_context():
+        assert CacheStore.get(CacheManager.get_room_details_key(room_id)) is None
+
+    # Past the replica-lag window the same replica read fills the cache
+    app.cache.delete(CacheManager.get_room_generation_key(room_id) + ":bumped")
+    assert client.get(f"/rooms/{room_id}", headers=auth(2)).status_code == 200
+    with app.app_context():
+        assert CacheStore.get(CacheManager.get_room_details_key(room_id))["id"] == room_id
+
+
+def test_primary_reads_are_cached_right_after_a_bump(app, client, auth, make_room):
+    room_id = make_room(owner=1)
+    with app.app_context():
+        CacheManager.bump_room_generation(room_id)
+    assert client.get(f"/rooms/{room_id}", headers=auth(2)).status_code == 200
+    with app.app_context():
+        assert CacheStore.get(CacheManager.get_room_details_key(room_id))["id"] == room_id
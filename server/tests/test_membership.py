@@ -0,0 +1,57 @@
+import redis
+
+from models import RoomParticipant, db
+from utils.membership import MembershipIndex
+
+
+def test_failed_add_marks_room_dirty_and_resyncs(app, make_room, monkeypatch):
+    room_id = make_room()
+    with app.app_context():
+        MembershipIndex.rebuild()
+        db.session.add(RoomParticipant(room_id=room_id, user_id=2))
+        db.session.commit()
+
+        def down(self, *args, **kwargs):
+            raise redis.ConnectionError("down")
+
+        with monkeypatch.context() as m:
+            m.setattr(redis.client.Pipeline, "execute", down)
+            MembershipIndex.add(2, room_id)
+        assert room_id in MembershipIndex._dirty_rooms
+
+        # Redis is back: the next read resyncs the room before answering
+        assert MembershipIndex.is_member(2, room_id)
+        assert not MembershipIndex._dirty_rooms
+        assert app.redis.sismember(MembershipIndex.get_room_members_key(room_id), 2)
+
+
+def test_reads_fall_back_to_db_until_rebuilt(app, make_room):
+    room_id = make_room()
+    with app.app_context():
+        assert not MembershipIndex.ensure_ready()
+        assert MembershipIndex.is_member(1, room_id)
+        assert MembershipIndex.rebuild_if_missing()
+        assert app.redis.exists(MembershipIndex.READY_KEY)
+        assert not MembershipIndex.rebuild_if_missing()
+
+
+def test_checker_repairs_drift(app, make_room):
+    room_id = make_room()
+    with app.app_context():
+        MembershipIndex.rebuild()
+        app.redis.sadd(MembershipIndex.get_room_members_key(room_id), 4)
+        report = MembershipIndex.check_consistency(repair=True)
+        assert report["drifted"] == [room_id]
+        assert app.redis.smembers(MembershipIndex.get_room_members_key(room_id)) == {"1"}
+        assert not app.redis.exists(MembershipIndex.CHECK_LOCK_KEY)
+
+
+def test_only_one_checker_repairs_at_a_time(app, make_room):
+    room_id = make_room()
+    with app.app_context():
+        MembershipIndex.rebuild()
+        app.redis.sadd(MembershipIndex.get_room_members_key(room_id), 4)
+        app.redis.set(MembershipIndex.CHECK_LOCK_KEY, 1)
+        report = MembershipIndex.check_consistency(repair=True)
+        assert report["skipped"]
+        assert app.redis.sismember(MembershipIndex.get_room_members_key(room_id), 4)
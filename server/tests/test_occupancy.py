@@ -0,0 +1,31 @@
+import redis
+
+from utils.occupancy import RoomStats
+
+
+def test_live_counter_expires_and_each_event_refreshes_it(app):
+    with app.app_context():
+        RoomStats.record(7, "connect")
+        key = RoomStats.get_live_key(7)
+        app.redis.expire(key, 5)
+        RoomStats.record(7, "connect")
+        assert app.redis.ttl(key) > 5
+        assert RoomStats.live(7) == 2
+
+
+def test_stats_returns_503_when_redis_is_down(app, client, auth, make_room, monkeypatch):
+    room_id = make_room()
+
+    def down(*args, **kwargs):
+        raise redis.ConnectionError("Redis circuit breaker is open")
+
+    monkeypatch.setattr(RoomStats, "series", down)
+    response = client.get(f"/rooms/{room_id}/stats", headers=auth(1))
+    assert response.status_code == 503
+
+
+def test_stats_for_a_member(client, auth, make_room):
+    room_id = make_room()
+    response = client.get(f"/rooms/{room_id}/stats?granularity=hour&limit=2", headers=auth(1))
+    assert response.status_code == 200
+    assert len(response.get_json()["buckets"]) == 2
@@ -0,0 +1,76 @@
+from utils.activity import ActivityBuffer
+from utils.presence import PresenceRooms
+
+STAGE = {"stage": True, "capacity": 3, "speakers": 1}
+
+
+def _seat(rooms, sid, user_id, role=None):
+    return rooms.seat(sid, user_id, "9", STAGE, role, {"id": user_id, "name": f"u{user_id}"}, sample=5)
+
+
+def test_seat_and_unseat_keep_the_maps_in_step():
+    rooms = PresenceRooms()
+    rooms.room_settings["9"] = STAGE
+    speaker, _ = _seat(rooms, "a", 1, role="speaker")
+    listener, _ = _seat(rooms, "b", 2)
+    assert (speaker.role, listener.role) == ("speaker", "listener")
+    assert rooms.channel(listener) == "9:listeners"
+    assert rooms.participants_payload("b")["listeners"] == 1
+    assert [p["socket_id"] for p in rooms.participants("9")] == ["a"]
+    assert _seat(rooms, "c", 3) != (None, None)
+    assert _seat(rooms, "d", 4) == (None, 3)
+
+    meta, details = rooms.unseat("a", sample=5)
+    assert details["id"] == 1
+    assert rooms.participants("9") == []
+    assert not rooms.release_room("9")
+    rooms.unseat("b", sample=5)
+    rooms.unseat("c", sample=5)
+    assert rooms.release_room("9") and "9" not in rooms.room_settings
+    [(targets, update)] = rooms.listener_updates()
+    assert targets == ["9", "9:listeners"] and update["joined_total"] == 2 and update["left_total"] == 2
+
+
+def test_status_change_reports_mutes_for_speakers_only():
+    rooms = PresenceRooms()
+    _seat(rooms, "a", 1, role="speaker")
+    _seat(rooms, "b", 2)
+    meta, payload, muted = rooms.status_change("a", {"status": {"is_muted": True}}, "now")
+    assert muted is True and payload["status"] == {"is_muted": True} and payload["socketId"] == "a"
+    assert rooms.status_change("a", {"status": {"video": False}}, "now")[2] is None
+    assert rooms.status_change("b", {"status": {"is_muted": True}}, "now") is None
+    assert rooms.relay_target("a", {"to": "x"}) == "x"
+    assert rooms.relay_target("b", {"to": "x"}) is None
+
+
+def test_status_change_ignores_malformed_payloads():
+    rooms = PresenceRooms()
+    _seat(rooms, "a", 1, role="speaker")
+    for data in ("muted", ["is_muted"], 3, {"status": "muted"}, {"status": ["is_muted"]}):
+        assert rooms.status_change("a", data, "now") is None
+    assert rooms.status_change("a", None, "now")[1]["status"] == {}
+
+
+def test_queue_muted_matches_set_muted(app):
+    with app.app_context():
+        ActivityBuffer.set_muted(3, 1, True)
+        expected = app.redis.hgetall(ActivityBuffer.get_room_key(3))
+        app.redis.flushall()
+        pipe = app.redis.pipeline(transaction=False)
+        ActivityBuffer.queue_muted(pipe, 3, 1, True)
+        pipe.execute()
+        assert app.redis.hgetall(ActivityBuffer.get_room_key(3)) == expected
+        assert app.redis.sismember(ActivityBuffer.DIRTY_KEY, 3)
+
+
+def test_socket_status_buffers_mute_state(app, make_room, auth):
+    from socketio_server import socketio
+    room_id = make_room()
+    token = auth(1)["Authorization"].split()[1]
+    client = socketio.test_client(app, auth={"token": token, "roomId": room_id})
+    assert client.is_connected()
+    assert [event["name"] for event in client.get_received()] == ["participants:list", "connected"]
+    client.emit("user:status", {"status": {"is_muted": True}})
+    with app.app_context():
+        assert app.redis.hget(ActivityBuffer.get_room_key(room_id), "1:muted") == "1"
+    client.disconnect()
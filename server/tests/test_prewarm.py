@@ -0,0 +1,44 @@
+from resources import room as room_resource
+from resources.room import CacheManager
+from utils import prewarm
+from utils.cache_store import CacheStore
+from utils.prewarm import HotRoomPrewarmer
+
+
+def _join_during_read(app, monkeypatch, module, room_id):
+    """Bump the room's generation as the snapshot is serialized, as a concurrent join would."""
+    serialize = module.serialize_room_details
+
+    def serialize_then_join(room):
+        data = serialize(room)
+        app.cache.cache.inc(CacheManager.get_room_generation_key(room_id))
+        return data
+
+    monkeypatch.setattr(module, "serialize_room_details", serialize_then_join)
+
+
+def _cached_details(app, room_id):
+    with app.app_context():
+        return CacheStore.get(CacheManager.get_room_details_key(room_id))
+
+
+def test_prewarm_never_caches_a_snapshot_under_a_newer_generation(app, make_room, monkeypatch):
+    room_id = make_room()
+    _join_during_read(app, monkeypatch, prewarm, room_id)
+    with app.app_context():
+        assert HotRoomPrewarmer(app, dict).warm([room_id]) == 1
+    assert _cached_details(app, room_id) is None
+
+
+def test_cache_warmup_never_caches_a_snapshot_under_a_newer_generation(app, client, auth, make_room, monkeypatch):
+    room_id = make_room()
+    _join_during_read(app, monkeypatch, room_resource, room_id)
+    assert client.post("/cache/warmup", headers=auth(1)).status_code == 200
+    assert _cached_details(app, room_id) is None
+
+
+def test_prewarm_caches_when_nothing_changed(app, make_room):
+    room_id = make_room()
+    with app.app_context():
+        HotRoomPrewarmer(app, dict).warm([room_id])
+    assert _cached_details(app, room_id)["id"] == room_id
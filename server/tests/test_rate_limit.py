@@ -0,0 +1,7 @@
+from utils.rate_limit import _client_ip
+
+
+def test_client_ip_ignores_forwarded_for(app):
+    with app.test_request_context(headers={"X-Forwarded-For": "203.0.113.9"}, environ_base={"REMOTE_ADDR": "10.0.0.7"}):
+        assert _client_ip() == "10.0.0.7"
+
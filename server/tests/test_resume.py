@@ -0,0 +1,55 @@
+from models import RoomParticipant, db
+from utils.membership import MembershipIndex
+
+
+def _token(auth, user_id):
+    return auth(user_id)["Authorization"].split()[1]
+
+
+def _connect(app, auth, user_id, room_id, resume_token=None):
+    from socketio_server import socketio
+    credentials = {"token": _token(auth, user_id), "roomId": room_id}
+    if resume_token:
+        credentials["resumeToken"] = resume_token
+    client = socketio.test_client(app, auth=credentials)
+    connected = [e["args"][0] for e in client.get_received() if e["name"] == "connected"] if client.is_connected() else []
+    return client, connected[0] if connected else None
+
+
+def _join(app, room_id, user_id):
+    with app.app_context():
+        db.session.add(RoomParticipant(room_id=room_id, user_id=user_id))
+        db.session.commit()
+        MembershipIndex.add(user_id, room_id)
+
+
+def test_resume_restores_the_session(app, auth, make_room):
+    room_id = make_room()
+    client, hello = _connect(app, auth, 1, room_id)
+    client.disconnect()
+    client, hello = _connect(app, auth, 1, room_id, hello["resumeToken"])
+    assert hello["resumed"]
+    client.disconnect()
+
+
+def test_resume_rechecks_membership(app, auth, make_room):
+    room_id = make_room()
+    _join(app, room_id, 2)
+    client, hello = _connect(app, auth, 2, room_id)
+    client.disconnect()
+    with app.app_context():
+        RoomParticipant.query.filter_by(room_id=room_id, user_id=2).delete()
+        db.session.commit()
+        MembershipIndex.remove(2, room_id)
+    client, hello = _connect(app, auth, 2, room_id, hello["resumeToken"])
+    assert not client.is_connected()
+
+
+def test_resume_token_is_bound_to_its_user(app, auth, make_room):
+    room_id = make_room()
+    _join(app, room_id, 2)
+    client, hello = _connect(app, auth, 1, room_id)
+    client.disconnect()
+    client, stolen = _connect(app, auth, 2, room_id, hello["resumeToken"])
+    assert stolen["user"]["id"] == 2 and not stolen.get("resumed")
+    client.disconnect()
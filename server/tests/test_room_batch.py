@@ -0,0 +1,49 @@
+from models import RoomParticipant
+from utils.membership import MembershipIndex
+
+
+def batch(client, headers, *operations):
+    response = client.post("/rooms/batch", json={"operations": [
+        {"op": op, "room_id": room_id} for op, room_id in operations
+    ]}, headers=headers)
+    assert response.status_code == 200
+    return [result["status"] for result in response.json["results"]]
+
+
+def membership(app, user_id, room_id):
+    with app.app_context():
+        row = RoomParticipant.query.filter_by(user_id=user_id, room_id=room_id).count()
+        return row, MembershipIndex.is_member(user_id, room_id)
+
+
+def test_leave_then_join_keeps_membership(app, client, auth, make_room):
+    room_id = make_room(owner=1)
+    assert client.post(f"/rooms/{room_id}/join", headers=auth(2)).status_code == 201
+
+    assert batch(client, auth(2), ("leave", room_id), ("join", room_id)) == [200, 201]
+
+    assert membership(app, 2, room_id) == (1, True)
+    assert client.delete(f"/rooms/{room_id}/leave", headers=auth(2)).status_code == 200
+
+
+def test_join_then_leave_leaves_no_membership(app, client, auth, make_room):
+    room_id = make_room(owner=1)
+
+    assert batch(client, auth(2), ("join", room_id), ("leave", room_id)) == [201, 200]
+
+    assert membership(app, 2, room_id) == (0, False)
+    assert client.post(f"/rooms/{room_id}/join", headers=auth(2)).status_code == 201
+
+
+def test_failed_commit_only_fails_the_writes(app, client, auth, make_room, monkeypatch):
+    joined, other = make_room(owner=1), make_room(owner=1)
+    assert client.post(f"/rooms/{joined}/join", headers=auth(2)).status_code == 201
+
+    from models import db
+    def fail():
+        raise RuntimeError("commit failed")
+    monkeypatch.setattr(db.session, "commit", fail)
+
+    statuses = batch(client, auth(2), ("join", joined), ("join", other), ("detail", joined))
+
+    assert statuses == [200, 500, 200]
@@ -0,0 +1,15 @@
+from models import Room
+from utils.search import RoomSearch
+
+
+def test_a_non_positive_limit_pages_one_room_at_a_time(client, auth, make_room, monkeypatch):
+    make_room(name="jazz night")
+    make_room(name="jazz brunch")
+    # The FTS tables come from migrations; the paging arithmetic is what's under test
+    monkeypatch.setattr(RoomSearch, "search", staticmethod(
+        lambda query, limit=20, offset=0: Room.query.order_by(Room.id).offset(offset).limit(limit).all()
+    ))
+    page = client.get("/rooms/search?q=jazz&limit=0", headers=auth(1)).json
+    assert len(page["rooms"]) == 1 and page["next_offset"] == 1
+    page = client.get("/rooms/search?q=jazz&limit=-5&offset=1", headers=auth(1)).json
+    assert len(page["rooms"]) == 1 and page["next_offset"] == 2
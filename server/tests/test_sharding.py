@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+from utils.sharding import ShardCoordinator
+
+
+def test_second_process_cannot_claim_a_shard_url(app):
+    first = ShardCoordinator(app, "http://rt1:5000")
+    second = ShardCoordinator(app, "http://rt1:5000")
+    second.instance = "otherhost:1"
+    with app.app_context():
+        first.heartbeat()
+        first.heartbeat()  # refreshing our own claim is fine
+        with pytest.raises(RuntimeError, match="already served"):
+            second.heartbeat()
+        first.deregister()
+        second.heartbeat()
+        assert app.redis.zrange(ShardCoordinator.REGISTRY_KEY, 0, -1) == ["http://rt1:5000"]
+    assert first.instance.endswith(f":{os.getpid()}")
@@ -0,0 +1,46 @@
+import pytest
+
+from models import RoomParticipant, db
+from utils.membership import MembershipIndex
+
+
+@pytest.fixture(params=["db", "index"])
+def membership_source(request, app):
+    if request.param == "index":
+        with app.app_context():
+            MembershipIndex.rebuild()
+    return request.param
+
+
+def test_users_only_reveals_room_mates(app, client, auth, make_room, membership_source):
+    room_id = make_room(owner=1)
+    with app.app_context():
+        db.session.add(RoomParticipant(room_id=room_id, user_id=2))
+        db.session.commit()
+        MembershipIndex.add(2, room_id)
+
+    body = client.get("/users?ids=1,2,3", headers=auth(1)).get_json()
+    assert sorted(body["users"]) == ["1", "2"]
+    assert body["missing"] == [3]
+    assert "email" not in body["users"]["2"]
+
+    body = client.get("/users?ids=1,2,3", headers=auth(3)).get_json()
+    assert sorted(body["users"]) == ["3"]
+
+
+def test_service_callers_see_everyone(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "SERVICE_TOKEN", "secret")
+    body = client.get("/users?ids=1,2,3", headers={"X-Service-Token": "secret"}).get_json()
+    assert sorted(body["users"]) == ["1", "2", "3"]
+    assert body["users"]["3"]["email"] == "u3@example.com"
+
+
+def test_profile_update_invalidates_the_users_rooms(app, client, auth, make_room):
+    from resources.room import CacheManager
+    first, second = make_room(), make_room()
+    with app.app_context():
+        before = {room_id: CacheManager._get_generation(CacheManager.get_room_generation_key(room_id)) for room_id in (first, second)}
+    assert client.put("/user", json={"name": "renamed"}, headers=auth(1)).status_code == 200
+    with app.app_context():
+        after = {room_id: CacheManager._get_generation(CacheManager.get_room_generation_key(room_id)) for room_id in (first, second)}
+    assert all(after[room_id] > before[room_id] for room_id in before)
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User
+from utils import metrics
+
+FIELDS = ("id", "email", "name", "profile", "role")  # never the password hash
+
+
+def _entry(row):
+    return {name: getattr(row, name) for name in FIELDS}
+
+
+class UserDirectory:
+    """Email -> user lookups for the auth flows.
+
+    Two tiers: a bounded per-process LRU (AUTH_LOCAL_CACHE_SIZE entries,
+    AUTH_LOCAL_CACHE_TTL seconds) in front of a shared ``auth:email:{digest}``
+    cache entry (AUTH_EMAIL_CACHE_TTL). Entries hold the id and profile
+    only; sign-in reads the password hash from the DB each time
+    (``for_signin``), so no cache tier ever holds one. ``invalidate`` drops
+    both tiers; other workers' LRUs age out within the short local TTL.
+
+    Inserts are one ``INSERT ... ON CONFLICT (email)`` statement on Postgres
+    and SQLite, so concurrent sign-ups for one email never race to a unique
+    violation.
+    """
+
+    _local = OrderedDict()  # email -> (expires, entry)
+
+    @staticmethod
+    def get_email_key(email):
+        # v2: entries written before hashes were left out are never read
+        return f"auth:email:v2:{hashlib.sha256(email.encode()).hexdigest()[:32]}"
+
+    @staticmethod
+    def _remember(entry):
+        config = current_app.config
+        local = UserDirectory._local
+        local.pop(entry["email"], None)
+        local[entry["email"]] = (time.monotonic() + config["AUTH_LOCAL_CACHE_TTL"], entry)
+        while len(local) > config["AUTH_LOCAL_CACHE_SIZE"]:
+            local.popitem(last=False)
+
+    @staticmethod
+    def _cache(entry):
+        UserDirectory._remember(entry)
+        current_app.cache.set(
+            UserDirectory.get_email_key(entry["email"]), json.dumps(entry),
+            timeout=current_app.config["AUTH_EMAIL_CACHE_TTL"]
+        )
+
+    @staticmethod
+    def invalidate(email):
+        UserDirectory._local.pop(email, None)
+        current_app.cache.delete(UserDirectory.get_email_key(email))
+
+    @staticmethod
+    def cached(email):
+        """Cache-only lookup (local LRU, then Redis); never queries the DB."""
+        hit = UserDirectory._local.get(email)
+        if hit and hit[0] > time.monotonic():
+            UserDirectory._local.move_to_end(email)
+            metrics.incr("auth.cache.local_hits")
+            return hit[1]
+        cached = current_app.cache.get(UserDirectory.get_email_key(email))
+        if cached:
+            entry = json.loads(cached)
+            UserDirectory._remember(entry)
+            metrics.incr("auth.cache.hits")
+            return entry
+        return None
+
+    @staticmethod
+    def for_signin(email):
+        """(cached fields, password hash) for a sign-in, from one DB query; (None, None) if unknown."""
+        if not email:
+            return None, None
+        table = User.__table__
+        row = db.session.execute(
+            select(*(table.c[name] for name in FIELDS), table.c.password).where(table.c.email == email)
+        ).first()
+        if row is None:
+            return None, None
+        entry = _entry(row)
+        UserDirectory._cache(entry)
+        return entry, row.password
+
+    @staticmethod
+    def _insert(values, update):
+        """Single-statement insert on the email key.
+
+        With update=False an existing email yields None (insert-if-absent);
+        with update=True the existing row is returned untouched.
+        """
+        table = User.__table__
+        dialect = db.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return UserDirectory._insert_fallback(values, update)
+
+        stmt = insert(table).values(**values)
+        if update:
+            # A no-op update, so RETURNING also yields the row that was already there
+            stmt = stmt.on_conflict_do_update(index_elements=[table.c.email], set_={"email": stmt.excluded.email})
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.email])
+        row = db.session.execute(stmt.returning(*(table.c[name] for name in FIELDS))).first()
+        db.session.commit()
+        return _entry(row) if row is not None else None
+
+    @staticmethod
+    def _insert_fallback(values, update):
+        try:
+            db.session.execute(User.__table__.insert().values(**values))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if not update:
+                return None
+        user = User.query.filter_by(email=values["email"]).first()
+        return _entry(user)
+
+    @staticmethod
+    def upsert_oauth_user(email, name, profile):
+        """Fetch or create an OAuth user in one statement; existing profiles are left alone."""
+        entry = UserDirectory.cached(email)
+        if entry is None:
+            entry = UserDirectory._insert({"email": email, "name": name, "profile": profile}, update=True)
+            UserDirectory._cache(entry)
+        return entry
+
+    @staticmethod
+    def register(email, password_hash, name):
+        """Create a password user; None when the email is taken."""
+        entry = UserDirectory._insert({"email": email, "password": password_hash, "name": name}, update=False)
+        if entry is not None:
+            UserDirectory._cache(entry)
+        return entry
@@ -0,0 +1,275 @@
+import time
+from datetime import datetime
+
+import redis
+from flask import current_app
+from sqlalchemy import bindparam, func
+
+from models import db, RoomParticipant
+from utils import metrics
+
+# Read a room's buffered fields and take its session seconds out of the hash in
+# the same step. Seconds are a counter, so they leave Redis before the DB write:
+# a flush that fails after committing can then never add them a second time.
+CLAIM_LUA = """
+local fields = redis.call('HGETALL', KEYS[1])
+for i = 1, #fields, 2 do
+    if string.sub(fields[i], -8) == ':seconds' then
+        redis.call('HDEL', KEYS[1], fields[i])
+    end
+end
+return fields
+"""
+
+# Drop the mute/last-seen fields a flush wrote, unless a newer value arrived
+# meanwhile. Rewriting them is harmless, so a missed ack only costs a re-flush.
+ACK_LUA = """
+for i = 1, #ARGV, 2 do
+    if redis.call('HGET', KEYS[1], ARGV[i]) == ARGV[i + 1] then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+return redis.call('HLEN', KEYS[1])
+"""
+
+
+class ActivityBuffer:
+    """Write-behind buffer for participant mute state, last seen and session time.
+
+    Socket events land in one Redis hash per room (``activity:room:{id}``,
+    fields ``{user_id}:muted|seen|seconds``), coalescing repeat updates per
+    (room, user), and mark the room in ``activity:dirty``. A background flush
+    turns each batch of dirty rooms into a few executemany UPDATEs. REST reads
+    overlay the hash, so they see values the DB has not caught up with yet.
+    Without Redis, updates are written to the DB directly.
+    """
+
+    DIRTY_KEY = "activity:dirty"
+    FLUSH_LOCK_KEY = "activity:flush:lock"
+    _scripts = {}
+
+    @staticmethod
+    def get_room_key(room_id):
+        return f"activity:room:{room_id}"
+
+    @staticmethod
+    def _redis():
+        return getattr(current_app, "redis", None)
+
+    @staticmethod
+    def set_muted(room_id, user_id, muted):
+        ActivityBuffer._record(room_id, user_id, {"muted": int(bool(muted))})
+
+    @staticmethod
+    def touch(room_id, user_id):
+        ActivityBuffer._record(room_id, user_id, {"seen": f"{time.time():.3f}"})
+
+    @staticmethod
+    def end_session(room_id, user_id, seconds):
+        ActivityBuffer._record(room_id, user_id, {"seen": f"{time.time():.3f}"}, seconds=int(round(seconds)))
+
+    @staticmethod
+    def queue_muted(pipe, room_id, user_id, muted):
+        """set_muted's buffer writes, queued on any pipeline (asgi_server passes an asyncio one)."""
+        ActivityBuffer._queue(pipe, room_id, user_id, {"muted": int(bool(muted))})
+
+    @staticmethod
+    def _queue(pipe, room_id, user_id, fields, seconds=0):
+        key = ActivityBuffer.get_room_key(room_id)
+        pipe.hset(key, mapping={f"{user_id}:{name}": value for name, value in fields.items()})
+        if seconds:
+            pipe.hincrby(key, f"{user_id}:seconds", seconds)
+        pipe.sadd(ActivityBuffer.DIRTY_KEY, room_id)
+
+    @staticmethod
+    def _record(room_id, user_id, fields, seconds=0):
+        r = ActivityBuffer._redis()
+        if r is not None:
+            try:
+                pipe = r.pipeline(transaction=False)
+                ActivityBuffer._queue(pipe, room_id, user_id, fields, seconds)
+                pipe.execute()
+                return
+            except redis.RedisError as e:
+                current_app.logger.warning(f"Activity buffer unavailable, writing through: {e}")
+        pending = {f"{user_id}:{name}": str(value) for name, value in fields.items()}
+        if seconds:
+            pending[f"{user_id}:seconds"] = str(seconds)
+        ActivityBuffer._write_rows(ActivityBuffer._parse(room_id, pending).values())
+        db.session.commit()
+
+    @staticmethod
+    def _parse(room_id, fields):
+        """Buffered hash fields -> {user_id: row of column updates}."""
+        rows = {}
+        for field, value in fields.items():
+            user_id, name = field.rsplit(":", 1)
+            row = rows.setdefault(int(user_id), {"room_id": int(room_id), "user_id": int(user_id)})
+            if name == "muted":
+                row["is_muted"] = value == "1"
+            elif name == "seen":
+                row["last_seen_at"] = datetime.utcfromtimestamp(float(value))
+            elif name == "seconds":
+                row["seconds"] = int(value)
+        return rows
+
+    @staticmethod
+    def _write_rows(rows):
+        """One executemany UPDATE per distinct set of columns."""
+        table = RoomParticipant.__table__
+        shapes = {}
+        for row in rows:
+            shapes.setdefault(tuple(sorted(row)), []).append(row)
+
+        for shape, batch in shapes.items():
+            values = {}
+            if "is_muted" in shape:
+                values["is_muted"] = bindparam("b_is_muted")
+            if "last_seen_at" in shape:
+                values["last_seen_at"] = bindparam("b_last_seen_at")
+            if "seconds" in shape:
+                values["session_seconds"] = func.coalesce(table.c.session_seconds, 0) + bindparam("b_seconds")
+            stmt = table.update().where(
+                table.c.room_id == bindparam("b_room_id"),
+                table.c.user_id == bindparam("b_user_id")
+            ).values(values)
+            db.session.execute(stmt, [{f"b_{name}": value for name, value in row.items()} for row in batch])
+
+    @staticmethod
+    def flush(max_rooms=None):
+        """Write one batch of dirty rooms to the DB. Returns the number of rooms taken."""
+        r = ActivityBuffer._redis()
+        if r is None:
+            return 0
+        # One flusher at a time, so a room is never applied twice concurrently
+        if not r.set(ActivityBuffer.FLUSH_LOCK_KEY, 1, nx=True, ex=60):
+            return 0
+        try:
+            room_ids = r.spop(ActivityBuffer.DIRTY_KEY, max_rooms or current_app.config["ACTIVITY_FLUSH_BATCH"])
+            if not room_ids:
+                return 0
+            try:
+                return ActivityBuffer._flush_rooms(r, room_ids)
+            except Exception:
+                # Whatever failed, the popped rooms go back for the next tick
+                try:
+                    r.sadd(ActivityBuffer.DIRTY_KEY, *room_ids)
+                except redis.RedisError as e:
+                    current_app.logger.error(f"Activity for rooms {room_ids} not requeued: {e}")
+                raise
+        finally:
+            r.delete(ActivityBuffer.FLUSH_LOCK_KEY)
+
+    @staticmethod
+    def _script(r, name, source):
+        script = ActivityBuffer._scripts.get((id(r), name))
+        if script is None:
+            script = ActivityBuffer._scripts[(id(r), name)] = r.register_script(source)
+        return script
+
+    @staticmethod
+    def _flush_rooms(r, room_ids):
+        claim = ActivityBuffer._script(r, "claim", CLAIM_LUA)
+        # MULTI/EXEC: either every room's seconds are claimed, or none are
+        pipe = r.pipeline(transaction=True)
+        for room_id in room_ids:
+            claim(keys=[ActivityBuffer.get_room_key(room_id)], client=pipe)
+        buffered = [
+            (room_id, dict(zip(reply[::2], reply[1::2])))
+            for room_id, reply in zip(room_ids, pipe.execute()) if reply
+        ]
+
+        rows = [row for room_id, fields in buffered for row in ActivityBuffer._parse(room_id, fields).values()]
+        try:
+            ActivityBuffer._write_rows(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            ActivityBuffer._unclaim_seconds(r, buffered)
+            raise
+
+        ack = ActivityBuffer._script(r, "ack", ACK_LUA)
+        pipe = r.pipeline(transaction=False)
+        for room_id, fields in buffered:
+            written = [x for field, value in fields.items() if not field.endswith(":seconds") for x in (field, value)]
+            if written:
+                ack(keys=[ActivityBuffer.get_room_key(room_id)], args=written, client=pipe)
+        pipe.execute()
+
+        # Cached room snapshots predate the flush; rebuild them from the DB
+        from resources.room import CacheManager
+        CacheManager.bump_generations(room_ids=[room_id for room_id, _ in buffered])
+
+        metrics.incr("activity.flushed_rows", len(rows))
+        metrics.gauge("activity.last_flush_rooms", len(room_ids))
+        return len(room_ids)
+
+    @staticmethod
+    def _unclaim_seconds(r, buffered):
+        """Put claimed session seconds back after a failed DB write."""
+        try:
+            pipe = r.pipeline(transaction=False)
+            for room_id, fields in buffered:
+                for field, value in fields.items():
+                    if field.endswith(":seconds"):
+                        pipe.hincrby(ActivityBuffer.get_room_key(room_id), field, int(value))
+            pipe.execute()
+        except redis.RedisError as e:
+            metrics.incr("activity.lost_seconds")
+            current_app.logger.error(f"Session seconds for rooms {[room_id for room_id, _ in buffered]} lost: {e}")
+
+    @staticmethod
+    def flush_all():
+        batch = current_app.config["ACTIVITY_FLUSH_BATCH"]
+        while ActivityBuffer.flush(batch) >= batch:
+            pass
+
+    @staticmethod
+    def overlay(room_id, participants):
+        """Apply buffered, not yet flushed activity to serialized participants in place."""
+        return ActivityBuffer.overlay_many([(room_id, participants)])[0]
+
+    @staticmethod
+    def overlay_many(rooms):
+        """overlay() for many (room_id, participants) pairs with one pipelined HGETALL."""
+        r = ActivityBuffer._redis()
+        rooms = list(rooms)
+        pending = [(room_id, participants) for room_id, participants in rooms if participants]
+        if r is None or not pending:
+            return [participants for _, participants in rooms]
+        try:
+            pipe = r.pipeline(transaction=False)
+            for room_id, _ in pending:
+                pipe.hgetall(ActivityBuffer.get_room_key(room_id))
+            buffered = pipe.execute()
+        except redis.RedisError:
+            return [participants for _, participants in rooms]
+
+        for (room_id, participants), fields in zip(pending, buffered):
+            rows = ActivityBuffer._parse(room_id, fields)
+            for participant in participants:
+                row = rows.get(participant["id"])
+                if not row:
+                    continue
+                # Only fields the entry carries; ?fields= projections may leave some out
+                if "is_muted" in row and "is_muted" in participant:
+                    participant["is_muted"] = row["is_muted"]
+                if "last_seen_at" in row and "last_seen_at" in participant:
+                    participant["last_seen_at"] = row["last_seen_at"].isoformat()
+                if "seconds" in row and "session_seconds" in participant:
+                    participant["session_seconds"] = (participant["session_seconds"] or 0) + row["seconds"]
+        return [participants for _, participants in rooms]
+
+    @staticmethod
+    def run_flusher(app, sleep):
+        """Background loop draining the buffer every ACTIVITY_FLUSH_INTERVAL."""
+        interval = app.config["ACTIVITY_FLUSH_INTERVAL"]
+        while True:
+            sleep(interval)
+            with app.app_context():
+                try:
+                    ActivityBuffer.flush_all()
+                except Exception as e:
+                    app.logger.error(f"Activity flush failed: {e}")
+                finally:
+                    db.session.remove()
@@ -0,0 +1,89 @@
+import random
+import time
+from contextlib import contextmanager
+
+from utils import metrics
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Gate expensive connect handshakes on in-flight work, DB pool saturation and hub lag.
+
+    Excess handshakes wait in a bounded queue for a slot. Anything beyond the
+    queue, or arriving while the DB pool or event loop is saturated, is
+    rejected at once with a jittered retry-after so reconnect storms spread out.
+    """
+
+    def __init__(self, app, engine_getter, sleep):
+        self.app = app
+        self.engine_getter = engine_getter
+        self.sleep = sleep
+        self.inflight = 0
+        self.waiting = 0
+        self.hub_lag = 0.0
+
+    def _config(self, key):
+        return self.app.config[key]
+
+    def pool_usage(self):
+        """Fraction of DB connections checked out; NullPool/SQLite pools report 0."""
+        pool = self.engine_getter().pool
+        if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+            return 0.0
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        return pool.checkedout() / capacity if capacity > 0 else 0.0
+
+    def retry_after(self):
+        """Base delay scaled by current pressure, with +/-50% jitter."""
+        pressure = 1 + self.waiting / max(self._config("ADMISSION_QUEUE_SIZE"), 1)
+        return round(self._config("ADMISSION_RETRY_AFTER") * pressure * random.uniform(0.5, 1.5), 2)
+
+    def _reject(self, reason):
+        metrics.incr(f"admission.rejected.{reason}")
+        raise AdmissionRejected(reason, self.retry_after())
+
+    @contextmanager
+    def admit(self):
+        if self.hub_lag > self._config("ADMISSION_MAX_HUB_LAG"):
+            self._reject("hub_lag")
+        if self.pool_usage() >= self._config("ADMISSION_MAX_POOL_USAGE"):
+            self._reject("db_pool")
+
+        if self.inflight >= self._config("ADMISSION_MAX_INFLIGHT"):
+            if self.waiting >= self._config("ADMISSION_QUEUE_SIZE"):
+                self._reject("queue_full")
+            metrics.incr("admission.queued")
+            deadline = time.monotonic() + self._config("ADMISSION_QUEUE_TIMEOUT")
+            self.waiting += 1
+            try:
+                while self.inflight >= self._config("ADMISSION_MAX_INFLIGHT"):
+                    if time.monotonic() >= deadline:
+                        self._reject("queue_timeout")
+                    self.sleep(0.02)
+            finally:
+                self.waiting -= 1
+
+        self.inflight += 1
+        metrics.incr("admission.admitted")
+        metrics.gauge("admission.inflight", self.inflight)
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            metrics.gauge("admission.inflight", self.inflight)
+
+    def monitor(self):
+        """Background loop estimating event-loop lag from how late a short sleep wakes up."""
+        interval = 0.1
+        while True:
+            started = time.monotonic()
+            self.sleep(interval)
+            lag = max(0.0, time.monotonic() - started - interval)
+            self.hub_lag = 0.8 * self.hub_lag + 0.2 * lag
+            metrics.gauge("admission.hub_lag_ms", round(self.hub_lag * 1000, 1))
@@ -0,0 +1,380 @@
+import time
+from datetime import datetime, timedelta
+
+import click
+import redis
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import exists, func, literal, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Room, RoomParticipant, ArchivedRoom, ArchivedRoomParticipant, Notification
+from utils import metrics
+from utils.activity import ActivityBuffer
+from utils.db_routing import primary_reads
+from utils.membership import MembershipIndex
+from utils.occupancy import RoomStats
+
+ROOM_COLUMNS = ("id", "name", "description", "created_by", "created_at", "mode", "max_participants", "max_speakers")
+PARTICIPANT_COLUMNS = ("id", "room_id", "user_id", "joined_at", "is_muted", "last_seen_at", "session_seconds")
+
+
+class RoomArchive:
+    """Moves idle rooms and their memberships out of the hot tables, and back on access.
+
+    A room is idle once neither it nor any member (joined or last seen) has
+    been active for ARCHIVE_IDLE_DAYS. Idle rooms are copied into
+    ``archived_rooms``/``archived_room_participants`` and deleted from
+    ``rooms``/``room_participants`` in batches of ARCHIVE_BATCH_SIZE, one
+    transaction each, pausing between batches. Their membership index entries
+    and cached views are dropped; members still see them in their room lists
+    (``member_rooms``). ``restore`` moves a room back under its original id
+    the first time a member asks for it. The ids of archived rooms are kept
+    in a Redis set as well, so a request for a room that was never archived
+    (a miss, or any non-member's 403) does no DB work to find that out.
+    """
+
+    LOCK_KEY = "archive:lock"
+    IDS_KEY = "archive:rooms"
+    IDS_READY_KEY = "archive:rooms:ready"  # unset until the archiver has built IDS_KEY
+
+    @staticmethod
+    def _redis():
+        return getattr(current_app, "redis", None)
+
+    @staticmethod
+    def _idle_room_ids(cutoff, after, limit):
+        rooms = Room.__table__
+        parts = RoomParticipant.__table__
+        notifications = Notification.__table__
+        activity = func.max(func.coalesce(parts.c.last_seen_at, parts.c.joined_at))
+        query = (
+            select(rooms.c.id)
+            .select_from(rooms.outerjoin(parts, parts.c.room_id == rooms.c.id))
+            .where(
+                rooms.c.id > after,
+                rooms.c.created_at < cutoff,
+                # notifications keep a foreign key to rooms; those rooms stay put
+                ~exists().where(notifications.c.room_id == rooms.c.id),
+            )
+            .group_by(rooms.c.id)
+            .having(db.or_(activity.is_(None), activity < cutoff))
+            .order_by(rooms.c.id)
+            .limit(limit)
+        )
+        return [room_id for (room_id,) in db.session.execute(query)]
+
+    @staticmethod
+    def _busy(room_ids):
+        """Rooms with unflushed activity or live sockets, whatever the DB says."""
+        r = RoomArchive._redis()
+        if r is None:
+            return set()
+        pipe = r.pipeline(transaction=False)
+        for room_id in room_ids:
+            pipe.exists(ActivityBuffer.get_room_key(room_id))
+            pipe.get(RoomStats.get_live_key(room_id))
+        replies = pipe.execute()
+        return {
+            room_id for room_id, pending, live in zip(room_ids, replies[::2], replies[1::2])
+            if pending or int(live or 0) > 0
+        }
+
+    @staticmethod
+    def _archive_batch(room_ids):
+        """Move one batch in a single transaction. Returns the (user_id, room_id) memberships moved."""
+        rooms = Room.__table__
+        parts = RoomParticipant.__table__
+        archived_rooms = ArchivedRoom.__table__
+        archived_parts = ArchivedRoomParticipant.__table__
+
+        last_active = (
+            select(func.max(func.coalesce(parts.c.last_seen_at, parts.c.joined_at)))
+            .where(parts.c.room_id == rooms.c.id)
+            .scalar_subquery()
+        )
+        db.session.execute(archived_rooms.insert().from_select(
+            [*ROOM_COLUMNS, "last_active_at", "archived_at"],
+            select(
+                *(rooms.c[name] for name in ROOM_COLUMNS),
+                func.coalesce(last_active, rooms.c.created_at),
+                literal(datetime.utcnow()),
+            ).where(rooms.c.id.in_(room_ids)),
+        ))
+        moved = db.session.execute(archived_parts.insert().from_select(
+            PARTICIPANT_COLUMNS,
+            select(*(parts.c[name] for name in PARTICIPANT_COLUMNS)).where(parts.c.room_id.in_(room_ids)),
+        )).rowcount
+        deleted = db.session.execute(parts.delete().where(parts.c.room_id.in_(room_ids))).rowcount
+        if deleted != moved:
+            # Someone joined between the copy and the delete; leave the batch for the next run
+            db.session.rollback()
+            metrics.incr("archive.batch_conflicts")
+            return None
+        db.session.execute(rooms.delete().where(rooms.c.id.in_(room_ids)))
+        members = db.session.execute(
+            select(archived_parts.c.user_id, archived_parts.c.room_id).where(archived_parts.c.room_id.in_(room_ids))
+        ).all()
+        r = RoomArchive._redis()
+        if r is not None:
+            # Before the commit: an id left over from a failed commit costs a lookup, a missing one hides the room
+            r.sadd(RoomArchive.IDS_KEY, *room_ids)
+        db.session.commit()
+        return [tuple(row) for row in members]
+
+    @staticmethod
+    def _rebuild_ids(r):
+        """Rebuild the archived-id set from archived_rooms; the caller holds LOCK_KEY."""
+        room_ids = [room_id for (room_id,) in db.session.query(ArchivedRoom.id)]
+        pipe = r.pipeline(transaction=True)
+        pipe.delete(RoomArchive.IDS_KEY)
+        for start in range(0, len(room_ids), 1000):
+            pipe.sadd(RoomArchive.IDS_KEY, *room_ids[start:start + 1000])
+        pipe.set(RoomArchive.IDS_READY_KEY, 1)
+        pipe.execute()
+        return len(room_ids)
+
+    @staticmethod
+    def ensure_ids():
+        """Build a missing archived-id set, unless an archiver run (which builds it too) holds the lock."""
+        r = RoomArchive._redis()
+        if r is None or r.exists(RoomArchive.IDS_READY_KEY):
+            return
+        if not r.set(RoomArchive.LOCK_KEY, 1, nx=True, ex=600):
+            return
+        try:
+            RoomArchive._rebuild_ids(r)
+        finally:
+            r.delete(RoomArchive.LOCK_KEY)
+
+    @staticmethod
+    def _maybe_archived(room_id):
+        """Whether room_id may be archived: SISMEMBER on the id set, or a plain lookup until it is built.
+
+        Never a false negative; a stale id is dropped by the restore that finds nothing.
+        """
+        r = RoomArchive._redis()
+        if r is not None:
+            try:
+                pipe = r.pipeline(transaction=False)
+                pipe.exists(RoomArchive.IDS_READY_KEY)
+                pipe.sismember(RoomArchive.IDS_KEY, room_id)
+                ready, archived = pipe.execute()
+                if ready:
+                    return bool(archived)
+            except redis.RedisError as e:
+                current_app.logger.warning(f"Archived-room set unavailable, using DB: {e}")
+        return bool(RoomArchive.archived_ids([room_id]))
+
+    @staticmethod
+    def _forget(room_id):
+        r = RoomArchive._redis()
+        if r is None:
+            return
+        try:
+            r.srem(RoomArchive.IDS_KEY, room_id)
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Could not drop room {room_id} from the archived-room set: {e}")
+
+    @staticmethod
+    def _evict(room_ids, members):
+        """Drop index entries and cached views of rooms that left (or rejoined) the hot tables."""
+        from resources.room import CacheManager
+        try:
+            for room_id in room_ids:
+                CacheManager.bump_room_generation(room_id)
+            for user_id in {user_id for user_id, _ in members}:
+                CacheManager.bump_user_generation(user_id)  # their room lists
+            r = RoomArchive._redis()
+            if r is not None and room_ids:
+                r.delete(*(RoomStats.get_live_key(room_id) for room_id in room_ids))
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Archive cache eviction incomplete for rooms {room_ids}: {e}")
+
+    @staticmethod
+    def archive_idle(idle_days=None, max_rooms=None, dry_run=False, sleep=time.sleep):
+        """Archive idle rooms in throttled batches. Returns a summary of the run."""
+        config = current_app.config
+        idle_days = idle_days or config["ARCHIVE_IDLE_DAYS"]
+        max_rooms = max_rooms or config["ARCHIVE_MAX_ROOMS"]
+        batch_size = config["ARCHIVE_BATCH_SIZE"]
+        cutoff = datetime.utcnow() - timedelta(days=idle_days)
+        report = {"archived": 0, "memberships": 0, "busy": 0, "conflicts": 0, "batches": 0}
+
+        r = RoomArchive._redis() if not dry_run else None
+        # One archiver across workers; the lock expires on its own if a run dies
+        if r is not None and not r.set(RoomArchive.LOCK_KEY, 1, nx=True, ex=max(config["ARCHIVE_INTERVAL"], 600)):
+            report["skipped"] = "another archiver is running"
+            return report
+        try:
+            if r is not None and not r.exists(RoomArchive.IDS_READY_KEY):
+                RoomArchive._rebuild_ids(r)
+            after = 0
+            while report["archived"] < max_rooms:
+                room_ids = RoomArchive._idle_room_ids(cutoff, after, min(batch_size, max_rooms - report["archived"]))
+                if not room_ids:
+                    break
+                after = room_ids[-1]
+                busy = RoomArchive._busy(room_ids)
+                room_ids = [room_id for room_id in room_ids if room_id not in busy]
+                report["busy"] += len(busy)
+                if dry_run:
+                    report["archived"] += len(room_ids)
+                    continue
+                if not room_ids:
+                    continue
+
+                members = RoomArchive._archive_batch(room_ids)
+                report["batches"] += 1
+                if members is None:
+                    report["conflicts"] += 1
+                else:
+                    MembershipIndex.remove_many(members)
+                    RoomArchive._evict(room_ids, members)
+                    report["archived"] += len(room_ids)
+                    report["memberships"] += len(members)
+                    metrics.incr("archive.rooms", len(room_ids))
+                # Spread the deletes out so replicas and the hot path keep up
+                sleep(config["ARCHIVE_BATCH_PAUSE"])
+        finally:
+            if r is not None:
+                r.delete(RoomArchive.LOCK_KEY)
+        return report
+
+    @staticmethod
+    def archived_ids(room_ids):
+        """Which of room_ids are archived, in one query."""
+        if not room_ids:
+            return []
+        rows = db.session.query(ArchivedRoom.id).filter(ArchivedRoom.id.in_(room_ids))
+        return [room_id for (room_id,) in rows]
+
+    @staticmethod
+    def member_rooms(user_id):
+        """(ArchivedRoom, member count) for each archived room the user belongs to."""
+        archived_parts = ArchivedRoomParticipant.__table__
+        room_ids = select(archived_parts.c.room_id).where(archived_parts.c.user_id == int(user_id))
+        rooms = db.session.query(ArchivedRoom).filter(ArchivedRoom.id.in_(room_ids)).order_by(ArchivedRoom.id).all()
+        if not rooms:
+            return []
+        counts = dict(
+            db.session.query(ArchivedRoomParticipant.room_id, func.count(ArchivedRoomParticipant.id))
+            .filter(ArchivedRoomParticipant.room_id.in_([room.id for room in rooms]))
+            .group_by(ArchivedRoomParticipant.room_id)
+        )
+        return [(room, counts.get(room.id, 0)) for room in rooms]
+
+    @staticmethod
+    def _is_live(room_id, member_id):
+        """Whether the room is in the hot tables (with member_id as a member, if given), read on the primary."""
+        with primary_reads():
+            if member_id is None:
+                return db.session.query(Room.id).filter_by(id=room_id).first() is not None
+            return db.session.query(RoomParticipant.id).filter_by(room_id=room_id, user_id=int(member_id)).first() is not None
+
+    @staticmethod
+    def restore(room_id, member_id=None):
+        """Move an archived room and its members back. Returns True if the room is live again.
+
+        Requests pass member_id: only a member of the archived room can bring
+        it back, and True also means member_id is one of its members. Without
+        it (operators) any archived room comes back. A room a concurrent
+        request restored first counts as restored. Rooms missing from the
+        archived-id set return False without touching the DB. Replicas may
+        not have a restored room's rows yet; callers that read them next
+        should do so under primary_reads().
+        """
+        if not RoomArchive._maybe_archived(room_id):
+            return False
+        archived_rooms = ArchivedRoom.__table__
+        archived_parts = ArchivedRoomParticipant.__table__
+        query = select(archived_rooms.c.id).where(archived_rooms.c.id == room_id)
+        if member_id is not None:
+            query = query.where(exists().where(
+                archived_parts.c.room_id == archived_rooms.c.id,
+                archived_parts.c.user_id == int(member_id),
+            ))
+        # A locking read, so it goes to the primary and concurrent restores serialize
+        found = db.session.execute(query.with_for_update()).first()
+        if found is None:
+            # Not archived for this member, or the restore that held the lock just moved it back
+            if not RoomArchive.archived_ids([room_id]):
+                RoomArchive._forget(room_id)
+            return RoomArchive._is_live(room_id, member_id)
+
+        try:
+            db.session.execute(Room.__table__.insert().from_select(
+                ROOM_COLUMNS,
+                select(*(archived_rooms.c[name] for name in ROOM_COLUMNS)).where(archived_rooms.c.id == room_id),
+            ))
+            db.session.execute(RoomParticipant.__table__.insert().from_select(
+                PARTICIPANT_COLUMNS,
+                select(*(archived_parts.c[name] for name in PARTICIPANT_COLUMNS)).where(archived_parts.c.room_id == room_id),
+            ))
+            members = db.session.execute(
+                select(archived_parts.c.user_id, archived_parts.c.room_id).where(archived_parts.c.room_id == room_id)
+            ).all()
+            db.session.execute(archived_parts.delete().where(archived_parts.c.room_id == room_id))
+            db.session.execute(archived_rooms.delete().where(archived_rooms.c.id == room_id))
+            db.session.commit()
+        except IntegrityError:
+            # Another request restored it first
+            db.session.rollback()
+            return RoomArchive._is_live(room_id, member_id)
+
+        members = [tuple(row) for row in members]
+        MembershipIndex.add_many(members)
+        RoomArchive._evict([room_id], members)
+        RoomArchive._forget(room_id)
+        metrics.incr("archive.restored")
+        return True
+
+    @staticmethod
+    def run_archiver(app, sleep):
+        """Background loop archiving idle rooms every ARCHIVE_INTERVAL."""
+        interval = app.config["ARCHIVE_INTERVAL"]
+        with app.app_context():
+            try:
+                RoomArchive.ensure_ids()
+            except Exception as e:
+                app.logger.error(f"Archived-room set not built: {e}")
+            finally:
+                db.session.remove()
+        while True:
+            sleep(interval)
+            with app.app_context():
+                try:
+                    report = RoomArchive.archive_idle(sleep=sleep)
+                    if report["archived"]:
+                        app.logger.info(f"Archived idle rooms: {report}")
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f"Room archival failed: {e}")
+                finally:
+                    db.session.remove()
+
+
+archive_cli = AppGroup("archive", help="Archive idle rooms and restore archived ones.")
+
+
+@archive_cli.command("run")
+@click.option("--idle-days", type=int, default=None, help="Override ARCHIVE_IDLE_DAYS.")
+@click.option("--max-rooms", type=int, default=None, help="Override ARCHIVE_MAX_ROOMS.")
+@click.option("--dry-run", is_flag=True, help="Count idle rooms without moving them.")
+def run_command(idle_days, max_rooms, dry_run):
+    """Archive rooms idle for longer than the threshold."""
+    report = RoomArchive.archive_idle(idle_days=idle_days, max_rooms=max_rooms, dry_run=dry_run)
+    verb = "Would archive" if dry_run else "Archived"
+    click.echo(f"{verb} {report['archived']} rooms ({report['busy']} busy skipped, {report['conflicts']} batch conflicts)")
+    if "skipped" in report:
+        click.echo(f"Skipped: {report['skipped']}")
+
+
+@archive_cli.command("restore")
+@click.argument("room_id", type=int)
+def restore_command(room_id):
+    """Move an archived room and its members back."""
+    if RoomArchive.restore(room_id):
+        click.echo(f"Restored room {room_id}")
+    else:
+        click.echo(f"Room {room_id} is not archived")
@@ -0,0 +1,211 @@
+import json
+import zlib
+
+import click
+import redis
+from flask import current_app
+from flask.cli import AppGroup
+
+from utils import metrics
+
+REF = "$ref"
+PLAIN = b"j"        # payload is JSON
+COMPRESSED = b"z"   # payload is zlib-compressed JSON
+
+
+def family(key):
+    """Key family for accounting: ``room:7:g123:details`` -> ``room.details``."""
+    parts = key.split(":")
+    return f"{parts[0]}.{parts[-1]}" if len(parts) > 1 else parts[0]
+
+
+class CacheStore:
+    """JSON cache payloads that are compressed, deduplicated and size-accounted.
+
+    Values are stored as one marker byte plus JSON, zlib-compressed once the
+    JSON passes CACHE_COMPRESS_THRESHOLD bytes. When entries are written
+    together, a top-level field of one value that *is* another entry's value
+    (say a room's participant list) is stored once. The other entry holds
+    ``{"$ref": key}`` instead, and a referenced entry lives as long as its
+    longest-lived referrer. Reads resolve references with one more MGET, and
+    an entry whose reference expired reads as a miss.
+
+    Every write counts entries, JSON bytes and stored bytes per key family
+    in /metrics; ``report`` measures what each family holds in Redis now.
+    When Redis is unreachable, reads miss and writes are dropped.
+    """
+
+    @staticmethod
+    def encode(value):
+        data = json.dumps(value, separators=(",", ":")).encode()
+        if len(data) >= current_app.config["CACHE_COMPRESS_THRESHOLD"]:
+            compressed = zlib.compress(data, current_app.config["CACHE_COMPRESS_LEVEL"])
+            if len(compressed) < len(data):
+                return COMPRESSED + compressed, len(data)
+        return PLAIN + data, len(data)
+
+    @staticmethod
+    def decode(payload):
+        if payload is None:
+            return None
+        if isinstance(payload, str):
+            payload = payload.encode()
+        marker, body = payload[:1], payload[1:]
+        if marker == COMPRESSED:
+            body = zlib.decompress(body)
+        elif marker != PLAIN:
+            return None  # written before this format; treat as a miss
+        return json.loads(body)
+
+    @staticmethod
+    def _backend():
+        return current_app.cache.cache
+
+    @staticmethod
+    def _read(keys):
+        backend = CacheStore._backend()
+        client = getattr(backend, "_read_client", None)
+        if client is None:
+            return backend.get_many(*keys)
+        try:
+            # Raw bytes, bypassing cachelib's pickling; the payload carries its own format
+            return client.mget([f"{backend._get_prefix()}{key}" for key in keys])
+        except redis.RedisError:
+            metrics.incr("cache.bypassed.get_many")
+            return [None] * len(keys)
+
+    @staticmethod
+    def _write(payloads, timeouts):
+        backend = CacheStore._backend()
+        client = getattr(backend, "_write_client", None)
+        if client is None:
+            for key, payload in payloads.items():
+                backend.set(key, payload, timeout=timeouts[key])
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, payload in payloads.items():
+                pipe.setex(f"{backend._get_prefix()}{key}", timeouts[key], payload)
+            pipe.execute()
+        except redis.RedisError:
+            metrics.incr("cache.bypassed.set_many")
+
+    @staticmethod
+    def set(key, value, timeout):
+        CacheStore.set_many({key: (value, timeout)})
+
+    @staticmethod
+    def set_many(entries):
+        """Write {key: (value, timeout)} in one pipeline, storing shared sub-objects once."""
+        if not entries:
+            return
+        owners = {id(value): key for key, (value, _) in entries.items() if isinstance(value, (dict, list))}
+        timeouts = {key: timeout for key, (_, timeout) in entries.items()}
+        values = {}
+        for key, (value, timeout) in entries.items():
+            if isinstance(value, dict):
+                refs = {field: owners[id(v)] for field, v in value.items() if owners.get(id(v), key) != key}
+                if refs:
+                    value = {**value, **{field: {REF: ref} for field, ref in refs.items()}}
+                    for ref in refs.values():
+                        timeouts[ref] = max(timeouts[ref], timeout)
+            values[key] = value
+
+        payloads = {}
+        for key, value in values.items():
+            payloads[key], raw = CacheStore.encode(value)
+            name = family(key)
+            metrics.incr(f"cache.writes.{name}")
+            metrics.incr(f"cache.json_bytes.{name}", raw)
+            metrics.incr(f"cache.stored_bytes.{name}", len(payloads[key]))
+        CacheStore._write(payloads, timeouts)
+
+    @staticmethod
+    def get(key, resolve=True):
+        return CacheStore.get_many([key], resolve=resolve)[0]
+
+    @staticmethod
+    def get_many(keys, resolve=True):
+        """Values for keys (None on a miss), with references resolved unless resolve=False."""
+        if not keys:
+            return []
+        values = [CacheStore.decode(payload) for payload in CacheStore._read(keys)]
+        if not resolve:
+            return values
+
+        known = {key: value for key, value in zip(keys, values) if value is not None}
+        wanted = sorted({
+            field[REF] for value in values if isinstance(value, dict)
+            for field in value.values() if isinstance(field, dict) and REF in field and field[REF] not in known
+        })
+        if wanted:
+            known.update(zip(wanted, (CacheStore.decode(payload) for payload in CacheStore._read(wanted))))
+
+        resolved = []
+        for value in values:
+            if isinstance(value, dict):
+                refs = {name: field[REF] for name, field in value.items() if isinstance(field, dict) and REF in field}
+                if any(known.get(ref) is None for ref in refs.values()):
+                    value = None
+                elif refs:
+                    value = {**value, **{name: known[ref] for name, ref in refs.items()}}
+            resolved.append(value)
+        return resolved
+
+    @staticmethod
+    def report(patterns, max_keys=100000):
+        """Live keys, bytes and remaining TTL per key family, from a SCAN of up to max_keys keys."""
+        backend = CacheStore._backend()
+        client = getattr(backend, "_read_client", None)
+        if client is None:
+            return {}
+        prefix = backend._get_prefix()
+        families = {}
+        scanned = 0
+        for pattern in patterns:
+            keys = []
+            for key in client.scan_iter(match=f"{prefix}{pattern}", count=1000):
+                keys.append(key)
+                scanned += 1
+                if scanned >= max_keys:
+                    break
+            for start in range(0, len(keys), 1000):
+                batch = keys[start:start + 1000]
+                pipe = client.pipeline(transaction=False)
+                for key in batch:
+                    pipe.strlen(key)
+                    pipe.ttl(key)
+                replies = pipe.execute()
+                for key, size, ttl in zip(batch, replies[::2], replies[1::2]):
+                    name = family((key.decode() if isinstance(key, bytes) else key)[len(prefix):])
+                    stats = families.setdefault(name, {"keys": 0, "bytes": 0, "ttl_total": 0})
+                    stats["keys"] += 1
+                    stats["bytes"] += size
+                    stats["ttl_total"] += max(ttl, 0)
+            if scanned >= max_keys:
+                break
+
+        for stats in families.values():
+            stats["avg_bytes"] = round(stats["bytes"] / stats["keys"])
+            stats["avg_ttl_left"] = round(stats.pop("ttl_total") / stats["keys"])
+        return families
+
+
+cache_cli = AppGroup("cache", help="Inspect cache memory use.")
+
+
+@cache_cli.command("report")
+@click.option("--max-keys", type=int, default=100000, help="Stop scanning after this many keys.")
+def report_command(max_keys):
+    """Bytes held by each CacheManager key family, with average size and TTL left."""
+    from resources.room import CacheManager
+    try:
+        families = CacheStore.report(CacheManager.KEY_PATTERNS, max_keys=max_keys)
+    except redis.RedisError as e:
+        raise click.ClickException(f"Redis unavailable: {e}")
+    if not families:
+        click.echo("No cached entries (or the cache is not Redis)")
+        return
+    click.echo(f"{'family':<20}{'keys':>10}{'bytes':>14}{'avg bytes':>12}{'avg ttl left':>14}")
+    for name, stats in sorted(families.items(), key=lambda item: -item[1]["bytes"]):
+        click.echo(f"{name:<20}{stats['keys']:>10}{stats['bytes']:>14}{stats['avg_bytes']:>12}{stats['avg_ttl_left']:>14}")
@@ -0,0 +1,127 @@
+import random
+from contextlib import contextmanager
+from functools import wraps
+
+import redis
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND_PREFIX = "replica_"  # SQLALCHEMY_BINDS keys built from DATABASE_REPLICA_URLS
+READ_METHODS = ("GET", "HEAD")
+
+
+def _pin_key(user_id):
+    return f"db:pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Send this user's reads to the primary for a short while after they write."""
+    if user_id is None:
+        return
+    g.setdefault("db_pins", {})[str(user_id)] = True
+    client = getattr(current_app, "redis", None)
+    if client is None:
+        return
+    try:
+        client.set(_pin_key(user_id), 1, ex=current_app.config["DB_PRIMARY_PIN_SECONDS"])
+    except redis.RedisError:
+        current_app.logger.warning(f"Could not pin user {user_id} to the primary")
+
+
+def _is_pinned(user_id):
+    pins = g.setdefault("db_pins", {})
+    key = str(user_id)
+    if key not in pins:
+        client = getattr(current_app, "redis", None)
+        try:
+            pins[key] = bool(client.exists(_pin_key(user_id))) if client is not None else False
+        except redis.RedisError:
+            pins[key] = True  # can't tell whether they just wrote; stay consistent
+    return pins[key]
+
+
+def _request_user_id():
+    """Caller identity for pin checks: set explicitly (sockets) or from the verified JWT."""
+    user_id = g.get("db_user_id")
+    if user_id is not None:
+        return user_id
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None  # jwt not verified for this request
+
+
+def _reads_go_to_replica():
+    if not has_request_context() or g.get("db_primary_only"):
+        return False
+    if request.method not in READ_METHODS:
+        return False
+    user_id = _request_user_id()
+    return user_id is None or not _is_pinned(user_id)
+
+
+def primary_only(f):
+    """Keep every query of a read-method handler on the primary (check-then-write GETs)."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        g.db_primary_only = True
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def reading_from_replica():
+    """Whether plain SELECTs issued now would go to a replica."""
+    engines = current_app.extensions["sqlalchemy"].engines
+    return any(key and key.startswith(REPLICA_BIND_PREFIX) for key in engines) and _reads_go_to_replica()
+
+
+@contextmanager
+def primary_reads():
+    """Keep the enclosed queries on the primary; also usable as a decorator."""
+    previous = g.get("db_primary_only", False)
+    g.db_primary_only = True
+    try:
+        yield
+    finally:
+        g.db_primary_only = previous
+
+
+class RoutingSession(Session):
+    """Sends SELECTs issued while serving GET/HEAD requests to a replica bind.
+
+    Flushes, DML, locking reads and anything outside a request use the
+    primary, as do reads by a user pinned after a recent write. One replica
+    is chosen per request so a request sees a single snapshot.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and self._is_plain_select(clause):
+            replica = self._replica_engine()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    @staticmethod
+    def _is_plain_select(clause):
+        return (
+            clause is not None
+            and getattr(clause, "is_select", False)
+            and getattr(clause, "_for_update_arg", None) is None
+        )
+
+    def _replica_engine(self):
+        keys = [key for key in self._db.engines if key and key.startswith(REPLICA_BIND_PREFIX)]
+        if not keys or not _reads_go_to_replica():
+            return None
+        if "db_replica" not in g:
+            g.db_replica = random.choice(keys)
+        return self._db.engines[g.db_replica]
+
+
+def init_app(app):
+    @app.after_request
+    def pin_writers(response):
+        if request.method not in READ_METHODS and request.method != "OPTIONS" and response.status_code < 400:
+            pin_to_primary(_request_user_id())
+        return response
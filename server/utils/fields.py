@@ -0,0 +1,24 @@
+from flask import request
+
+
+def requested_fields(allowed):
+    """The ``?fields=a,b`` sparse fieldset as a sorted tuple, or None when absent.
+
+    ``id`` is always included. Raises ValueError naming any field not in
+    allowed, for the resource to turn into a 400.
+    """
+    raw = request.args.get("fields")
+    if raw is None:
+        return None
+    fields = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = fields.difference(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields {', '.join(sorted(unknown))}; choose from {', '.join(allowed)}")
+    return tuple(sorted(fields | {"id"}))
+
+
+def pick(data, fields):
+    """Keep only the given keys of a serialized dict; fields=None keeps everything."""
+    if fields is None:
+        return data
+    return {name: data[name] for name in fields if name in data}
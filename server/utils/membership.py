@@ -0,0 +1,359 @@
+import time
+
+import click
+import redis
+from flask import current_app
+from flask.cli import AppGroup
+
+from models import db, RoomParticipant
+
+
+class MembershipIndex:
+    """Authoritative room membership held in Redis sets.
+
+    ``room:{id}:members`` and ``user:{id}:rooms`` mirror ``room_participants``.
+    They are maintained on create/join/leave, and any Redis failure falls
+    back to querying the DB directly. A background loop (``run_checker``)
+    rebuilds them from the DB on cold start; until then reads use the DB.
+    When an add or remove fails, the room is marked dirty in this process
+    and resynced from the DB before the index answers its next read here.
+    """
+
+    READY_KEY = "membership:ready"
+    REBUILD_LOCK_KEY = "membership:rebuild:lock"
+    CHECK_LOCK_KEY = "membership:check:lock"
+    BATCH_SIZE = 1000
+    READY_POLL_SECONDS = 10
+
+    _dirty_rooms = set()  # rooms whose index writes failed in this process
+
+    @staticmethod
+    def get_room_members_key(room_id):
+        return f"room:{room_id}:members"
+
+    @staticmethod
+    def get_user_rooms_key(user_id):
+        return f"user:{user_id}:rooms"
+
+    @staticmethod
+    def _redis():
+        return getattr(current_app, "redis", None)
+
+    @staticmethod
+    def ensure_ready():
+        """True when the index can answer reads. Never rebuilds; see run_checker.
+
+        Resyncs rooms whose writes failed earlier in this process first, and
+        raises RedisError if that is not possible yet, so callers use the DB.
+        """
+        r = MembershipIndex._redis()
+        if r is None:
+            return False
+        if not r.exists(MembershipIndex.READY_KEY):
+            return False
+        MembershipIndex.resync_dirty()
+        return True
+
+    @staticmethod
+    def resync_dirty():
+        for room_id in sorted(MembershipIndex._dirty_rooms):
+            MembershipIndex.resync_room(room_id)
+            MembershipIndex._dirty_rooms.discard(room_id)
+
+    @staticmethod
+    def resync_room(room_id, actual=None):
+        """Make one room's set (and its members' user sets) match the DB; True if it had drifted.
+
+        Redis is read before the DB: a join or leave landing in between has
+        already committed by the time the DB is read, so it is never undone.
+        """
+        r = MembershipIndex._redis()
+        room_key = MembershipIndex.get_room_members_key(room_id)
+        if actual is None:
+            actual = r.smembers(room_key)
+        want = {
+            str(user_id) for (user_id,) in
+            db.session.query(RoomParticipant.user_id).filter_by(room_id=int(room_id))
+        }
+        if actual == want:
+            return False
+        pipe = r.pipeline()
+        for user_id in actual - want:
+            pipe.srem(room_key, user_id)
+            pipe.srem(MembershipIndex.get_user_rooms_key(user_id), room_id)
+        for user_id in want - actual:
+            pipe.sadd(room_key, user_id)
+            pipe.sadd(MembershipIndex.get_user_rooms_key(user_id), room_id)
+        pipe.execute()
+        return True
+
+    @staticmethod
+    def rebuild_if_missing():
+        """Rebuild the index if Redis came up empty; one worker at a time. True if it rebuilt."""
+        r = MembershipIndex._redis()
+        if r.exists(MembershipIndex.READY_KEY):
+            return False
+        if not r.set(MembershipIndex.REBUILD_LOCK_KEY, 1, nx=True, ex=600):
+            return False
+        try:
+            MembershipIndex.rebuild()
+        finally:
+            r.delete(MembershipIndex.REBUILD_LOCK_KEY)
+        return True
+
+    @staticmethod
+    def rebuild():
+        """Drop and repopulate every membership set from room_participants."""
+        r = MembershipIndex._redis()
+        r.delete(MembershipIndex.READY_KEY)
+        for pattern in ("room:*:members", "user:*:rooms"):
+            pipe = r.pipeline(transaction=False)
+            for key in r.scan_iter(match=pattern, count=MembershipIndex.BATCH_SIZE):
+                pipe.delete(key)
+            pipe.execute()
+
+        rows = (
+            db.session.query(RoomParticipant.room_id, RoomParticipant.user_id)
+            .execution_options(yield_per=MembershipIndex.BATCH_SIZE)
+        )
+        pipe = r.pipeline(transaction=False)
+        pending = 0
+        total = 0
+        for room_id, user_id in rows:
+            pipe.sadd(MembershipIndex.get_room_members_key(room_id), user_id)
+            pipe.sadd(MembershipIndex.get_user_rooms_key(user_id), room_id)
+            pending += 1
+            total += 1
+            if pending >= MembershipIndex.BATCH_SIZE:
+                pipe.execute()
+                pending = 0
+        pipe.set(MembershipIndex.READY_KEY, 1)
+        pipe.execute()
+        return total
+
+    @staticmethod
+    def add(user_id, room_id):
+        r = MembershipIndex._redis()
+        if r is None:
+            return
+        try:
+            pipe = r.pipeline()
+            pipe.sadd(MembershipIndex.get_room_members_key(room_id), user_id)
+            pipe.sadd(MembershipIndex.get_user_rooms_key(user_id), room_id)
+            pipe.execute()
+        except redis.RedisError as e:
+            MembershipIndex._dirty_rooms.add(room_id)
+            current_app.logger.error(f"Membership index add failed for {user_id}/{room_id}: {e}")
+
+    @staticmethod
+    def remove(user_id, room_id):
+        r = MembershipIndex._redis()
+        if r is None:
+            return
+        try:
+            pipe = r.pipeline()
+            pipe.srem(MembershipIndex.get_room_members_key(room_id), user_id)
+            pipe.srem(MembershipIndex.get_user_rooms_key(user_id), room_id)
+            pipe.execute()
+        except redis.RedisError as e:
+            MembershipIndex._dirty_rooms.add(room_id)
+            current_app.logger.error(f"Membership index remove failed for {user_id}/{room_id}: {e}")
+
+    @staticmethod
+    def add_many(pairs):
+        """Index many (user_id, room_id) memberships in one pipeline."""
+        MembershipIndex._apply_many("sadd", pairs)
+
+    @staticmethod
+    def remove_many(pairs):
+        """Drop many (user_id, room_id) memberships in one pipeline."""
+        MembershipIndex._apply_many("srem", pairs)
+
+    @staticmethod
+    def _apply_many(op, pairs):
+        r = MembershipIndex._redis()
+        if r is None or not pairs:
+            return
+        try:
+            pipe = r.pipeline(transaction=False)
+            for user_id, room_id in pairs:
+                getattr(pipe, op)(MembershipIndex.get_room_members_key(room_id), user_id)
+                getattr(pipe, op)(MembershipIndex.get_user_rooms_key(user_id), room_id)
+            pipe.execute()
+        except redis.RedisError as e:
+            # Resynced from the DB before this process reads the index again
+            MembershipIndex._dirty_rooms.update(room_id for _, room_id in pairs)
+            current_app.logger.error(f"Membership index {op} failed for {len(pairs)} memberships: {e}")
+
+    @staticmethod
+    def is_member(user_id, room_id):
+        try:
+            if MembershipIndex.ensure_ready():
+                return bool(MembershipIndex._redis().sismember(
+                    MembershipIndex.get_room_members_key(room_id), str(user_id)
+                ))
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Membership index unavailable, using DB: {e}")
+        return db.session.query(RoomParticipant.id)\
+            .filter_by(user_id=user_id, room_id=room_id).first() is not None
+
+    @staticmethod
+    def user_room_ids(user_id):
+        try:
+            if MembershipIndex.ensure_ready():
+                members = MembershipIndex._redis().smembers(MembershipIndex.get_user_rooms_key(user_id))
+                return sorted(int(room_id) for room_id in members)
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Membership index unavailable, using DB: {e}")
+        rows = db.session.query(RoomParticipant.room_id).filter_by(user_id=user_id).all()
+        return sorted(room_id for (room_id,) in rows)
+
+    @staticmethod
+    def memberships(user_id, room_ids):
+        """The subset of room_ids the user belongs to, in one SMISMEMBER."""
+        if not room_ids:
+            return set()
+        try:
+            if MembershipIndex.ensure_ready():
+                flags = MembershipIndex._redis().smismember(MembershipIndex.get_user_rooms_key(user_id), room_ids)
+                return {room_id for room_id, flag in zip(room_ids, flags) if flag}
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Membership index unavailable, using DB: {e}")
+        rows = db.session.query(RoomParticipant.room_id)\
+            .filter(RoomParticipant.user_id == user_id, RoomParticipant.room_id.in_(room_ids))
+        return {room_id for (room_id,) in rows}
+
+    @staticmethod
+    def room_mates(user_id, user_ids):
+        """The subset of user_ids sharing at least one room with user_id (user_id itself included)."""
+        user_ids = [int(other) for other in user_ids]
+        mates = {other for other in user_ids if other == int(user_id)}
+        others = [other for other in user_ids if other not in mates]
+        if not others:
+            return mates
+        try:
+            if MembershipIndex.ensure_ready():
+                mine = MembershipIndex.get_user_rooms_key(user_id)
+                pipe = MembershipIndex._redis().pipeline(transaction=False)
+                for other in others:
+                    pipe.sinter(mine, MembershipIndex.get_user_rooms_key(other))
+                return mates | {other for other, shared in zip(others, pipe.execute()) if shared}
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Membership index unavailable, using DB: {e}")
+        my_rooms = db.session.query(RoomParticipant.room_id).filter(RoomParticipant.user_id == user_id)
+        rows = db.session.query(RoomParticipant.user_id)\
+            .filter(RoomParticipant.user_id.in_(others), RoomParticipant.room_id.in_(my_rooms)).distinct()
+        return mates | {other for (other,) in rows}
+
+    @staticmethod
+    def room_member_counts(room_ids):
+        """{room_id: member count} for many rooms in one pipeline."""
+        if not room_ids:
+            return {}
+        try:
+            if MembershipIndex.ensure_ready():
+                pipe = MembershipIndex._redis().pipeline(transaction=False)
+                for room_id in room_ids:
+                    pipe.scard(MembershipIndex.get_room_members_key(room_id))
+                return dict(zip(room_ids, pipe.execute()))
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Membership index unavailable, using DB: {e}")
+        rows = db.session.query(RoomParticipant.room_id, db.func.count(RoomParticipant.id))\
+            .filter(RoomParticipant.room_id.in_(room_ids)).group_by(RoomParticipant.room_id)
+        counts = dict.fromkeys(room_ids, 0)
+        counts.update(rows)
+        return counts
+
+    @staticmethod
+    def room_member_count(room_id):
+        try:
+            if MembershipIndex.ensure_ready():
+                return MembershipIndex._redis().scard(MembershipIndex.get_room_members_key(room_id))
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Membership index unavailable, using DB: {e}")
+        return RoomParticipant.query.filter_by(room_id=room_id).count()
+
+    @staticmethod
+    def check_consistency(repair=False):
+        """Compare every room's member set against the DB; optionally resync drifted rooms.
+
+        Repairs hold CHECK_LOCK_KEY so only one checker runs, and each
+        drifted room is re-read (Redis, then DB) right before it is fixed,
+        so joins and leaves that landed during the scan are left alone.
+        """
+        r = MembershipIndex._redis()
+        if repair and not r.set(MembershipIndex.CHECK_LOCK_KEY, 1, nx=True, ex=3600):
+            return {"rooms_checked": 0, "drifted": [], "repaired": False, "skipped": True}
+        try:
+            # Redis first, then the DB, for the same reason as in resync_room
+            indexed = {}
+            for key in r.scan_iter(match="room:*:members", count=MembershipIndex.BATCH_SIZE):
+                indexed[key.split(":")[1]] = r.smembers(key)
+
+            expected = {}
+            rows = (
+                db.session.query(RoomParticipant.room_id, RoomParticipant.user_id)
+                .execution_options(yield_per=MembershipIndex.BATCH_SIZE)
+            )
+            for room_id, user_id in rows:
+                expected.setdefault(str(room_id), set()).add(str(user_id))
+
+            drifted = []
+            for room_id in sorted(set(indexed) | set(expected), key=int):
+                if indexed.get(room_id, set()) == expected.get(room_id, set()):
+                    continue
+                if repair:
+                    if MembershipIndex.resync_room(room_id):
+                        drifted.append(int(room_id))
+                else:
+                    drifted.append(int(room_id))
+            return {"rooms_checked": len(set(indexed) | set(expected)), "drifted": drifted, "repaired": repair}
+        finally:
+            if repair:
+                r.delete(MembershipIndex.CHECK_LOCK_KEY)
+
+    @staticmethod
+    def run_checker(app, sleep):
+        """Background loop: rebuild the index when it is missing, and run the repairing checker.
+
+        The rebuild happens here rather than in a request, polled every
+        READY_POLL_SECONDS; the checker runs every MEMBERSHIP_CHECK_INTERVAL
+        seconds (0 disables it).
+        """
+        interval = app.config["MEMBERSHIP_CHECK_INTERVAL"]
+        last_check = time.monotonic()
+        while True:
+            sleep(MembershipIndex.READY_POLL_SECONDS)
+            with app.app_context():
+                try:
+                    MembershipIndex.rebuild_if_missing()
+                    MembershipIndex.resync_dirty()
+                    if interval and time.monotonic() - last_check >= interval:
+                        last_check = time.monotonic()
+                        report = MembershipIndex.check_consistency(repair=True)
+                        if report["drifted"]:
+                            app.logger.warning(f"Repaired membership drift in rooms {report['drifted']}")
+                except Exception as e:
+                    app.logger.error(f"Membership index maintenance failed: {e}")
+                finally:
+                    db.session.remove()
+
+
+membership_cli = AppGroup("membership", help="Manage the Redis room membership index.")
+
+
+@membership_cli.command("rebuild")
+def rebuild_command():
+    """Rebuild the membership index from the database."""
+    total = MembershipIndex.rebuild()
+    click.echo(f"Indexed {total} memberships")
+
+
+@membership_cli.command("check")
+@click.option("--repair", is_flag=True, help="Rewrite rooms whose sets drifted from the DB.")
+def check_command(repair):
+    """Report rooms whose membership sets disagree with the database."""
+    report = MembershipIndex.check_consistency(repair=repair)
+    if report.get("skipped"):
+        raise click.ClickException("Another checker holds the lock; try again later")
+    click.echo(f"Checked {report['rooms_checked']} rooms, {len(report['drifted'])} drifted: {report['drifted']}")
@@ -0,0 +1,23 @@
+import time
+
+# Process-local counters and gauges, exposed through the /metrics resource.
+# Each worker reports its own numbers; aggregate across workers in the scraper.
+_counters = {}
+_gauges = {}
+_started_at = time.time()
+
+
+def incr(name, amount=1):
+    _counters[name] = _counters.get(name, 0) + amount
+
+
+def gauge(name, value):
+    _gauges[name] = value
+
+
+def snapshot():
+    return {
+        "uptime_seconds": round(time.time() - _started_at, 1),
+        "counters": dict(_counters),
+        "gauges": dict(_gauges)
+    }
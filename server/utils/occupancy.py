@@ -0,0 +1,187 @@
+import time
+from datetime import datetime, timezone
+
+import redis
+from flask import current_app
+
+from utils import metrics
+
+GRANULARITIES = {"minute": 60, "hour": 3600, "day": 86400}
+
+# Apply one event to the room's live counter and to its minute/hour/day buckets.
+# KEYS[1] live counter, KEYS[2..] bucket hashes; ARGV[1] live delta, ARGV[2]
+# live counter TTL, then one TTL per bucket, then field/increment pairs.
+RECORD_LUA = """
+local delta = tonumber(ARGV[1])
+local live = tonumber(redis.call('INCRBY', KEYS[1], delta))
+if live < 0 then
+    live = 0
+    redis.call('SET', KEYS[1], 0)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+local before = math.max(live - delta, 0)
+local peak = math.max(live, before)
+local buckets = #KEYS - 1
+for i = 2, #KEYS do
+    local key = KEYS[i]
+    for j = 3 + buckets, #ARGV, 2 do
+        redis.call('HINCRBY', key, ARGV[j], ARGV[j + 1])
+    end
+    if peak > tonumber(redis.call('HGET', key, 'peak') or '-1') then
+        redis.call('HSET', key, 'peak', peak)
+    end
+    redis.call('HSET', key, 'last', live)
+    redis.call('EXPIRE', key, ARGV[i + 1])
+end
+return live
+"""
+
+
+class RoomStats:
+    """Per-room occupancy rollups kept incrementally in Redis.
+
+    Every connect/disconnect/join/leave makes one script call that updates the
+    room's live socket count (expiring STATS_LIVE_TTL after the last event,
+    so a count stranded by a crashed worker does not last forever) and its
+    minute, hour and day buckets
+    (``stats:room:{id}:{granularity}:{bucket start}``): event counters, peak
+    and closing concurrency, and a session-length histogram. Reads page
+    through buckets without touching ``room_participants``.
+    """
+
+    _scripts = {}
+
+    @staticmethod
+    def get_live_key(room_id):
+        return f"stats:room:{room_id}:live"
+
+    @staticmethod
+    def get_bucket_key(room_id, granularity, start):
+        return f"stats:room:{room_id}:{granularity}:{start}"
+
+    @staticmethod
+    def bucket_start(ts, granularity):
+        size = GRANULARITIES[granularity]
+        return int(ts // size * size)
+
+    @staticmethod
+    def session_field(seconds):
+        for bound in current_app.config["STATS_SESSION_BUCKETS"]:
+            if seconds <= bound:
+                return f"session_le_{bound}"
+        return "session_gt"
+
+    @staticmethod
+    def _script_call(room_id, event, session_seconds):
+        """(keys, args) for one RECORD_LUA call."""
+        now = time.time()
+        retention = current_app.config["STATS_RETENTION"]
+        keys = [RoomStats.get_live_key(room_id)]
+        ttls = []
+        for granularity in GRANULARITIES:
+            keys.append(RoomStats.get_bucket_key(room_id, granularity, RoomStats.bucket_start(now, granularity)))
+            ttls.append(retention[granularity])
+
+        delta = {"connect": 1, "disconnect": -1}.get(event, 0)
+        fields = [f"{event}s", 1]
+        if session_seconds is not None:
+            seconds = int(round(session_seconds))
+            fields += ["sessions", 1, "session_seconds", seconds, RoomStats.session_field(seconds), 1]
+        return keys, [delta, current_app.config["STATS_LIVE_TTL"], *ttls, *fields]
+
+    @staticmethod
+    def _script(client):
+        script = RoomStats._scripts.get(id(client))
+        if script is None:
+            script = RoomStats._scripts[id(client)] = client.register_script(RECORD_LUA)
+        return script
+
+    @staticmethod
+    def record(room_id, event, session_seconds=None):
+        """Count a 'connect', 'disconnect', 'join' or 'leave'. Never raises into the caller."""
+        RoomStats.record_many([(room_id, event)], session_seconds)
+
+    @staticmethod
+    def record_many(events, session_seconds=None):
+        """record() for many (room_id, event) pairs in one pipeline."""
+        client = getattr(current_app, "redis", None)
+        if client is None or not events:
+            return
+        try:
+            script = RoomStats._script(client)
+            pipe = client.pipeline(transaction=False)
+            for room_id, event in events:
+                keys, args = RoomStats._script_call(room_id, event, session_seconds)
+                script(keys=keys, args=args, client=pipe)
+            pipe.execute()
+        except redis.RedisError as e:
+            metrics.incr("stats.redis_errors")
+            current_app.logger.warning(f"Room stats not recorded for rooms {sorted({room_id for room_id, _ in events})}: {e}")
+
+    @staticmethod
+    def live(room_id):
+        """Connected sockets in the room; raises RedisError like series()."""
+        client = getattr(current_app, "redis", None)
+        return int(client.get(RoomStats.get_live_key(room_id)) or 0) if client is not None else 0
+
+    @staticmethod
+    def series(room_id, granularity, limit, before=None):
+        """Up to `limit` buckets ending before `before` (a bucket start), newest first.
+
+        Returns (buckets, next_before); next_before is None once the page
+        reaches the end of the granularity's retention.
+        """
+        size = GRANULARITIES[granularity]
+        now = time.time()
+        newest = RoomStats.bucket_start(now, granularity)
+        if before is not None:
+            newest = min(newest, RoomStats.bucket_start(before, granularity) - size)
+        oldest_kept = RoomStats.bucket_start(now - current_app.config["STATS_RETENTION"][granularity], granularity)
+        starts = [start for start in range(newest, newest - limit * size, -size) if start >= oldest_kept]
+        if not starts:
+            return [], None
+
+        client = current_app.redis
+        pipe = client.pipeline(transaction=False)
+        for start in starts:
+            pipe.hgetall(RoomStats.get_bucket_key(room_id, granularity, start))
+        rows = pipe.execute()
+
+        # Quiet buckets carry the concurrency the previous event left behind
+        carried = None
+        buckets = []
+        for start, row in zip(reversed(starts), reversed(rows)):
+            bucket = RoomStats._serialize(start, row, carried)
+            if row:
+                carried = int(row.get("last", 0))
+            buckets.append(bucket)
+        buckets.reverse()
+
+        next_before = starts[-1] if starts[-1] - size >= oldest_kept else None
+        return buckets, next_before
+
+    @staticmethod
+    def _serialize(start, row, carried):
+        sessions = int(row.get("sessions", 0))
+        session_seconds = int(row.get("session_seconds", 0))
+        histogram = {
+            f"<={bound}s": int(row.get(f"session_le_{bound}", 0))
+            for bound in current_app.config["STATS_SESSION_BUCKETS"]
+        }
+        histogram[f">{current_app.config['STATS_SESSION_BUCKETS'][-1]}s"] = int(row.get("session_gt", 0))
+        return {
+            "start": datetime.fromtimestamp(start, timezone.utc).isoformat(),
+            "ts": start,
+            "connects": int(row.get("connects", 0)),
+            "disconnects": int(row.get("disconnects", 0)),
+            "joins": int(row.get("joins", 0)),
+            "leaves": int(row.get("leaves", 0)),
+            "peak_concurrency": int(row["peak"]) if "peak" in row else carried,
+            "concurrency_end": int(row["last"]) if "last" in row else carried,
+            "sessions": {
+                "count": sessions,
+                "total_seconds": session_seconds,
+                "avg_seconds": round(session_seconds / sessions, 1) if sessions else None,
+                "histogram": histogram,
+            },
+        }
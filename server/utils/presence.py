@@ -0,0 +1,296 @@
+import secrets
+import sys
+import time
+
+
+class UserRecords:
+    """One details dict per connected user, shared by all of that user's sockets.
+
+    Each socket acquires a reference on connect and releases it when its
+    session ends; the record is dropped with the last reference. A newer
+    fetch replaces the shared dict, so every tab sees the latest profile.
+    """
+
+    def __init__(self):
+        self._records = {}  # user_id -> [details, refcount]
+
+    def acquire(self, user_id, details):
+        record = self._records.get(user_id)
+        if record is None:
+            self._records[user_id] = [details, 1]
+            return details
+        if details is not None and details != record[0]:
+            record[0] = details
+        record[1] += 1
+        return record[0]
+
+    def release(self, user_id):
+        record = self._records.get(user_id)
+        if record is None:
+            return
+        record[1] -= 1
+        if record[1] <= 0:
+            del self._records[user_id]
+
+    def get(self, user_id):
+        record = self._records.get(user_id)
+        return record[0] if record else None
+
+    def refs(self, user_id):
+        record = self._records.get(user_id)
+        return record[1] if record else 0
+
+    def __len__(self):
+        return len(self._records)
+
+
+users = UserRecords()
+
+
+class SocketSession:
+    """Per-socket presence state; details live in the shared ``users`` table."""
+
+    __slots__ = ("user_id", "room_id", "role", "resume_token", "aliases", "no_resume", "connected_at", "seen_at")
+
+    def __init__(self, user_id, room_id, role, resume_token):
+        self.user_id = user_id
+        self.room_id = sys.intern(room_id)  # one string per live room, not per socket
+        self.role = role
+        self.resume_token = resume_token
+        self.aliases = None     # pre-resume sids, created on first resume
+        self.no_resume = False
+        self.connected_at = time.monotonic()
+        self.seen_at = self.connected_at  # when last-seen was last buffered
+
+    @property
+    def user_details(self):
+        return users.get(self.user_id) or {}
+
+    @property
+    def is_listener(self):
+        return self.role == "listener"
+
+
+# Transport-neutral presence logic shared by the eventlet (socketio_server) and
+# asyncio (asgi_server) realtime entry points.
+
+def presence_user(user):
+    """Details a socket carries for its user (ORM object or row with the same attributes)."""
+    created_at = getattr(user, "created_at", None)
+    return {
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "profile": user.profile,
+        "created_at": created_at.isoformat() if created_at else None
+    }
+
+
+def assign_role(settings, requested_role, speakers, listeners):
+    """Role for a new socket as (role, None), or (None, limit) when the room is full.
+
+    Stage rooms keep a small speaker mesh and seat everyone else as a listener.
+    """
+    role = "speaker"
+    if settings["stage"] and requested_role != "speaker":
+        role = "listener"
+    if role == "speaker" and speakers >= settings["speakers"]:
+        if not settings["stage"]:
+            return None, settings["speakers"]
+        role = "listener"
+    if role == "listener" and speakers + listeners >= settings["capacity"]:
+        return None, settings["capacity"]
+    return role, None
+
+
+def build_participants(sids, sessions):
+    """Participant entries for a room's speaker sids."""
+    participants = []
+    for sid in sids:
+        session = sessions.get(sid)
+        if session:
+            participants.append({**session.user_details, "socket_id": sid, "is_online": True})
+    return participants
+
+
+def record_listener_delta(deltas, rid, kind, user_details, sample):
+    """Queue a listener join/leave for the next aggregated presence tick."""
+    delta = deltas.setdefault(rid, {"joined": [], "left": [], "joined_total": 0, "left_total": 0})
+    delta[f"{kind}_total"] += 1
+    if len(delta[kind]) < sample:
+        delta[kind].append({
+            "id": user_details.get("id"),
+            "name": user_details.get("name"),
+            "profile": user_details.get("profile")
+        })
+
+
+def listeners_channel(rid):
+    return f"{rid}:listeners"
+
+
+class PresenceRooms:
+    """One realtime worker's live room maps and the event handling both servers share.
+
+    socketio_server and asgi_server differ only in how they authorize, load
+    rooms and emit. Seating and unseating sockets, participant lists, status
+    changes, relay targets and listener ticks all go through these methods,
+    which change the maps and build payloads but never do I/O.
+    """
+
+    def __init__(self):
+        self.room_sockets = {}       # room_id(str) -> set(sids) in the WebRTC mesh (speakers)
+        self.room_listeners = {}     # room_id(str) -> set(sids) listening to a stage, outside the mesh
+        self.listener_deltas = {}    # room_id(str) -> pending aggregated listener presence
+        self.room_settings = {}      # room_id(str) -> {stage, capacity, speakers}
+        self.sid_meta = {}           # sid -> SocketSession; user details are shared in ``users``
+        self.room_participants = {}  # room_id(str) -> participants list, rebuilt after membership changes
+
+    def presence_targets(self, rid):
+        """Speaker presence reaches the mesh and, on a stage, its listeners."""
+        settings = self.room_settings.get(rid)
+        if settings and settings["stage"]:
+            return [rid, listeners_channel(rid)]
+        return rid
+
+    def participants(self, rid):
+        """The room's speakers with their details.
+
+        Built once per membership change and shared by every caller until the
+        next join/leave/resume; callers must not mutate it.
+        """
+        participants = self.room_participants.get(rid)
+        if participants is None:
+            participants = build_participants(self.room_sockets.get(rid, ()), self.sid_meta)
+            if rid in self.room_sockets:
+                self.room_participants[rid] = participants
+        return participants
+
+    def participants_payload(self, sid):
+        """The participants:list reply for a socket's room (empty for unknown sockets)."""
+        meta = self.sid_meta.get(sid)
+        if not meta:
+            return {"participants": [], "total": 0}
+        participants = self.participants(meta.room_id)
+        return {
+            "participants": participants,
+            "total": len(participants),
+            "listeners": len(self.room_listeners.get(meta.room_id, ()))
+        }
+
+    def peers(self, sid):
+        """Other speakers' sids in the socket's mesh; listeners have none."""
+        meta = self.sid_meta.get(sid)
+        if not meta or meta.is_listener:
+            return []
+        return [peer for peer in self.room_sockets.get(meta.room_id, ()) if peer != sid]
+
+    def is_speaker(self, sid):
+        meta = self.sid_meta.get(sid)
+        return bool(meta) and meta.role == "speaker"
+
+    def seat(self, sid, user_id, rid, settings, requested_role, user_details, sample):
+        """Place an authorized socket in its room as (session, None), or (None, limit) when full.
+
+        The caller then joins the session's channel and, for a speaker,
+        broadcasts presence_event(...) as presence:join.
+        """
+        sids = self.room_sockets.get(rid, set())
+        listeners = self.room_listeners.get(rid, set())
+        # Stage rooms keep a small speaker mesh; everyone else listens
+        role, limit = assign_role(settings, requested_role, len(sids), len(listeners))
+        if role is None:
+            return None, limit
+
+        previous = users.get(user_id)
+        meta = self.sid_meta[sid] = SocketSession(user_id, rid, role, secrets.token_urlsafe(16))
+        user_details = users.acquire(user_id, user_details)
+        if previous is not None and previous is not user_details:
+            self.room_participants.clear()  # profile changed; other tabs' rooms list the old one
+
+        if meta.is_listener:
+            # Listeners never join signaling; their presence is aggregated per tick
+            listeners.add(sid)
+            self.room_listeners[rid] = listeners
+            record_listener_delta(self.listener_deltas, rid, "joined", user_details, sample)
+        else:
+            sids.add(sid)
+            self.room_sockets[rid] = sids
+            self.room_participants.pop(rid, None)
+        return meta, None
+
+    @staticmethod
+    def channel(meta):
+        """The socket.io room a session's socket belongs in."""
+        return listeners_channel(meta.room_id) if meta.is_listener else meta.room_id
+
+    def unseat(self, sid, sample):
+        """Drop a socket from its room; returns (session, user details) or None if it had none.
+
+        For a speaker the caller broadcasts presence_event(...) as
+        presence:leave, then calls release_room.
+        """
+        meta = self.sid_meta.pop(sid, None)
+        if not meta:
+            return None
+        rid = meta.room_id
+        user_details = meta.user_details  # before the release can drop the record
+        users.release(meta.user_id)
+
+        if meta.is_listener:
+            listeners = self.room_listeners.get(rid, set())
+            listeners.discard(sid)
+            if not listeners:
+                self.room_listeners.pop(rid, None)
+            record_listener_delta(self.listener_deltas, rid, "left", user_details, sample)
+        else:
+            sids = self.room_sockets.get(rid, set())
+            sids.discard(sid)
+            if not sids:
+                self.room_sockets.pop(rid, None)
+            self.room_participants.pop(rid, None)
+        return meta, user_details
+
+    def release_room(self, rid):
+        """Forget a room's settings once its last socket is gone; True if it was released."""
+        if rid in self.room_sockets or rid in self.room_listeners:
+            return False
+        self.room_settings.pop(rid, None)
+        self.room_participants.pop(rid, None)
+        return True
+
+    def status_change(self, sid, data, timestamp):
+        """(session, user:status:change payload, muted or None) for a speaker's status, else None.
+
+        The caller buffers ``muted`` with ActivityBuffer when it is not None,
+        then broadcasts the payload to the room. Payloads that are not
+        ``{"status": {...}}`` objects are ignored.
+        """
+        meta = self.sid_meta.get(sid)
+        if not meta or meta.is_listener:
+            return None
+        data = data or {}
+        status = data.get("status", {}) if isinstance(data, dict) else None
+        if not isinstance(status, dict):
+            return None
+        payload = presence_event(meta.user_details, sid, timestamp, status=status)
+        return meta, payload, (bool(status["is_muted"]) if "is_muted" in status else None)
+
+    def relay_target(self, sid, data):
+        """Where a signaling message goes: its ``to`` sid, if a speaker sent it; else None."""
+        if not self.is_speaker(sid):
+            return None
+        return (data or {}).get("to")
+
+    def listener_updates(self):
+        """(targets, listeners:update payload) for every room with queued listener presence."""
+        for rid in list(self.listener_deltas):
+            delta = self.listener_deltas.pop(rid, None)
+            if delta is None:
+                continue
+            yield [rid, listeners_channel(rid)], {"count": len(self.room_listeners.get(rid, ())), **delta}
+
+
+def presence_event(user_details, sid, timestamp, **extra):
+    """Payload of presence:join/leave/resume and user:status:change."""
+    return {"user": user_details, "socketId": sid, **extra, "timestamp": timestamp}
@@ -0,0 +1,82 @@
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from models import db, Room, RoomParticipant
+from resources.room import CacheManager, serialize_room_details
+
+
+class HotRoomPrewarmer:
+    """Periodically rebuild cache entries for the most active rooms before their TTLs expire."""
+
+    def __init__(self, app, live_counts):
+        # live_counts() -> {room_id: connected sockets}, read from socketio presence
+        self.app = app
+        self.live_counts = live_counts
+
+    def hot_room_ids(self):
+        """Rank rooms by live presence first, then by recent joins."""
+        config = self.app.config
+        scores = {}
+        for room_id, count in self.live_counts().items():
+            scores[int(room_id)] = count * 10
+
+        cutoff = datetime.utcnow() - timedelta(seconds=config["PREWARM_RECENT_JOIN_WINDOW"])
+        recent_joins = (
+            db.session.query(RoomParticipant.room_id, func.count(RoomParticipant.id))
+            .filter(RoomParticipant.joined_at >= cutoff)
+            .group_by(RoomParticipant.room_id)
+            .order_by(func.count(RoomParticipant.id).desc())
+            .limit(config["PREWARM_ROOM_BUDGET"])
+            .all()
+        )
+        for room_id, joins in recent_joins:
+            scores[room_id] = scores.get(room_id, 0) + joins
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return ranked[:config["PREWARM_ROOM_BUDGET"]]
+
+    def warm(self, room_ids):
+        """Rebuild room snapshots in batches, stopping once the time budget is spent."""
+        config = self.app.config
+        batch_size = config["PREWARM_BATCH_SIZE"]
+        deadline = time.monotonic() + config["PREWARM_TIME_BUDGET"]
+        warmed = 0
+
+        for start in range(0, len(room_ids), batch_size):
+            if time.monotonic() >= deadline:
+                break
+            batch = room_ids[start:start + batch_size]
+            CacheManager.load_room_generations(batch)  # before the read, as in RoomBatchResource._details
+            rooms = (
+                db.session.query(Room)
+                .filter(Room.id.in_(batch))
+                .options(
+                    db.joinedload(Room.participants).joinedload(RoomParticipant.user),
+                    db.joinedload(Room.creator)
+                )
+                .all()
+            )
+            CacheManager.cache_room_snapshots([serialize_room_details(room) for room in rooms])
+            warmed += len(rooms)
+
+        return warmed
+
+    def tick(self):
+        with self.app.app_context():
+            try:
+                return self.warm(self.hot_room_ids())
+            finally:
+                db.session.remove()
+
+    def run(self, sleep):
+        """Background loop; `sleep` is the async-mode aware socketio.sleep."""
+        interval = self.app.config["PREWARM_INTERVAL"]
+        while True:
+            sleep(interval)
+            try:
+                warmed = self.tick()
+                self.app.logger.debug(f"Pre-warmed {warmed} hot rooms")
+            except Exception as e:
+                self.app.logger.error(f"Hot room pre-warm failed: {e}")
@@ -0,0 +1,119 @@
+import math
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import redis
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from flask_socketio import emit
+
+from utils import metrics
+
+# Refill and take from a bucket in one round trip. Returns {allowed, retry_after}.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class TokenBucketLimiter:
+    """Token buckets in Redis, falling back to per-process buckets when Redis is unavailable."""
+
+    LOCAL_MAX_KEYS = 10000
+
+    def __init__(self):
+        self._scripts = {}              # id(redis client) -> registered script
+        self._local = OrderedDict()     # key -> [tokens, ts], LRU-bounded
+
+    def hit(self, key, rate, burst, cost=1):
+        """Take `cost` tokens; returns (allowed, retry_after_seconds)."""
+        client = getattr(current_app, "redis", None)
+        if client is not None:
+            try:
+                script = self._scripts.get(id(client))
+                if script is None:
+                    script = self._scripts[id(client)] = client.register_script(TOKEN_BUCKET_LUA)
+                allowed, retry_after = script(keys=[key], args=[rate, burst, time.time(), cost])
+                return bool(int(allowed)), float(retry_after)
+            except redis.RedisError:
+                metrics.incr("ratelimit.redis_fallback")
+        return self._local_hit(key, rate, burst, cost)
+
+    def _local_hit(self, key, rate, burst, cost):
+        now = time.monotonic()
+        tokens, ts = self._local.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - ts) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._local[key] = (tokens, now)
+        if len(self._local) > self.LOCAL_MAX_KEYS:
+            self._local.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+limiter = TokenBucketLimiter()
+
+
+def _client_ip():
+    # remote_addr only: X-Forwarded-For is client-controlled. Behind proxies,
+    # ProxyFix (TRUSTED_PROXY_HOPS) rewrites remote_addr to the real client.
+    return request.remote_addr
+
+
+def rate_limit(name, scope="user", cost=None):
+    """Decorator for Flask-RESTful methods; scope is "user" (JWT identity) or "ip".
+
+    Limits come from RATE_LIMITS[name] as (tokens per second, burst). `cost()`,
+    if given, returns how many tokens the current request takes (default 1).
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            rate, burst = current_app.config["RATE_LIMITS"][name]
+            identity = get_jwt_identity() if scope == "user" else _client_ip()
+            tokens = min(cost(), burst) if cost else 1
+            allowed, retry_after = limiter.hit(f"rl:{name}:{scope}:{identity}", rate, burst, tokens)
+            if not allowed:
+                metrics.incr(f"ratelimit.rejected.{name}")
+                return {"error": "Too many requests"}, 429, {"Retry-After": str(max(1, math.ceil(retry_after)))}
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def socket_rate_limit(name, identity):
+    """Wrap a Socket.IO handler; over-limit events are dropped and the sender gets rate:limited.
+
+    `identity()` returns the bucket owner for the current event (user id or sid).
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            rate, burst = current_app.config["RATE_LIMITS"][name]
+            allowed, retry_after = limiter.hit(f"rl:{name}:{identity()}", rate, burst)
+            if not allowed:
+                metrics.incr(f"ratelimit.rejected.{name}")
+                emit("rate:limited", {"event": name, "retryAfter": round(retry_after, 2)})
+                return None
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,262 @@
+import copy
+import ssl
+import threading
+import time
+
+import redis
+from flask import current_app
+from flask_caching.backends.rediscache import RedisCache
+from redis.client import NEVER_DECODE, Pipeline
+
+from utils import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Per-process breaker in front of every Redis connection.
+
+    After REDIS_BREAKER_THRESHOLD consecutive connection errors or timeouts
+    it opens, and for REDIS_BREAKER_COOLDOWN seconds every command fails at
+    once with ConnectionError, so callers take their DB fallbacks without
+    waiting on a socket. Once the cooldown has passed it lets one command
+    through as a probe (half-open). The probe's success closes the breaker;
+    its failure opens it for another cooldown.
+    """
+
+    def __init__(self, threshold, cooldown, logger):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.logger = logger
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self.probe_started = 0.0
+            if self.state == HALF_OPEN and now - self.probe_started >= self.cooldown:
+                # No probe in flight (or it never reported back): this caller probes
+                self.probe_started = now
+                return True
+        metrics.incr("redis.breaker.rejected")
+        return False
+
+    def record_success(self):
+        if self.state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            if self.state != CLOSED:
+                self.logger.warning("Redis circuit breaker closed; Redis is reachable again")
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.threshold):
+                if self.state == CLOSED:
+                    self.logger.error(f"Redis circuit breaker opened after {self.failures} consecutive failures")
+                    metrics.incr("redis.breaker.opened")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        status = {"state": self.state, "consecutive_failures": self.failures}
+        if self.state == OPEN:
+            status["retry_in"] = round(max(self.cooldown - (time.monotonic() - self.opened_at), 0), 1)
+        return status
+
+
+class _BreakerMixin:
+    """Reports connect/send/read outcomes to the pool's breaker."""
+
+    def __init__(self, *args, breaker=None, **kwargs):
+        self.breaker = breaker
+        super().__init__(*args, **kwargs)
+
+    def _guard(self, call, *args, **kwargs):
+        try:
+            return call(*args, **kwargs)
+        except (redis.ConnectionError, redis.TimeoutError):
+            self.breaker.record_failure()
+            raise
+
+    def connect(self):
+        return self._guard(super().connect)
+
+    def send_packed_command(self, *args, **kwargs):
+        return self._guard(super().send_packed_command, *args, **kwargs)
+
+    def read_response(self, *args, **kwargs):
+        response = self._guard(super().read_response, *args, **kwargs)
+        self.breaker.record_success()
+        return response
+
+
+class BreakerConnection(_BreakerMixin, redis.Connection):
+    pass
+
+
+class BreakerSSLConnection(_BreakerMixin, redis.SSLConnection):
+    pass
+
+
+class BreakerConnectionPool(redis.BlockingConnectionPool):
+    """Bounded pool that refuses connections while the breaker is open.
+
+    Callers wait at most REDIS_POOL_TIMEOUT for a free connection; an
+    exhausted pool raises ConnectionError but does not trip the breaker.
+    """
+
+    def get_connection(self, *args, **kwargs):
+        if not self.connection_kwargs["breaker"].allow():
+            raise redis.ConnectionError("Redis circuit breaker is open")
+        return super().get_connection(*args, **kwargs)
+
+
+class BytesRedis(redis.Redis):
+    """A client on the shared (str-decoding) pool that returns raw bytes, for cachelib."""
+
+    def parse_response(self, connection, command_name, **options):
+        options.setdefault(NEVER_DECODE, True)
+        return super().parse_response(connection, command_name, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return BytesPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class BytesPipeline(Pipeline):
+    def parse_response(self, connection, command_name, **options):
+        options.setdefault(NEVER_DECODE, True)
+        return super().parse_response(connection, command_name, **options)
+
+
+def create_pool(app):
+    """The process's one Redis pool (cache, presence, rate limits, locks), with its breaker."""
+    config = app.config
+    url = config["CACHE_REDIS_URL"]
+    breaker = CircuitBreaker(config["REDIS_BREAKER_THRESHOLD"], config["REDIS_BREAKER_COOLDOWN"], app.logger)
+    kwargs = {
+        "decode_responses": True,
+        "max_connections": config["REDIS_MAX_CONNECTIONS"],
+        "timeout": config["REDIS_POOL_TIMEOUT"],
+        "socket_timeout": config["REDIS_SOCKET_TIMEOUT"],
+        "socket_connect_timeout": config["REDIS_CONNECT_TIMEOUT"],
+        "health_check_interval": config["REDIS_HEALTH_CHECK_INTERVAL"],
+        "connection_class": BreakerConnection,
+        "breaker": breaker,
+    }
+    if url.startswith("rediss://"):
+        kwargs.update(connection_class=BreakerSSLConnection, ssl_cert_reqs=ssl.CERT_NONE)
+    return BreakerConnectionPool.from_url(url, **kwargs), breaker
+
+
+class ResilientRedisCache(RedisCache):
+    """Flask-Caching backend on the shared pool that never raises Redis errors.
+
+    A failed read is a miss and a failed write is skipped, so an outage (or
+    an open breaker) sends requests to the DB instead of failing them.
+    Select it with CACHE_TYPE = "utils.redis_pool.ResilientRedisCache".
+    """
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs["host"] = BytesRedis(connection_pool=app.extensions["redis_pool"])
+        if config.get("CACHE_KEY_PREFIX"):
+            kwargs["key_prefix"] = config["CACHE_KEY_PREFIX"]
+        return cls(*args, **kwargs)
+
+    def _bypass(self, op, fallback, *args, **kwargs):
+        try:
+            return getattr(super(), op)(*args, **kwargs)
+        except redis.RedisError:
+            metrics.incr(f"cache.bypassed.{op}")
+            return fallback
+
+    def get(self, key):
+        return self._bypass("get", None, key)
+
+    def get_many(self, *keys):
+        return self._bypass("get_many", [None] * len(keys), *keys)
+
+    def has(self, key):
+        return self._bypass("has", False, key)
+
+    def set(self, key, value, timeout=None):
+        return self._bypass("set", False, key, value, timeout)
+
+    def add(self, key, value, timeout=None):
+        return self._bypass("add", False, key, value, timeout)
+
+    def set_many(self, mapping, timeout=None):
+        return self._bypass("set_many", [], mapping, timeout)
+
+    def delete(self, key):
+        return self._bypass("delete", False, key)
+
+    def delete_many(self, *keys):
+        return self._bypass("delete_many", [], *keys)
+
+    def inc(self, key, delta=1):
+        return self._bypass("inc", None, key, delta)
+
+    def dec(self, key, delta=1):
+        return self._bypass("dec", None, key, delta)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.failed = False
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def coalesced(key, load):
+    """Run load() once per key at a time in this process; concurrent callers share its result.
+
+    Cache misses (every request, while Redis is down) would otherwise send
+    one identical DB query per request. Everyone gets their own deep copy
+    when the result is shared, since callers overlay live state onto it in
+    place. A waiter loads for itself if the leader fails or takes longer
+    than COALESCE_WAIT_TIMEOUT.
+    """
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _Call()
+        else:
+            call.waiters += 1
+
+    if not leader:
+        metrics.incr("coalesce.waits")
+        if not call.done.wait(current_app.config["COALESCE_WAIT_TIMEOUT"]) or call.failed:
+            return load()
+        return copy.deepcopy(call.result)
+
+    try:
+        call.result = load()
+    except Exception:
+        call.failed = True
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        call.done.set()
+    # No new waiters can join once the key is gone from _inflight
+    return copy.deepcopy(call.result) if call.waiters else call.result
@@ -0,0 +1,145 @@
+import json
+import re
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from models import db, Room
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TOKENS = 8
+
+
+def _tokens(query):
+    return [token.lower() for token in _TOKEN_RE.findall(query or "")][:MAX_TOKENS]
+
+
+class RoomSearch:
+    """Room name/description search over the index built by the room search migration.
+
+    SQLite uses the ``rooms_fts`` FTS5 table (kept in sync by triggers);
+    Postgres uses the generated ``rooms.search_vector`` column for words and
+    ``pg_trgm`` on ``lower(name)`` for typo-tolerant matches. Every query word
+    is treated as a prefix, so "tea sta" finds "Team standup".
+    """
+
+    SUGGEST_TIMEOUT = 60  # seconds; new rooms show up in suggestions within a minute
+
+    @staticmethod
+    def _dialect():
+        return db.engine.dialect.name
+
+    @staticmethod
+    def _search_ids(tokens, limit, offset):
+        # Only the newest RANK_WINDOW matches are scored, so a word in half the
+        # table costs a bounded ranking pass rather than one per matching row
+        dialect = RoomSearch._dialect()
+        window = current_app.config["SEARCH_RANK_WINDOW"]
+        if dialect == "sqlite":
+            sql = text(
+                "SELECT rowid FROM ("
+                "  SELECT rowid, bm25(rooms_fts, 10.0, 1.0) AS score FROM rooms_fts"
+                "  WHERE rooms_fts MATCH :match ORDER BY rowid DESC LIMIT :window"
+                ") ORDER BY score LIMIT :limit OFFSET :offset"
+            )
+            params = {
+                "match": " ".join(f'"{token}"*' for token in tokens),
+                "window": window,
+                "limit": limit,
+                "offset": offset,
+            }
+        elif dialect == "postgresql":
+            sql = text(
+                "SELECT id FROM ("
+                "  SELECT id, greatest(ts_rank(search_vector, q), similarity(lower(name), :raw)) AS score"
+                "  FROM rooms, to_tsquery('simple', :tsquery) AS q"
+                "  WHERE search_vector @@ q OR lower(name) % :raw ORDER BY id DESC LIMIT :window"
+                ") AS candidates ORDER BY score DESC, id DESC LIMIT :limit OFFSET :offset"
+            )
+            params = {
+                "tsquery": " & ".join(f"{token}:*" for token in tokens),
+                "raw": " ".join(tokens),
+                "window": window,
+                "limit": limit,
+                "offset": offset,
+            }
+        else:
+            # No search index for this backend; correct but scans the table
+            query = Room.query.with_entities(Room.id)
+            for token in tokens:
+                pattern = f"%{token}%"
+                query = query.filter(db.or_(Room.name.ilike(pattern), Room.description.ilike(pattern)))
+            return [row.id for row in query.order_by(Room.id).limit(limit).offset(offset)]
+        return [row[0] for row in db.session.execute(sql, params)]
+
+    @staticmethod
+    def search(query, limit=20, offset=0):
+        """Rooms matching every word of ``query``, best match first."""
+        tokens = _tokens(query)
+        if not tokens:
+            return []
+        ids = RoomSearch._search_ids(tokens, limit, offset)
+        if not ids:
+            return []
+        rooms = {room.id: room for room in Room.query.filter(Room.id.in_(ids))}
+        return [rooms[room_id] for room_id in ids if room_id in rooms]
+
+    @staticmethod
+    def _suggest_names(prefix, limit):
+        dialect = RoomSearch._dialect()
+        if dialect == "sqlite":
+            # Unranked so short, common prefixes stop at the first matches instead of scoring them all
+            tokens = _tokens(prefix)
+            sql = text("SELECT rowid, name FROM rooms_fts WHERE rooms_fts MATCH :match LIMIT :limit")
+            params = {"match": "name : (" + " ".join(f'"{token}"*' for token in tokens) + ")", "limit": limit}
+        elif dialect == "postgresql":
+            # Served by the lower(name) text_pattern_ops index as a range scan
+            sql = text(
+                "SELECT id, name FROM rooms WHERE lower(name) LIKE :pattern "
+                "ORDER BY lower(name) LIMIT :limit"
+            )
+            escaped = prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params = {"pattern": escaped + "%", "limit": limit}
+        else:
+            rows = (Room.query.with_entities(Room.id, Room.name)
+                    .filter(Room.name.ilike(f"{prefix}%")).order_by(Room.name).limit(limit))
+            return [{"id": row.id, "name": row.name} for row in rows]
+        return [{"id": row[0], "name": row[1]} for row in db.session.execute(sql, params)]
+
+    @staticmethod
+    def suggest(prefix, limit=8):
+        """Autocomplete room names for a typed prefix, cached briefly per prefix."""
+        prefix = " ".join(_tokens(prefix))
+        if len(prefix) < current_app.config["SEARCH_SUGGEST_MIN_CHARS"]:
+            return []
+        cache_key = f"search:suggest:{prefix}:{limit}"
+        cached = current_app.cache.get(cache_key)
+        if cached:
+            return json.loads(cached)
+        suggestions = RoomSearch._suggest_names(prefix, limit)
+        current_app.cache.set(cache_key, json.dumps(suggestions), timeout=RoomSearch.SUGGEST_TIMEOUT)
+        return suggestions
+
+    @staticmethod
+    def rebuild():
+        """Repopulate the search index from the rooms table."""
+        dialect = RoomSearch._dialect()
+        if dialect == "sqlite":
+            db.session.execute(text("INSERT INTO rooms_fts(rooms_fts) VALUES('rebuild')"))
+        elif dialect == "postgresql":
+            # search_vector is a generated column; only the indexes can be rebuilt
+            db.session.execute(text("REINDEX INDEX ix_rooms_search_vector"))
+            db.session.execute(text("REINDEX INDEX ix_rooms_name_trgm"))
+        db.session.commit()
+
+
+search_cli = AppGroup("search", help="Manage the room search index.")
+
+
+@search_cli.command("rebuild")
+def rebuild_command():
+    """Rebuild the room search index from the rooms table."""
+    RoomSearch.rebuild()
+    click.echo(f"Rebuilt room search index ({RoomSearch._dialect()})")
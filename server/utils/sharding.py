@@ -0,0 +1,123 @@
+import bisect
+import hashlib
+import os
+import socket
+import time
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes; adding or removing a node only moves ~1/N keys."""
+
+    def __init__(self, nodes=(), replicas=128):
+        self.replicas = replicas
+        self._points = []     # sorted hashes
+        self._owners = {}     # hash -> node
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def add(self, node):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            self._owners.pop(point, None)
+            index = bisect.bisect_left(self._points, point)
+            if index < len(self._points) and self._points[index] == point:
+                self._points.pop(index)
+
+    def owner(self, key):
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(str(key))) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+class ShardCoordinator:
+    """Tracks live Socket.IO workers in Redis and maps each room to its owning worker.
+
+    Workers heartbeat into the ``socket:shards`` sorted set (score = last seen).
+    Entries older than ``SHARD_TTL`` drop out of the ring on the next refresh.
+
+    A shard is its SOCKET_SHARD_URL, which clients are redirected to, so
+    exactly one process may serve each URL: run one single-worker server
+    per shard. Each heartbeat also claims ``socket:shard:{url}:owner`` for
+    this process (host:pid), and a second process that finds the URL
+    already claimed logs an error instead of joining the ring.
+    """
+
+    REGISTRY_KEY = "socket:shards"
+
+    def __init__(self, app, shard_url):
+        self.app = app
+        self.shard_url = shard_url
+        self.instance = f"{socket.gethostname()}:{os.getpid()}"
+        self.ring = HashRing([shard_url], replicas=app.config["SHARD_VIRTUAL_NODES"])
+
+    def get_owner_key(self):
+        return f"socket:shard:{self.shard_url}:owner"
+
+    def owner(self, room_id):
+        return self.ring.owner(room_id) or self.shard_url
+
+    def is_local(self, room_id):
+        return self.owner(room_id) == self.shard_url
+
+    def heartbeat(self):
+        r = self.app.redis
+        ttl = max(int(self.app.config["SHARD_TTL"]), 1)
+        if not r.set(self.get_owner_key(), self.instance, nx=True, ex=ttl):
+            holder = r.get(self.get_owner_key())
+            if holder != self.instance:
+                raise RuntimeError(
+                    f"{self.shard_url} is already served by {holder}; "
+                    "each shard needs its own SOCKET_SHARD_URL and a single worker"
+                )
+            r.expire(self.get_owner_key(), ttl)
+        r.zadd(self.REGISTRY_KEY, {self.shard_url: time.time()})
+
+    def deregister(self):
+        r = self.app.redis
+        r.zrem(self.REGISTRY_KEY, self.shard_url)
+        if r.get(self.get_owner_key()) == self.instance:
+            r.delete(self.get_owner_key())
+
+    def refresh(self):
+        """Reload live shards; returns True when the ring membership changed."""
+        cutoff = time.time() - self.app.config["SHARD_TTL"]
+        self.app.redis.zremrangebyscore(self.REGISTRY_KEY, "-inf", cutoff)
+        live = set(self.app.redis.zrange(self.REGISTRY_KEY, 0, -1)) | {self.shard_url}
+        if live == self.ring.nodes:
+            return False
+        for node in self.ring.nodes - live:
+            self.ring.remove(node)
+        for node in live - self.ring.nodes:
+            self.ring.add(node)
+        return True
+
+    def run(self, sleep, on_rebalance):
+        """Background loop: heartbeat, refresh, and hand rooms we no longer own to on_rebalance."""
+        interval = self.app.config["SHARD_HEARTBEAT_INTERVAL"]
+        while True:
+            try:
+                self.heartbeat()
+                if self.refresh():
+                    self.app.logger.info(f"Shard ring changed: {sorted(self.ring.nodes)}")
+                    on_rebalance(self)
+            except Exception as e:
+                self.app.logger.error(f"Shard heartbeat failed: {e}")
+            sleep(interval)
@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import shutil
+import time
+import zlib
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+from flask import current_app, request
+
+from utils import metrics
+
+SIGNALING_EVENTS = ("webrtc:offer", "webrtc:answer", "webrtc:ice")
+
+
+def _gzip_rotate(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as out:
+        shutil.copyfileobj(src, out)
+    os.remove(source)
+
+
+class SocketTraceRecorder:
+    """Opt-in recorder of sampled Socket.IO traffic for scripts/trace_replay.py.
+
+    Rooms are sampled whole, by a stable hash of the room id, so a replay has
+    every member of a recorded room. Each event is one NDJSON line: ms
+    timestamp, event, a random per-socket session id, and handler time.
+    Signaling events record payload sizes, never SDP or ICE contents. Users
+    are keyed by a short HMAC, not their id. Each worker writes its own file,
+    rotated by size, with rotated files gzipped.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._logger = None
+        self._describe = None
+        self._sessions = {}     # sid -> trace session id, sampled sockets only
+        self._threshold = 0
+        self._salt = b""
+
+    def open(self, app, describe):
+        """Start recording in this process; describe(sid) returns the socket's SocketSession or None."""
+        config = app.config
+        os.makedirs(config["TRACE_DIR"], exist_ok=True)
+        handler = RotatingFileHandler(
+            os.path.join(config["TRACE_DIR"], f"trace-{os.getpid()}.ndjson"),
+            maxBytes=config["TRACE_MAX_BYTES"], backupCount=config["TRACE_BACKUP_COUNT"], delay=True,
+        )
+        handler.namer = lambda name: f"{name}.gz"
+        handler.rotator = _gzip_rotate
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        self._logger = logging.getLogger(f"socket_trace.{os.getpid()}")
+        self._logger.handlers = [handler]
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._describe = describe
+        self._threshold = int(config["TRACE_SAMPLE_RATE"] * 10000)
+        self._salt = config["SECRET_KEY"].encode()
+        self.enabled = True
+
+    def sampled(self, room_id):
+        return zlib.crc32(str(room_id).encode()) % 10000 < self._threshold
+
+    def _user_key(self, user_id):
+        return hmac.new(self._salt, str(user_id).encode(), hashlib.sha256).hexdigest()[:10]
+
+    def trace(self, event):
+        """Decorator for a Socket.IO handler; put it above rate limiting so dropped events are kept."""
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return f(*args, **kwargs)
+                sid = request.sid
+                started = time.perf_counter()
+                ok = False
+                try:
+                    result = f(*args, **kwargs)
+                    ok = result is not False
+                    return result
+                finally:
+                    try:
+                        self._record(event, sid, args[0] if args else None, ok, time.perf_counter() - started)
+                    except Exception as e:
+                        metrics.incr("trace.errors")
+                        current_app.logger.warning(f"Socket trace record failed: {e}")
+            return wrapper
+        return decorator
+
+    def _record(self, event, sid, data, ok, elapsed):
+        data = data if isinstance(data, dict) else {}
+        line = {"t": int(time.time() * 1000), "e": event}
+
+        if event == "connect":
+            room_id = data.get("roomId")
+            if room_id is None or not self.sampled(room_id):
+                return
+            session = secrets.token_hex(4)
+            meta = self._describe(sid) if ok else None
+            if meta:
+                self._sessions[sid] = session
+            line.update({
+                "s": session,
+                "r": str(room_id),
+                "u": self._user_key(meta.user_id) if meta else None,
+                "role": meta.role if meta else data.get("role"),
+                "resume": bool(data.get("resumeToken")),
+                "ok": bool(meta),
+            })
+        else:
+            session = self._sessions.pop(sid, None) if event == "disconnect" else self._sessions.get(sid)
+            if session is None:
+                return
+            line["s"] = session
+            if event in SIGNALING_EVENTS:
+                line["to"] = self._sessions.get(data.get("to"))
+                line["n"] = sum(len(v) if isinstance(v, str) else 8 for v in data.values())
+            elif event == "user:status":
+                line["st"] = data.get("status", {})
+
+        line["ms"] = round(elapsed * 1000, 2)
+        self._logger.info(json.dumps(line, separators=(",", ":")))
+        metrics.incr("trace.events")
+
+
+tracer = SocketTraceRecorder()
@@ -30,24 +30,60 @@ app.get('/health', (req, res) => {
   });
 });
 
-// Fetch user details from API
-async function fetchUserDetails(userId) {
-  try {
-    const response = await axios.get(`${API_BASE}/user/${userId}`, { timeout: 5000 });
-    return response.data;
-  } catch (error) {
-    console.error(`Failed to fetch user details for ${userId}:`, error.message);
-    // Return basic user info as fallback
-    return {
-      id: userId,
-      name: `User ${userId}`,
-      email: null,
-      profile: null,
-      created_at: new Date().toISOString()
-    };
+// Fetch user details from API.
+// Lookups arriving within USER_BATCH_WINDOW_MS are coalesced into one
+// GET /users?ids=... call, so a room filling up costs one round trip.
+const SERVICE_TOKEN = process.env.SERVICE_TOKEN;
+const USER_BATCH_WINDOW_MS = 10;
+const USER_BATCH_MAX_IDS = 100;
+let pendingUserLookups = new Map(); // userId -> [{ resolve }]
+let userBatchTimer = null;
+
+function fallbackUserDetails(userId) {
+  // Return basic user info as fallback
+  return {
+    id: userId,
+    name: `User ${userId}`,
+    email: null,
+    profile: null,
+    created_at: new Date().toISOString()
+  };
+}
+
+async function flushUserLookups() {
+  const batch = pendingUserLookups;
+  pendingUserLookups = new Map();
+  userBatchTimer = null;
+
+  const ids = [...batch.keys()];
+  for (let i = 0; i < ids.length; i += USER_BATCH_MAX_IDS) {
+    const chunk = ids.slice(i, i + USER_BATCH_MAX_IDS);
+    let users = {};
+    try {
+      const response = await axios.get(`${API_BASE}/users`, {
+        params: { ids: chunk.join(',') },
+        headers: SERVICE_TOKEN ? { 'X-Service-Token': SERVICE_TOKEN } : {},
+        timeout: 5000
+      });
+      users = response.data.users || {};
+    } catch (error) {
+      console.error(`Failed to fetch user details for ${chunk.join(',')}:`, error.message);
+    }
+    for (const userId of chunk) {
+      const details = users[String(userId)] || fallbackUserDetails(userId);
+      batch.get(userId).forEach((resolve) => resolve(details));
+    }
   }
 }
 
+function fetchUserDetails(userId) {
+  return new Promise((resolve) => {
+    if (!pendingUserLookups.has(userId)) pendingUserLookups.set(userId, []);
+    pendingUserLookups.get(userId).push(resolve);
+    if (!userBatchTimer) userBatchTimer = setTimeout(flushUserLookups, USER_BATCH_WINDOW_MS);
+  });
+}
+
 // Get all current participants in a room with their details
 function getRoomParticipants(roomId) {
   const participants = [];